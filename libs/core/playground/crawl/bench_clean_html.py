@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.autoagents_core.utils.content_extractor import extract_content
+from src.autoagents_core.client.CrawlClient import CrawlClient
+
+
+def build_large_page(items: int = 1000) -> str:
+    """构造一个带导航、cookie横幅、侧边栏、页脚和大量评论的页面"""
+    nav = "".join(f'<li><a href="/c/{i}">Category {i}</a></li>' for i in range(1500))
+    sidebar = "".join(f'<div class="ad-slot"><a href="/p/{i}">Sponsored product {i}</a></div>' for i in range(1500))
+    reviews = "".join(
+        f'<div class="review-item" data-review-id="{i}">'
+        f'<h3>Reviewer {i}</h3><span class="rating">{i % 5 + 1} stars</span>'
+        f'<p>Stayed here in spring, the room was clean, the staff friendly, and the location close to the station. '
+        f'Breakfast was average, but overall worth the price. Review number {i}.</p></div>'
+        for i in range(items)
+    )
+    scripts = "".join(f"<script>window.__data{i} = {{'k': '{'x' * 200}'}};</script>" for i in range(300))
+    return f"""<html><head><title>Hotel</title><style>{'.a{{color:red}}' * 500}</style>{scripts}</head>
+<body>
+<div id="cookie-consent">We use cookies to improve your experience. <button>Accept all</button></div>
+<header><nav><ul>{nav}</ul></nav></header>
+<aside class="sidebar">{sidebar}</aside>
+<main><article><h1>Grand Hotel Tokyo</h1><div class="reviews-content">{reviews}</div></article></main>
+<footer><p>© 2025 Example Inc. All rights reserved.</p>{nav}</footer>
+</body></html>"""
+
+
+def bench(name: str, func, html: str, repeat: int = 3):
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = func(html)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<22} {best * 1000:>9.1f} ms   prompt文本 {len(text):>9,} 字符")
+    return text
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = build_large_page()
+    print(f"📊 HTML大小: {len(html):,} 字符\n")
+
+    client = CrawlClient.__new__(CrawlClient)
+    bench("legacy (html.parser)", client._clean_html_legacy, html)
+    bench("lxml full", lambda h: extract_content(h, mode="full"), html)
+    bench("lxml text", lambda h: extract_content(h, mode="text"), html)
+    bench("lxml main", lambda h: extract_content(h, mode="main"), html)
+    bench("lxml main markdown", lambda h: extract_content(h, mode="main", output="markdown"), html)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 # src/autoagents_core/__init__.py
-from .client import ChatClient, KbClient, CrawlClient, SupabaseClient, MCPClient
+from .client import ChatClient, KbClient, CrawlClient, AsyncCrawlClient, SupabaseClient, MCPClient
 from .datascience import DSAgent
 from .react import ReActAgent
 from .sandbox import LocalSandbox, E2BSandbox
@@ -9,7 +9,7 @@ from .tools import ToolManager
 from .types import *
 
 __all__ = [
-    "ChatClient", "KbClient", "CrawlClient", "SupabaseClient", "MCPClient",
+    "ChatClient", "KbClient", "CrawlClient", "AsyncCrawlClient", "SupabaseClient", "MCPClient",
     "DSAgent", 
     "ReActAgent",
     "LocalSandbox", "E2BSandbox",
@@ -0,0 +1,195 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Type, TypeVar, Optional, List, Dict, Any
+from pydantic import BaseModel
+from .CrawlClient import CrawlClient, SiteConfig, DomainThrottle, HTTPX_AVAILABLE
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class AsyncCrawlClient(CrawlClient):
+    """
+    CrawlClient 的异步版本，可直接在已运行的事件循环（FastAPI、aiohttp 等服务）中使用
+
+    - 同一事件循环内的所有页面共享一个浏览器与 httpx 连接池，每个页面使用独立的浏览器上下文
+    - SiteConfig、就绪策略、资源拦截、缓存、选择器模板与诊断报告均与 CrawlClient 相同
+    - 自定义操作通过异步 Playwright 执行，不占用线程；LLM 提取在线程中进行，不阻塞事件循环
+    - 一个实例只应在一个事件循环中使用；ascrape_many / acrawl_site 同样复用共享浏览器
+    - 换用新的事件循环（如多次 asyncio.run）前需在原事件循环中调用 aclose()（或使用 async with），
+      否则浏览器进程无法关闭，start() 会抛出 RuntimeError
+
+    Usage:
+        async with AsyncCrawlClient(chat_client) as client:
+            result = await client.scrape_url(url, schema=RepoList)
+            pages = await asyncio.gather(*(client.scrape_url(u, formats=["markdown"]) for u in urls))
+    """
+
+    def __init__(
+        self,
+        chat_client,
+        use_playwright: bool = True,
+        max_concurrency: int = 8,
+        max_per_domain: int = 4,
+        domain_delay: float = 0.0,
+        extract_concurrency: int = 4,
+        **kwargs
+    ):
+        """
+        Args:
+            chat_client: 用于LLM提取的对话客户端
+            use_playwright: 是否使用 Playwright 获取动态页面
+            max_concurrency: scrape_url 同时打开的页面数上限
+            max_per_domain: scrape_url 同一域名同时抓取的页面数上限
+            domain_delay: scrape_url 同一域名相邻请求的最小间隔(秒)
+            extract_concurrency: 同时进行的LLM提取数上限
+            **kwargs: 其余参数与 CrawlClient 相同
+        """
+        super().__init__(chat_client, use_playwright=use_playwright, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.max_per_domain = max_per_domain
+        self.domain_delay = domain_delay
+        self.extract_concurrency = extract_concurrency
+        # 信号量与锁绑定首次使用它们的事件循环，在 start() 中按当前事件循环创建
+        self._page_semaphore: Optional[asyncio.Semaphore] = None
+        self._extract_semaphore: Optional[asyncio.Semaphore] = None
+        self._throttle: Optional[DomainThrottle] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._playwright = None
+        self._browser = None
+        self._http_client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """启动共享的浏览器与HTTP连接池（首次抓取时自动调用）；浏览器断开时重新启动"""
+        loop = asyncio.get_running_loop()
+        stale = None
+        if self._loop is not loop and self._loop is not None and self._loop.is_closed() and \
+                (self._browser is not None or self._playwright is not None):
+            # 浏览器与 Playwright 驱动进程只能在创建它们的事件循环中关闭
+            raise RuntimeError(
+                "AsyncCrawlClient 的浏览器仍在已结束的事件循环中运行，无法关闭；"
+                "请在原事件循环结束前调用 aclose()（或使用 async with AsyncCrawlClient(...)）"
+            )
+        if self._loop is not loop or self._start_lock is None:
+            # 换了事件循环：原循环中的浏览器与连接池不能再使用，信号量与锁也需要重新创建
+            # （检查与替换之间没有 await，同一事件循环内的并发调用不会重复执行）
+            stale = (self._loop, self._playwright, self._browser, self._http_client)
+            self._playwright = self._browser = self._http_client = None
+            self._loop = loop
+            self._page_semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+            self._extract_semaphore = asyncio.Semaphore(max(1, self.extract_concurrency))
+            self._throttle = DomainThrottle(max_per_domain=self.max_per_domain, delay=self.domain_delay)
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if stale is not None:
+                await self._close_stale(*stale)
+            if self.use_playwright and (self._browser is None or not self._browser.is_connected()):
+                if self._playwright is not None:
+                    await self._stop_browser()
+                self._playwright, self._browser = await self._launch_async_browser()
+                self._log(f"🚀 异步浏览器已启动 Chromium {self._browser.version}")
+            if HTTPX_AVAILABLE and self._http_client is None:
+                self._http_client = self._create_http_client(self.max_concurrency)
+
+    @staticmethod
+    async def _close_resources(playwright, browser, http_client):
+        for resource, method in ((browser, "close"), (playwright, "stop"), (http_client, "aclose")):
+            if resource is None:
+                continue
+            try:
+                await getattr(resource, method)()
+            except Exception:
+                pass
+
+    async def _close_stale(self, loop, playwright, browser, http_client):
+        """在创建它们的事件循环中关闭旧的浏览器与连接池"""
+        if playwright is None and browser is None and http_client is None:
+            return
+        if loop is None or loop.is_closed():
+            if playwright is not None or browser is not None:
+                self._log("⚠️ 原事件循环已关闭，其中的浏览器无法关闭，已丢弃引用")
+            else:
+                # 连接池没有子进程，连接随对象回收关闭
+                self._log("⚠️ 原事件循环已关闭，丢弃其中的HTTP连接池")
+            return
+        coro = self._close_resources(playwright, browser, http_client)
+        try:
+            if loop.is_running():
+                # 原事件循环仍在其他线程中运行
+                await asyncio.wait_for(asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop)), 30)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(loop.run_until_complete, coro), 30)
+            self._log("🧹 已关闭原事件循环中的浏览器与连接池")
+        except Exception as e:
+            self._log(f"⚠️ 关闭原事件循环中的资源失败: {e}")
+
+    async def _stop_browser(self):
+        await self._close_resources(self._playwright, self._browser, None)
+        self._browser = None
+        self._playwright = None
+
+    async def aclose(self):
+        """关闭共享的浏览器、HTTP连接池与缓存；应在启动它们的事件循环中调用"""
+        if self._loop is not None and self._loop is not asyncio.get_running_loop():
+            # 资源属于其他事件循环，在这里无法关闭；丢弃引用，使实例可以在当前事件循环中重新启动
+            await self._close_stale(self._loop, self._playwright, self._browser, self._http_client)
+            self._playwright = self._browser = self._http_client = None
+        await self._stop_browser()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self._loop = None
+        self.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    @asynccontextmanager
+    async def _async_fetch_session(self, concurrency: int):
+        """在启动共享浏览器的事件循环中复用它；其他事件循环（如 scrape_many 的后台线程）中单独启动"""
+        loop = self._loop
+        if loop is not None and loop is not asyncio.get_running_loop() and not loop.is_closed():
+            async with super()._async_fetch_session(concurrency) as fetch:
+                yield fetch
+            return
+
+        await self.start()
+
+        async def fetch(url: str) -> str:
+            return await self._async_fetch_html(self._browser, self._http_client, url)
+
+        yield fetch
+
+    async def scrape_url(
+        self,
+        url: str,
+        schema: Optional[Type[T]] = None,
+        prompt: str = "",
+        formats: List[str] = ["extract"],
+        custom_config: Optional[SiteConfig] = None,
+        token_budget: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        爬取URL并提取结构化数据（异步），参数与返回值同 CrawlClient.scrape_url
+
+        custom_config 只作用于本次调用，不会修改 site_configs，因此并发调用之间互不影响
+        """
+        self._log(f"🌐 正在爬取: {url}")
+        self._log(f"🔧 爬取方法: {'Playwright' if self.use_playwright else 'HTTP'}")
+        if custom_config:
+            self._log(f"🎛️ 使用自定义配置: {custom_config.name}")
+        await self.start()
+
+        async def fetch(page_url: str) -> str:
+            return await self._async_fetch_html(self._browser, self._http_client, page_url, custom_config)
+
+        results, _ = await self._async_scrape_one(
+            fetch, url, schema, prompt, formats, token_budget,
+            self._page_semaphore, self._throttle, self._extract_semaphore
+        )
+        results.pop("url", None)
+        return results
@@ -1,19 +1,53 @@
+import re
+import copy
 import json
+import time
+import queue
+import asyncio
+import threading
 import requests
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
-from typing import Type, TypeVar, Optional, List, Dict, Any
+from typing import Type, TypeVar, Optional, List, Dict, Any, AsyncIterator, Iterator, Callable, Generator
 from pydantic import BaseModel
 from ..utils import extract_json
+from ..utils.http_cache import HttpCache, hash_content, ACCEPT_ENCODING
+from ..utils.disk_cache import DiskCache
+from ..utils.content_extractor import extract_content
+from ..utils.chunked_extraction import estimate_tokens, split_text, merge_partials
+from ..utils.selector_template import learn_template, apply_template
+from ..utils.crawl_frontier import CrawlFrontier, normalize_url, extract_links, parse_sitemap
 from ..client import ChatClient
 
 try:
     from playwright.sync_api import sync_playwright
+    from playwright.async_api import async_playwright
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
 T = TypeVar("T", bound=BaseModel)
 
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+DEFAULT_BROWSER_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
 
 class SiteConfig:
     """网站配置类，定义特定网站的处理策略"""
@@ -24,22 +58,567 @@ class SiteConfig:
         selectors: List[str] = None,
         wait_time: int = 3000,
         scroll_behavior: bool = False,
-        custom_actions: List[Dict[str, Any]] = None
+        custom_actions: List[Dict[str, Any]] = None,
+        readiness: Optional[str] = None,
+        quiet_window: int = 500,
+        max_ready_time: int = 10000,
+        block_resource_types: Optional[List[str]] = None,
+        block_domains: Optional[List[str]] = None,
+        max_response_bytes: Optional[int] = None
     ):
         self.name = name
         self.selectors = selectors or []  # 等待的CSS选择器
-        self.wait_time = wait_time  # 额外等待时间(毫秒)
+        self.wait_time = wait_time  # 额外等待时间(毫秒)，adaptive 模式下不再固定等待
         self.scroll_behavior = scroll_behavior  # 是否需要滚动
         self.custom_actions = custom_actions or []  # 自定义操作
+        self.readiness = readiness  # "adaptive" / "fixed"，None 时沿用 CrawlClient 的设置
+        self.quiet_window = quiet_window  # 网络与DOM需要保持静默的时长(毫秒)
+        self.max_ready_time = max_ready_time  # 等待页面就绪的上限(毫秒)
+        self.block_resource_types = block_resource_types  # 拦截的资源类型，None 时使用全局默认
+        self.block_domains = block_domains or []  # 额外拦截的域名（追加到全局默认）
+        self.max_response_bytes = max_response_bytes  # 媒体/XHR等子资源按 HEAD 声明的大小超过该值时不下载（None 不检查）
+        self.selector_templates: Dict[str, Dict[str, Any]] = {}  # 学习到的字段选择器模板，按 schema+prompt 哈希存储
+
+
+# 默认拦截的资源类型：只需要HTML文本，图片/媒体/字体均无用
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+
+# 默认拦截的统计/广告/追踪域名
+DEFAULT_BLOCKED_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com",
+    "doubleclick.net", "googlesyndication.com", "connect.facebook.net",
+    "hotjar.com", "segment.io", "segment.com", "mixpanel.com", "amplitude.com",
+    "newrelic.com", "nr-data.net", "sentry.io", "clarity.ms", "bat.bing.com",
+    "scorecardresearch.com", "criteo.com", "taboola.com", "outbrain.com"
+]
+
+# 设置 max_response_bytes 时，先用 HEAD 请求检查大小的资源类型（脚本、样式表等页面渲染必需的资源不检查）
+SIZE_CHECKED_RESOURCE_TYPES = ("media", "image", "font", "fetch", "xhr", "other")
+
+# 默认拦截的大文件扩展名（无论资源类型）
+DEFAULT_BLOCKED_EXTENSIONS = [
+    ".mp4", ".webm", ".mov", ".avi", ".mkv", ".mp3", ".wav", ".ogg", ".flac",
+    ".zip", ".rar", ".7z", ".gz", ".tar", ".iso", ".dmg", ".exe", ".msi", ".apk"
+]
+
+
+class RequestFilter:
+    """
+    Playwright 请求路由规则：拦截图片、媒体、字体、统计域名与大文件，并统计节省的请求与流量
+
+    每个页面使用一个独立实例，stats 记录该页面的拦截情况：
+    - bytes_loaded: 实际下载的响应体大小（请求完成后读取 request.sizes()）
+    - bytes_saved_declared: 因超过 max_response_bytes 未下载的响应按 HEAD 声明的 Content-Length 累计；
+      按类型/域名/扩展名直接拦截的请求无法得知大小，不计入
+    """
+
+    def __init__(
+        self,
+        resource_types: Optional[List[str]] = None,
+        domains: Optional[List[str]] = None,
+        extensions: Optional[List[str]] = None,
+        max_response_bytes: Optional[int] = None
+    ):
+        self.resource_types = set(DEFAULT_BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types)
+        self.domains = tuple(d.lower() for d in (DEFAULT_BLOCKED_DOMAINS if domains is None else domains))
+        self.extensions = tuple(DEFAULT_BLOCKED_EXTENSIONS if extensions is None else extensions)
+        self.max_response_bytes = max_response_bytes
+        self.stats = {
+            "requests_total": 0,
+            "requests_blocked": 0,
+            "blocked_by_reason": {},
+            "bytes_loaded": 0,
+            "bytes_saved_declared": 0
+        }
+
+    @classmethod
+    def for_site(cls, site_config: Optional[SiteConfig]) -> "RequestFilter":
+        """根据网站配置构建过滤规则，未配置的部分使用全局默认"""
+        if site_config is None:
+            return cls()
+        return cls(
+            resource_types=site_config.block_resource_types,
+            domains=DEFAULT_BLOCKED_DOMAINS + site_config.block_domains,
+            max_response_bytes=site_config.max_response_bytes
+        )
+
+    def block_reason(self, request) -> Optional[str]:
+        """返回拦截原因，不需要拦截时返回 None"""
+        if request.is_navigation_request() and request.frame.parent_frame is None:
+            return None
+        if request.resource_type in self.resource_types:
+            return request.resource_type
+        parsed = urlparse(request.url)
+        host = parsed.netloc.lower()
+        if any(host == d or host.endswith("." + d) for d in self.domains):
+            return "tracker"
+        if parsed.path.lower().endswith(self.extensions):
+            return "large_file"
+        return None
+
+    def _record_block(self, reason: str, size: int = 0):
+        self.stats["requests_blocked"] += 1
+        self.stats["blocked_by_reason"][reason] = self.stats["blocked_by_reason"].get(reason, 0) + 1
+        self.stats["bytes_saved_declared"] += size
+
+    def _on_request_finished(self, request):
+        try:
+            self.stats["bytes_loaded"] += max(0, request.sizes().get("responseBodySize", 0))
+        except Exception:
+            pass
+
+    async def _async_on_request_finished(self, request):
+        try:
+            self.stats["bytes_loaded"] += max(0, (await request.sizes()).get("responseBodySize", 0))
+        except Exception:
+            pass
+
+    def _needs_size_check(self, request) -> bool:
+        return bool(self.max_response_bytes) and request.resource_type in SIZE_CHECKED_RESOURCE_TYPES
+
+    def _declared_oversize(self, response) -> int:
+        """HEAD 响应声明的大小超过 max_response_bytes 时返回该大小，否则（包括未声明大小）返回0"""
+        try:
+            size = int(response.headers.get("content-length", 0))
+        except (TypeError, ValueError):
+            size = 0
+        return size if size > self.max_response_bytes else 0
+
+    def _handle_route(self, route):
+        request = route.request
+        self.stats["requests_total"] += 1
+        reason = self.block_reason(request)
+        if reason:
+            self._record_block(reason)
+            route.abort()
+            return
+        if self._needs_size_check(request):
+            # 下载前先发 HEAD 请求，超大的响应不会被下载
+            try:
+                head = request.frame.page.context.request.head(
+                    request.url, headers=request.headers, timeout=5000, fail_on_status_code=False
+                )
+                size = self._declared_oversize(head)
+            except Exception:
+                size = 0
+            if size:
+                self._record_block("oversized", size)
+                route.abort()
+                return
+        route.continue_()
+
+    async def _async_handle_route(self, route):
+        request = route.request
+        self.stats["requests_total"] += 1
+        reason = self.block_reason(request)
+        if reason:
+            self._record_block(reason)
+            await route.abort()
+            return
+        if self._needs_size_check(request):
+            try:
+                head = await request.frame.page.context.request.head(
+                    request.url, headers=request.headers, timeout=5000, fail_on_status_code=False
+                )
+                size = self._declared_oversize(head)
+            except Exception:
+                size = 0
+            if size:
+                self._record_block("oversized", size)
+                await route.abort()
+                return
+        await route.continue_()
+
+    def attach(self, page):
+        """为同步 Playwright 页面安装路由规则"""
+        page.route("**/*", self._handle_route)
+        page.on("requestfinished", self._on_request_finished)
+
+    async def async_attach(self, page):
+        """为异步 Playwright 页面安装路由规则"""
+        await page.route("**/*", self._async_handle_route)
+        page.on("requestfinished", self._async_on_request_finished)
+
+
+# 页面内安装 MutationObserver，记录最后一次 DOM 变化的时间
+DOM_OBSERVER_SCRIPT = """() => {
+    if (window.__aaMutationObserver) return;
+    window.__aaLastMutation = performance.now();
+    window.__aaMutationObserver = new MutationObserver(() => { window.__aaLastMutation = performance.now(); });
+    window.__aaMutationObserver.observe(document.documentElement || document, {
+        childList: true, subtree: true, attributes: true, characterData: true
+    });
+}"""
+
+DOM_QUIET_SCRIPT = "(quiet) => performance.now() - (window.__aaLastMutation || 0) >= quiet"
+
+
+class NetworkIdleTracker:
+    """通过页面请求事件统计进行中的请求数，用于判断网络是否已静默"""
+
+    def __init__(self, page):
+        self.inflight = 0
+        self.last_activity = time.monotonic()
+        page.on("request", self._on_request_start)
+        page.on("requestfinished", self._on_request_end)
+        page.on("requestfailed", self._on_request_end)
+
+    def _on_request_start(self, request):
+        self.inflight += 1
+        self.last_activity = time.monotonic()
+
+    def _on_request_end(self, request):
+        self.inflight = max(0, self.inflight - 1)
+        self.last_activity = time.monotonic()
+
+    def quiet_ms(self) -> float:
+        """网络已静默的时长(毫秒)，仍有请求进行中时返回0"""
+        if self.inflight > 0:
+            return 0.0
+        return (time.monotonic() - self.last_activity) * 1000
+
+
+def _page_call(method: str, *args, **kwargs):
+    """页面操作步骤中的一次 Playwright 页面方法调用，由 run_page_steps / async_run_page_steps 执行"""
+    return method, args, kwargs
+
+
+def run_page_steps(page, steps: Generator):
+    """
+    用同步 Playwright API 执行页面操作步骤
+
+    步骤是产出 _page_call(...) 的生成器，调用结果（或异常）送回生成器，
+    同一份等待、就绪与自定义操作逻辑因此可同时用于同步与异步 API
+    """
+    result, error = None, None
+    while True:
+        try:
+            method, args, kwargs = steps.throw(error) if error is not None else steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            result = getattr(page, method)(*args, **kwargs)
+        except Exception as e:
+            error = e
+
+
+async def async_run_page_steps(page, steps: Generator):
+    """run_page_steps 的异步 Playwright 版本"""
+    result, error = None, None
+    while True:
+        try:
+            method, args, kwargs = steps.throw(error) if error is not None else steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+        result, error = None, None
+        try:
+            result = await getattr(page, method)(*args, **kwargs)
+        except Exception as e:
+            error = e
+
+
+class BrowserPool:
+    """
+    长生命周期的 Playwright 浏览器池
+
+    在多次抓取之间复用同一个 Chromium 进程和浏览器上下文，避免每个URL都重新启动浏览器。
+    上下文在服务 max_pages_per_context 个页面后被回收重建，浏览器崩溃或断开时自动重启；
+    连续重启超过 max_restarts 次（中间没有成功服务过页面）才视为不可恢复。
+
+    注意: Playwright 同步 API 绑定创建它的线程，同一个池只能在同一线程中使用。
+    """
+
+    def __init__(
+        self,
+        headless: bool = True,
+        max_pages_per_context: int = 20,
+        max_idle_contexts: int = 2,
+        max_restarts: int = 3,
+        launch_args: List[str] = None,
+        user_agent: str = DEFAULT_USER_AGENT,
+        extra_http_headers: Dict[str, str] = None
+    ):
+        if not PLAYWRIGHT_AVAILABLE:
+            raise ImportError("BrowserPool 需要安装 playwright: pip install playwright")
+        self.headless = headless
+        self.max_pages_per_context = max(1, max_pages_per_context)
+        self.max_idle_contexts = max(0, max_idle_contexts)
+        self.max_restarts = max_restarts
+        self.launch_args = launch_args or [
+            '--no-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-blink-features=AutomationControlled',
+            '--disable-web-security',
+            f'--user-agent={user_agent}'
+        ]
+        self.user_agent = user_agent
+        self.extra_http_headers = extra_http_headers or DEFAULT_BROWSER_HEADERS
+
+        self._playwright = None
+        self._browser = None
+        self._idle_contexts: List[List[Any]] = []  # [context, 已服务页面数]
+        self.restart_count = 0
+        self.pages_served = 0
+
+    def _start(self):
+        """启动 Playwright 与浏览器进程"""
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch(
+            headless=self.headless,
+            args=self.launch_args
+        )
+        print(f"🚀 浏览器池已启动 Chromium {self._browser.version}")
+
+    def is_healthy(self) -> bool:
+        """检查浏览器进程是否仍然可用"""
+        if self._browser is None:
+            return False
+        try:
+            return self._browser.is_connected() and bool(self._browser.version)
+        except Exception:
+            return False
+
+    def restart(self):
+        """关闭当前浏览器并重新启动（用于崩溃恢复），成功服务一个页面后计数清零"""
+        if self.restart_count >= self.max_restarts:
+            raise RuntimeError(f"浏览器已连续重启 {self.restart_count} 次，超过上限 {self.max_restarts}")
+        self.restart_count += 1
+        print(f"♻️ 重启浏览器 ({self.restart_count}/{self.max_restarts})")
+        self._close_browser()
+        self._start()
+
+    def _ensure_browser(self):
+        if self._browser is None:
+            self._start()
+        elif not self.is_healthy():
+            self.restart()
+
+    def _acquire_context(self) -> List[Any]:
+        self._ensure_browser()
+        if self._idle_contexts:
+            return self._idle_contexts.pop()
+        context = self._browser.new_context(
+            user_agent=self.user_agent,
+            extra_http_headers=self.extra_http_headers
+        )
+        context.set_default_navigation_timeout(60000)  # 60秒
+        context.set_default_timeout(30000)  # 30秒
+        return [context, 0]
+
+    def _release_context(self, entry: List[Any], reusable: bool):
+        context = entry[0]
+        entry[1] += 1
+        if reusable and entry[1] < self.max_pages_per_context and len(self._idle_contexts) < self.max_idle_contexts:
+            self._idle_contexts.append(entry)
+            return
+        try:
+            context.close()
+        except Exception:
+            pass
+
+    @contextmanager
+    def page(self):
+        """
+        从池中借出一个页面，使用完毕后自动关闭页面并归还上下文
+
+        Usage:
+            with pool.page() as page:
+                page.goto(url)
+        """
+        entry = self._acquire_context()
+        page = None
+        reusable = True
+        try:
+            page = entry[0].new_page()
+            yield page
+        except Exception:
+            # 浏览器崩溃时丢弃上下文，下次借出时会自动重启
+            reusable = self.is_healthy()
+            raise
+        else:
+            # 浏览器已恢复正常，之前的重启不再计入上限
+            self.restart_count = 0
+        finally:
+            if page is not None:
+                try:
+                    page.close()
+                except Exception:
+                    reusable = False
+            self.pages_served += 1
+            self._release_context(entry, reusable)
+
+    def _close_browser(self):
+        for context, _ in self._idle_contexts:
+            try:
+                context.close()
+            except Exception:
+                pass
+        self._idle_contexts = []
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+    def close(self):
+        """关闭浏览器并停止 Playwright"""
+        self._close_browser()
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DomainThrottle:
+    """按域名限制并发数与请求间隔的礼貌性控制器（用于异步批量抓取）"""
+
+    def __init__(self, max_per_domain: int = 2, delay: float = 1.0):
+        self.max_per_domain = max(1, max_per_domain)
+        self.delay = max(0.0, delay)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_request: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+
+    def set_delay(self, host: str, delay: float):
+        """为单个域名设置请求间隔（例如 robots.txt 的 Crawl-delay）"""
+        self._delays[host.lower()] = max(0.0, delay)
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """占用目标域名的一个抓取名额，并保证同域名相邻请求至少间隔 delay 秒"""
+        host = urlparse(url).netloc.lower()
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_domain))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with semaphore:
+            async with lock:
+                loop = asyncio.get_running_loop()
+                wait = self._last_request.get(host, 0.0) + self._delays.get(host, self.delay) - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_request[host] = loop.time()
+            yield
+
+
+# 日志级别：off 不输出，info 进度信息，debug 额外输出DOM预览、全文与逐token响应
+DIAGNOSTICS_LEVELS = {"off": 0, "info": 1, "debug": 2}
 
 
 class CrawlClient:
     """Firecrawl Extract 复刻版 - 可配置网站策略版本"""
 
-    def __init__(self, chat_client: ChatClient, use_playwright: bool = True):
+    def __init__(
+        self,
+        chat_client: ChatClient,
+        use_playwright: bool = True,
+        browser_pool: Optional[BrowserPool] = None,
+        max_pages_per_context: int = 20,
+        readiness: str = "adaptive",
+        block_resources: bool = True,
+        http_cache: Optional[HttpCache] = None,
+        http_cache_dir: Optional[str] = None,
+        content_mode: str = "full",
+        content_format: str = "text",
+        token_budget: Optional[int] = None,
+        chunk_overlap: int = 200,
+        chunk_concurrency: int = 4,
+        extract_cache: Optional[DiskCache] = None,
+        extract_cache_path: Optional[str] = None,
+        extract_cache_ttl: Optional[float] = 7 * 24 * 3600,
+        learn_selectors: bool = False,
+        diagnostics: str = "info"
+    ):
+        """
+        Args:
+            chat_client: 用于LLM提取的对话客户端
+            use_playwright: 是否使用 Playwright 获取动态页面
+            browser_pool: 共享的浏览器池（可选），不提供时首次抓取时自动创建
+            max_pages_per_context: 自动创建浏览器池时，每个上下文最多服务的页面数
+            readiness: 页面就绪策略，"adaptive" 按网络/DOM静默与选择器出现判断，"fixed" 使用固定等待
+            block_resources: 是否按 SiteConfig/全局默认规则拦截图片、媒体、字体、统计域名等无用请求
+            http_cache: requests 回退方案使用的 HTTP 缓存（可选）
+            http_cache_dir: 未提供 http_cache 时，自动创建的缓存的磁盘目录；为空时仅缓存在内存中
+            content_mode: 发送给LLM的文本提取方式，"full" 全部可见文本（默认），"text" 去除导航/页脚等样板内容，
+                "main" 只保留正文，"legacy" 使用原 BeautifulSoup(html.parser) 实现
+            content_format: 发送给LLM的文本格式，"text" 或 "markdown"
+            token_budget: 单次LLM提取的页面文本token上限，超过时分块并行提取再按schema合并；None 不分块
+            chunk_overlap: 相邻文本块重叠的token数
+            chunk_concurrency: 同时提取的文本块数上限
+            extract_cache: 提取结果缓存（可选），按 (规范化文本哈希, schema哈希, prompt) 缓存，内容不变时不调用LLM
+            extract_cache_path: 未提供 extract_cache 时，自动创建的缓存的 SQLite 文件路径；为空时仅缓存在内存中
+            extract_cache_ttl: 自动创建的提取缓存的过期时间(秒)
+            learn_selectors: 是否学习选择器模板：LLM提取成功后记录各字段对应的DOM节点XPath，
+                同一网站后续页面直接按模板提取，模板结果未通过 schema 校验时回退到LLM并重新学习
+            diagnostics: 日志级别，"off" 不输出，"info" 输出进度信息，
+                "debug" 额外输出DOM预览、评论元素计数、清理后的全文与LLM逐token响应
+        """
         self.chat_client = chat_client
         self.use_playwright = use_playwright and PLAYWRIGHT_AVAILABLE
         self.site_configs = self._init_default_configs()
+        self.max_pages_per_context = max_pages_per_context
+        self._browser_pool = browser_pool
+        self._owns_browser_pool = browser_pool is None
+        self.readiness = readiness
+        self.page_timings = deque(maxlen=1000)  # 最近抓取页面的实际就绪耗时
+        self.block_resources = block_resources
+        self.resource_stats = deque(maxlen=1000)  # 最近抓取页面的请求拦截统计
+        self.content_mode = content_mode
+        self.token_budget = token_budget
+        self.chunk_overlap = chunk_overlap
+        self.chunk_concurrency = chunk_concurrency
+        self._owns_extract_cache = extract_cache is None
+        self.extract_cache = extract_cache or DiskCache(path=extract_cache_path, ttl=extract_cache_ttl)
+        self.content_format = content_format
+        self.learn_selectors = learn_selectors
+        self._host_templates: Dict[str, Dict[str, Dict[str, Any]]] = {}  # 无 SiteConfig 的网站按域名存储模板
+        self.template_stats = {"hits": 0, "fallbacks": 0, "learned": 0}
+        self.diagnostics = diagnostics
+        self.page_reports = deque(maxlen=1000)  # 最近处理页面的耗时、大小与提取来源
+        self.http_cache = http_cache or HttpCache(
+            cache_dir=http_cache_dir,
+            default_headers={"User-Agent": DEFAULT_USER_AGENT, **DEFAULT_BROWSER_HEADERS}
+        )
+
+    def _log_enabled(self, level: str) -> bool:
+        return DIAGNOSTICS_LEVELS.get(level, 1) <= DIAGNOSTICS_LEVELS.get(self.diagnostics, 1)
+
+    def _log(self, message: str = "", level: str = "info", end: str = "\n"):
+        """按 diagnostics 级别输出日志"""
+        if self._log_enabled(level):
+            print(message, end=end, flush=end != "\n")
+
+    def _get_browser_pool(self) -> BrowserPool:
+        """获取（必要时创建）浏览器池"""
+        if self._browser_pool is None:
+            self._browser_pool = BrowserPool(max_pages_per_context=self.max_pages_per_context)
+            self._owns_browser_pool = True
+        return self._browser_pool
+
+    def close(self):
+        """释放由本客户端创建的浏览器资源与HTTP连接池"""
+        if self._browser_pool is not None and self._owns_browser_pool:
+            self._browser_pool.close()
+            self._browser_pool = None
+        self.http_cache.close()
+        if self._owns_extract_cache:
+            self.extract_cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def _init_default_configs(self) -> Dict[str, SiteConfig]:
         """初始化默认的网站配置"""
@@ -151,7 +730,7 @@ class CrawlClient:
     def add_site_config(self, url_pattern: str, config: SiteConfig):
         """添加自定义网站配置"""
         self.site_configs[url_pattern] = config
-        print(f"✅ 已添加网站配置: {config.name} ({url_pattern})")
+        self._log(f"✅ 已添加网站配置: {config.name} ({url_pattern})")
 
     def _detect_site_config(self, url: str) -> Optional[SiteConfig]:
         """检测URL对应的网站配置"""
@@ -161,8 +740,8 @@ class CrawlClient:
                 return config
         return None
 
-    def _execute_custom_actions(self, page, actions: List[Dict[str, Any]]):
-        """执行自定义操作"""
+    def _custom_action_steps(self, actions: List[Dict[str, Any]], tracker: Optional[NetworkIdleTracker] = None) -> Generator:
+        """自定义操作的页面步骤；提供 tracker 时 wait 操作改为等待页面静默，time 作为等待上限"""
         for action in actions:
             action_type = action.get("action")
             params = action.get("params", {})
@@ -171,198 +750,400 @@ class CrawlClient:
                 if action_type == "scroll":
                     direction = params.get("direction", "bottom")
                     if direction == "bottom":
-                        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                        yield _page_call("evaluate", "window.scrollTo(0, document.body.scrollHeight)")
                     elif direction == "top":
-                        page.evaluate("window.scrollTo(0, 0)")
+                        yield _page_call("evaluate", "window.scrollTo(0, 0)")
                     
                 elif action_type == "wait":
                     wait_time = params.get("time", 1000)
-                    page.wait_for_timeout(wait_time)
+                    if tracker is not None:
+                        yield from self._settle_steps(tracker, wait_time)
+                    else:
+                        yield _page_call("wait_for_timeout", wait_time)
                     
                 elif action_type == "click":
                     selector = params.get("selector")
                     if selector:
-                        page.click(selector)
+                        yield _page_call("click", selector)
                         
                 elif action_type == "click_if_exists":
                     selectors = params.get("selectors", [])
                     clicked = False
                     for selector in selectors:
                         try:
-                            if page.is_visible(selector):
-                                page.click(selector)
-                                print(f"    ✅ 点击了元素: {selector}")
+                            if (yield _page_call("is_visible", selector)):
+                                yield _page_call("click", selector)
+                                self._log(f"    ✅ 点击了元素: {selector}")
                                 clicked = True
                                 break
-                        except:
+                        except Exception:
                             continue
                     if not clicked:
-                        print(f"    ⚠️ 未找到可点击的元素: {selectors}")
+                        self._log(f"    ⚠️ 未找到可点击的元素: {selectors}")
                         
                 elif action_type == "type":
                     selector = params.get("selector")
                     text = params.get("text", "")
                     if selector:
-                        page.type(selector, text)
+                        yield _page_call("type", selector, text)
                         
-                print(f"  ✅ 执行自定义操作: {action_type}")
+                self._log(f"  ✅ 执行自定义操作: {action_type}")
                 
             except Exception as e:
-                print(f"  ⚠️ 自定义操作失败 {action_type}: {e}")
+                self._log(f"  ⚠️ 自定义操作失败 {action_type}: {e}")
 
-    # ========== 内部工具 ==========
-    def _fetch_html_with_playwright(self, url: str) -> str:
-        """使用 Playwright 获取动态加载的页面内容"""
-        with sync_playwright() as p:
-            # 配置浏览器选项
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-web-security',
-                    '--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                ]
-            )
-            
-            page = browser.new_page()
-            
-            # 设置超时时间
-            page.set_default_navigation_timeout(60000)  # 60秒
-            page.set_default_timeout(30000)  # 30秒
-            
-            # 设置更真实的用户代理和其他头信息
-            page.set_extra_http_headers({
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1"
-            })
-            
+    def _execute_custom_actions(self, page, actions: List[Dict[str, Any]], tracker: Optional[NetworkIdleTracker] = None):
+        """执行自定义操作（同步 Playwright）"""
+        run_page_steps(page, self._custom_action_steps(actions, tracker))
+
+    async def _async_execute_custom_actions(self, page, actions: List[Dict[str, Any]], tracker: Optional[NetworkIdleTracker] = None):
+        """执行自定义操作（异步 Playwright）"""
+        await async_run_page_steps(page, self._custom_action_steps(actions, tracker))
+
+    # ========== 页面就绪判断 ==========
+    def _readiness_mode(self, site_config: Optional[SiteConfig]) -> str:
+        if site_config and site_config.readiness:
+            return site_config.readiness
+        return self.readiness
+
+    def _settle_steps(self, tracker: NetworkIdleTracker, max_wait: int, quiet_window: int = 500) -> Generator:
+        """等待网络与DOM同时静默 quiet_window 毫秒，最多等待 max_wait 毫秒；返回是否在上限内静默"""
+        deadline = time.monotonic() + max_wait / 1000
+        try:
+            yield _page_call("evaluate", DOM_OBSERVER_SCRIPT)
+        except Exception:
+            pass
+        while True:
+            if tracker.quiet_ms() >= quiet_window:
+                try:
+                    if (yield _page_call("evaluate", DOM_QUIET_SCRIPT, quiet_window)):
+                        return True
+                except Exception:
+                    return True
+            remaining = (deadline - time.monotonic()) * 1000
+            if remaining <= 0:
+                return False
+            yield _page_call("wait_for_timeout", min(100, remaining))
+
+    def _settle(self, page, tracker: NetworkIdleTracker, max_wait: int, quiet_window: int = 500) -> bool:
+        return run_page_steps(page, self._settle_steps(tracker, max_wait, quiet_window))
+
+    async def _async_settle(self, page, tracker: NetworkIdleTracker, max_wait: int, quiet_window: int = 500) -> bool:
+        return await async_run_page_steps(page, self._settle_steps(tracker, max_wait, quiet_window))
+
+    def _ready_steps(self, tracker: NetworkIdleTracker, site_config: Optional[SiteConfig]) -> Generator:
+        """
+        自适应等待页面就绪：先等待站点选择器出现，再等待网络与DOM静默，
+        整个过程不超过 max_ready_time。返回触发就绪的原因
+        """
+        config = site_config or SiteConfig(name="default")
+        deadline = time.monotonic() + config.max_ready_time / 1000
+        reason = "quiet"
+
+        if config.selectors:
             try:
-                print(f"🌐 使用 Playwright 访问: {url}")
+                yield _page_call("wait_for_selector", ", ".join(config.selectors), timeout=config.max_ready_time)
+                reason = "selector"
+            except Exception:
+                self._log(f"⚠️ 未检测到 {config.name} 特定内容，继续获取现有内容")
+
+        remaining = max(0, int((deadline - time.monotonic()) * 1000))
+        if not (yield from self._settle_steps(tracker, remaining, config.quiet_window)):
+            reason = "timeout"
+        return reason
+
+    def _wait_until_ready(self, page, tracker: NetworkIdleTracker, site_config: Optional[SiteConfig]) -> str:
+        return run_page_steps(page, self._ready_steps(tracker, site_config))
+
+    async def _async_wait_until_ready(self, page, tracker: NetworkIdleTracker, site_config: Optional[SiteConfig]) -> str:
+        return await async_run_page_steps(page, self._ready_steps(tracker, site_config))
+
+    def _load_page_steps(self, url: str, tracker: NetworkIdleTracker, site_config: Optional[SiteConfig], mode: str) -> Generator:
+        """
+        打开页面并按就绪策略等待（同步与异步抓取共用）
+
+        Returns:
+            (就绪原因, DOM 加载完成的时间)
+        """
+        loaded = time.monotonic()
+        reason = "fixed"
+        # 先尝试较宽松的等待策略
+        try:
+            yield _page_call("goto", url, wait_until="domcontentloaded", timeout=30000)
+            loaded = time.monotonic()
+            self._log(f"✅ DOM 加载完成，等待动态内容...")
+            
+            if mode == "adaptive":
+                # 自适应策略：选择器出现 + 网络/DOM静默，均有上限
+                reason = yield from self._ready_steps(tracker, site_config)
+                self._log(f"✅ 页面就绪 ({reason})，耗时 {round((time.monotonic() - loaded) * 1000)}ms")
                 
-                # 检测网站配置
-                site_config = self._detect_site_config(url)
-                if site_config:
-                    print(f"🎯 检测到网站: {site_config.name}")
+                if site_config and site_config.scroll_behavior:
+                    yield _page_call("evaluate", "window.scrollTo(0, document.body.scrollHeight)")
+                    yield from self._settle_steps(tracker, 2000, site_config.quiet_window)
                 
-                # 先尝试较宽松的等待策略
-                try:
-                    page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                    print(f"✅ DOM 加载完成，等待动态内容...")
+                if site_config and site_config.custom_actions:
+                    self._log(f"🔧 执行 {site_config.name} 自定义操作...")
+                    yield from self._custom_action_steps(site_config.custom_actions, tracker)
+                
+            else:
+                # 等待可能的动态内容加载
+                yield _page_call("wait_for_timeout", 3000)
+                
+                # 应用网站特定配置
+                if site_config:
+                    # 等待特定选择器
+                    selector_found = False
+                    for selector in site_config.selectors:
+                        try:
+                            yield _page_call("wait_for_selector", selector, timeout=15000)
+                            self._log(f"✅ {site_config.name} 内容加载完成 (选择器: {selector})")
+                            selector_found = True
+                            break
+                        except Exception:
+                            continue
+                            
+                    if not selector_found and site_config.selectors:
+                        self._log(f"⚠️ 未检测到 {site_config.name} 特定内容，继续获取现有内容")
                     
-                    # 等待可能的动态内容加载
-                    page.wait_for_timeout(3000)
+                    # 额外等待时间
+                    if site_config.wait_time > 0:
+                        yield _page_call("wait_for_timeout", site_config.wait_time)
                     
-                    # 应用网站特定配置
-                    if site_config:
-                        # 等待特定选择器
-                        selector_found = False
-                        for selector in site_config.selectors:
-                            try:
-                                page.wait_for_selector(selector, timeout=15000)
-                                print(f"✅ {site_config.name} 内容加载完成 (选择器: {selector})")
-                                selector_found = True
-                                break
-                            except:
-                                continue
-                                
-                        if not selector_found and site_config.selectors:
-                            print(f"⚠️ 未检测到 {site_config.name} 特定内容，继续获取现有内容")
-                        
-                        # 额外等待时间
-                        if site_config.wait_time > 0:
-                            page.wait_for_timeout(site_config.wait_time)
-                        
-                        # 滚动行为
-                        if site_config.scroll_behavior:
-                            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                            page.wait_for_timeout(2000)
-                        
-                        # 执行自定义操作
-                        if site_config.custom_actions:
-                            print(f"🔧 执行 {site_config.name} 自定义操作...")
-                            self._execute_custom_actions(page, site_config.custom_actions)
+                    # 滚动行为
+                    if site_config.scroll_behavior:
+                        yield _page_call("evaluate", "window.scrollTo(0, document.body.scrollHeight)")
+                        yield _page_call("wait_for_timeout", 2000)
                     
-                    else:
-                        # 通用策略：无特定配置时的默认行为
-                        print(f"🔄 使用通用等待策略")
-                        page.wait_for_timeout(5000)
-                    
-                except Exception as e:
-                    print(f"⚠️ domcontentloaded 策略失败，尝试基本加载: {e}")
-                    # 回退到最基本的加载策略
-                    page.goto(url, wait_until="load", timeout=45000)
-                    page.wait_for_timeout(2000)
-                
-                html = page.content()
-                
-                # 打印DOM内容用于调试
-                print(f"\n{'='*80}")
-                print(f"🌐 DOM内容调试信息")
-                print(f"{'='*80}")
-                print(f"📊 HTML总长度: {len(html)} 字符")
-                print(f"📄 页面标题: {page.title()}")
-                print(f"🔗 当前URL: {page.url}")
-                
-                # 打印部分DOM内容（前2000字符）
-                print(f"\n🔍 DOM内容预览 (前2000字符):")
-                print("-" * 60)
-                print(html[:2000])
-                print("-" * 60)
-                
-                # 检测特定元素
-                review_selectors = [
-                    '[data-review-id]',
-                    '[class*="review"]', 
-                    '[class*="comment"]',
-                    '.review',
-                    '.comment',
-                    '[data-testid*="review"]',
-                    '[id*="review"]'
-                ]
-                
-                print(f"\n🔍 评论元素检测:")
-                for selector in review_selectors:
-                    count = page.locator(selector).count()
-                    if count > 0:
-                        print(f"  ✅ {selector}: {count} 个元素")
-                    else:
-                        print(f"  ❌ {selector}: 0 个元素")
+                    # 执行自定义操作
+                    if site_config.custom_actions:
+                        self._log(f"🔧 执行 {site_config.name} 自定义操作...")
+                        yield from self._custom_action_steps(site_config.custom_actions)
                 
-                return html
-                
-            finally:
-                browser.close()
+                else:
+                    # 通用策略：无特定配置时的默认行为
+                    self._log(f"🔄 使用通用等待策略")
+                    yield _page_call("wait_for_timeout", 5000)
+            
+        except Exception as e:
+            self._log(f"⚠️ domcontentloaded 策略失败，尝试基本加载: {e}")
+            # 回退到最基本的加载策略
+            yield _page_call("goto", url, wait_until="load", timeout=45000)
+            loaded = time.monotonic()
+            reason = "load"
+            yield _page_call("wait_for_timeout", 2000)
+        return reason, loaded
 
-    def _fetch_html_with_requests(self, url: str) -> str:
-        """使用 requests 获取静态页面内容（回退方案）"""
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1"
+    def _record_timing(self, url: str, site_config: Optional[SiteConfig], mode: str, reason: str,
+                       started: float, loaded: float):
+        now = time.monotonic()
+        self.page_timings.append({
+            "url": url,
+            "site": site_config.name if site_config else None,
+            "readiness": mode,
+            "reason": reason,
+            "dom_loaded_ms": round((loaded - started) * 1000),
+            "ready_ms": round((now - loaded) * 1000),
+            "total_ms": round((now - started) * 1000)
+        })
+
+    def timing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按网站汇总页面实际就绪耗时，可据此调整 SiteConfig 的 max_ready_time / wait_time
+
+        Returns:
+            {网站名: {"pages": 数量, "avg_ready_ms": 平均, "p95_ready_ms": 95分位, "max_ready_ms": 最大, "timeouts": 超时次数}}
+        """
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for timing in self.page_timings:
+            grouped.setdefault(timing["site"] or "default", []).append(timing)
+
+        stats = {}
+        for site, timings in grouped.items():
+            ready = sorted(t["ready_ms"] for t in timings)
+            stats[site] = {
+                "pages": len(ready),
+                "avg_ready_ms": round(sum(ready) / len(ready)),
+                "p95_ready_ms": ready[min(len(ready) - 1, int(len(ready) * 0.95))],
+                "max_ready_ms": ready[-1],
+                "timeouts": sum(1 for t in timings if t["reason"] == "timeout")
+            }
+        return stats
+
+    def _record_resource_stats(self, url: str, request_filter: Optional[RequestFilter]):
+        if request_filter is None:
+            return
+        stats = dict(request_filter.stats, url=url)
+        self.resource_stats.append(stats)
+        if stats["requests_blocked"]:
+            self._log(f"🛡️ 拦截 {stats['requests_blocked']}/{stats['requests_total']} 个请求 "
+                  f"{stats['blocked_by_reason']}，已加载 {stats['bytes_loaded'] // 1024}KB")
+
+    def resource_summary(self) -> Dict[str, Any]:
+        """汇总最近抓取页面拦截的请求数与流量"""
+        summary = {"pages": 0, "requests_total": 0, "requests_blocked": 0, "blocked_by_reason": {},
+                   "bytes_loaded": 0, "bytes_saved_declared": 0}
+        for stats in self.resource_stats:
+            summary["pages"] += 1
+            for key in ("requests_total", "requests_blocked", "bytes_loaded", "bytes_saved_declared"):
+                summary[key] += stats[key]
+            for reason, count in stats["blocked_by_reason"].items():
+                summary["blocked_by_reason"][reason] = summary["blocked_by_reason"].get(reason, 0) + count
+        return summary
+
+    def _record_page(self, url: str, html: str, text: str, started: float, fetched: float,
+                     cleaned: float, source: Optional[str]):
+        now = time.monotonic()
+        self.page_reports.append({
+            "url": url,
+            "fetch_ms": round((fetched - started) * 1000),
+            "clean_ms": round((cleaned - fetched) * 1000),
+            "extract_ms": round((now - cleaned) * 1000) if source else 0,
+            "html_bytes": len(html.encode("utf-8", errors="ignore")),
+            "text_chars": len(text),
+            "extract_source": source
+        })
+
+    def crawl_report(self) -> Dict[str, Any]:
+        """
+        汇总最近处理页面的结构化报告（只基于抓取过程中已记录的数据，不产生额外请求）
+
+        Returns:
+            pages / bytes / timings_ms(各阶段 avg、p95、max) / extract_sources / selector_hits
+            （各网站就绪时等待选择器命中的页面数）/ readiness / resources / 各缓存统计
+        """
+        reports = list(self.page_reports)
+
+        def summarize(values: List[int]) -> Dict[str, int]:
+            if not values:
+                return {"avg": 0, "p95": 0, "max": 0}
+            values = sorted(values)
+            return {
+                "avg": round(sum(values) / len(values)),
+                "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1]
+            }
+
+        sources: Dict[str, int] = {}
+        for report in reports:
+            if report["extract_source"]:
+                sources[report["extract_source"]] = sources.get(report["extract_source"], 0) + 1
+
+        selector_hits: Dict[str, Dict[str, int]] = {}
+        for timing in self.page_timings:
+            config = self._detect_site_config(timing["url"])
+            if config is None or not config.selectors:
+                continue
+            entry = selector_hits.setdefault(timing["site"], {"pages": 0, "hits": 0})
+            entry["pages"] += 1
+            entry["hits"] += timing["reason"] == "selector"
+
+        return {
+            "pages": len(reports),
+            "bytes": {
+                "html": sum(r["html_bytes"] for r in reports),
+                "text_chars": sum(r["text_chars"] for r in reports)
+            },
+            "timings_ms": {
+                phase: summarize([r[f"{phase}_ms"] for r in reports])
+                for phase in ("fetch", "clean", "extract")
+            },
+            "extract_sources": sources,
+            "selector_hits": selector_hits,
+            "readiness": self.timing_stats(),
+            "resources": self.resource_summary(),
+            "http_cache": dict(self.http_cache.stats),
+            "extract_cache": self.extract_cache.info(),
+            "selector_templates": dict(self.template_stats)
         }
-        
+
+    def reset_stats(self):
+        """清空已记录的页面耗时、拦截统计与页面报告"""
+        self.page_timings.clear()
+        self.resource_stats.clear()
+        self.page_reports.clear()
+
+    # ========== 内部工具 ==========
+    def _fetch_html_with_playwright(self, url: str) -> str:
+        """使用 Playwright 获取动态加载的页面内容"""
+        # 从浏览器池借出页面（浏览器与上下文在多次抓取间复用）
+        with self._get_browser_pool().page() as page:
+            self._log(f"🌐 使用 Playwright 访问: {url}")
+            tracker = NetworkIdleTracker(page)
+            started = time.monotonic()
+            
+            # 检测网站配置
+            site_config = self._detect_site_config(url)
+            if site_config:
+                self._log(f"🎯 检测到网站: {site_config.name}")
+            mode = self._readiness_mode(site_config)
+            
+            # 拦截无用的资源请求
+            request_filter = RequestFilter.for_site(site_config) if self.block_resources else None
+            if request_filter:
+                request_filter.attach(page)
+            
+            reason, loaded = run_page_steps(page, self._load_page_steps(url, tracker, site_config, mode))
+            
+            self._record_timing(url, site_config, mode, reason, started, loaded)
+            self._record_resource_stats(url, request_filter)
+            
+            html = page.content()
+            
+            if self._log_enabled("debug"):
+                self._log_dom_debug(page, html)
+            
+            return html
+
+    # 调试时检测的评论类元素选择器
+    DEBUG_REVIEW_SELECTORS = [
+        '[data-review-id]',
+        '[class*="review"]',
+        '[class*="comment"]',
+        '.review',
+        '.comment',
+        '[data-testid*="review"]',
+        '[id*="review"]'
+    ]
+
+    def _log_dom_debug(self, page, html: str):
+        """debug 级别：打印DOM预览与评论元素数量（一次 evaluate 完成全部选择器计数）"""
+        self._log(f"\n{'='*80}", "debug")
+        self._log(f"🌐 DOM内容调试信息", "debug")
+        self._log(f"{'='*80}", "debug")
+        self._log(f"📊 HTML总长度: {len(html)} 字符", "debug")
+        self._log(f"📄 页面标题: {page.title()}", "debug")
+        self._log(f"🔗 当前URL: {page.url}", "debug")
+        self._log(f"\n🔍 DOM内容预览 (前2000字符):", "debug")
+        self._log("-" * 60, "debug")
+        self._log(html[:2000], "debug")
+        self._log("-" * 60, "debug")
+
+        counts = page.evaluate(
+            "selectors => selectors.map(s => document.querySelectorAll(s).length)",
+            self.DEBUG_REVIEW_SELECTORS
+        )
+        self._log(f"\n🔍 评论元素检测:", "debug")
+        for selector, count in zip(self.DEBUG_REVIEW_SELECTORS, counts):
+            self._log(f"  {'✅' if count else '❌'} {selector}: {count} 个元素", "debug")
+
+    def _fetch_html_with_requests(self, url: str) -> str:
+        """使用 requests 获取静态页面内容（回退方案），通过 HttpCache 复用连接并发起条件请求"""
         # 重试机制
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                print(f"🔄 尝试 {attempt + 1}/{max_retries}: 使用 requests 访问")
-                resp = requests.get(url, headers=headers, timeout=30)  # 增加超时时间到30秒
-                resp.raise_for_status()
-                return resp.text
+                self._log(f"🔄 尝试 {attempt + 1}/{max_retries}: 使用 requests 访问")
+                result = self.http_cache.get(url, timeout=30)  # 增加超时时间到30秒
+                if result.from_cache:
+                    self._log(f"💾 使用未过期的缓存内容")
+                elif result.revalidated:
+                    self._log(f"💾 页面未修改 (304)，复用缓存内容")
+                return result.text
             except requests.exceptions.RequestException as e:
                 if attempt == max_retries - 1:  # 最后一次尝试失败
                     raise e
-                print(f"⚠️ 第 {attempt + 1} 次尝试失败: {e}")
-                import time
+                self._log(f"⚠️ 第 {attempt + 1} 次尝试失败: {e}")
                 time.sleep(2)  # 等待2秒后重试
 
     def _fetch_html(self, url: str) -> str:
@@ -371,13 +1152,19 @@ class CrawlClient:
             try:
                 return self._fetch_html_with_playwright(url)
             except Exception as e:
-                print(f"⚠️ Playwright 失败，回退到 requests: {e}")
+                self._log(f"⚠️ Playwright 失败，回退到 requests: {e}")
                 return self._fetch_html_with_requests(url)
         else:
-            print(f"🌐 使用 requests 访问: {url}")
+            self._log(f"🌐 使用 requests 访问: {url}")
             return self._fetch_html_with_requests(url)
 
     def _clean_html(self, html: str) -> str:
+        """将HTML转换为发送给LLM的文本（lxml 解析 + 样板内容去除）"""
+        if self.content_mode == "legacy":
+            return self._clean_html_legacy(html)
+        return extract_content(html, mode=self.content_mode, output=self.content_format)
+
+    def _clean_html_legacy(self, html: str) -> str:
         soup = BeautifulSoup(html, "html.parser")
         for s in soup(["script", "style"]):
             s.decompose()
@@ -398,20 +1185,612 @@ Schema:
 
 Extract data according to the schema. {prompt}"""
 
-        print(f"🤖 发送给LLM的prompt长度: {len(combined_prompt)} 字符")
-        print(f"📋 Schema: {schema.__name__}")
-        print(f"🎯 提取提示: {prompt}")
-        print(f"💬 LLM响应:")
+        self._log(f"🤖 发送给LLM的prompt长度: {len(combined_prompt)} 字符")
+        self._log(f"📋 Schema: {schema.__name__}")
+        self._log(f"🎯 提取提示: {prompt}")
+        self._log(f"💬 LLM响应:", "debug")
         
         content = ""
-        for event in self.chat_client.invoke(prompt=combined_prompt):
+        for event in self._new_conversation().invoke(prompt=combined_prompt):
             if event['type'] == 'token':
-                print(event['content'], end='', flush=True)
+                self._log(event['content'], "debug", end='')
                 content += event['content']
+        self._log("", "debug")
 
         content = extract_json(content)
         return content
 
+    def _new_conversation(self) -> ChatClient:
+        """
+        每次提取使用独立的会话：ChatClient.invoke 会读写 chat_id，并发提取共用一个客户端时会互相覆盖，
+        且同一会话中的前一次提取会成为后一次的上下文；复制客户端（共享认证信息）并清空 chat_id
+        """
+        client = copy.copy(self.chat_client)
+        client.chat_id = None
+        return client
+
+    def _extract(self, text: str, schema: type[BaseModel], prompt: str, token_budget: Optional[int] = None):
+        """
+        按token预算提取：文本未超过预算时单次提取，否则按结构分块（带重叠）并行提取，
+        再按schema合并（列表拼接去重，标量取第一个非空值）
+
+        每块使用独立的会话（见 _new_conversation），互相看不到对方的文本；部分块失败时合并其余块的结果
+
+        Returns:
+            (提取结果, 是否完整)，有块提取失败时结果不完整
+
+        Raises:
+            RuntimeError: 所有块都提取失败
+        """
+        budget = token_budget if token_budget is not None else self.token_budget
+        total_tokens = estimate_tokens(text)
+        if not budget or total_tokens <= budget:
+            return self._extract_with_llm(text, schema, prompt), True
+
+        chunks = split_text(text, budget, self.chunk_overlap)
+        self._log(f"✂️ 文本约 {total_tokens} tokens，超过预算 {budget}，分为 {len(chunks)} 块并行提取")
+
+        errors: List[str] = []
+
+        def extract_chunk(index: int) -> Optional[dict]:
+            chunk_prompt = (f"{prompt}\nThe webpage text above is part {index + 1} of {len(chunks)} of the page. "
+                            f"Extract only data present in this part and use null for fields not found.")
+            try:
+                data = self._extract_with_llm(chunks[index], schema, chunk_prompt)
+            except Exception as e:
+                data, error = None, str(e)
+            else:
+                error = None if isinstance(data, dict) else "响应中没有可解析的JSON对象"
+            if error:
+                errors.append(f"第 {index + 1} 块: {error}")
+                self._log(f"⚠️ 第 {index + 1} 块提取失败: {error}")
+                return None
+            return data
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.chunk_concurrency, len(chunks)))) as executor:
+            partials = list(executor.map(extract_chunk, range(len(chunks))))
+
+        succeeded = sum(p is not None for p in partials)
+        if not succeeded:
+            raise RuntimeError(f"全部 {len(chunks)} 个文本块提取失败: {'; '.join(errors[:3])}")
+        self._log(f"🧩 合并 {succeeded}/{len(chunks)} 块的提取结果")
+        return merge_partials(partials, schema.model_json_schema()), succeeded == len(chunks)
+
+    def _extract_cache_key(self, text: str, schema: type[BaseModel], prompt: str) -> str:
+        normalized_text = " ".join(text.split())
+        schema_json = json.dumps(schema.model_json_schema(), sort_keys=True, ensure_ascii=False)
+        return f"extract:{hash_content(normalized_text)}:{hash_content(schema_json)[:16]}:{hash_content(prompt)[:16]}"
+
+    def _extract_and_validate(self, text: str, schema: Type[T], prompt: str, token_budget: Optional[int] = None) -> T:
+        """提取并校验为 schema 实例；相同文本、schema 与 prompt 命中缓存时不调用LLM"""
+        return self._cached_extract(text, schema, prompt, token_budget)[0]
+
+    def _cached_extract(self, text: str, schema: Type[T], prompt: str, token_budget: Optional[int] = None):
+        """_extract_and_validate 的实现，返回 (结果, 是否命中缓存)；部分文本块提取失败的结果不写入缓存"""
+        cache_key = self._extract_cache_key(text, schema, prompt)
+        cached = self.extract_cache.get(cache_key)
+        if cached is not None:
+            self._log(f"💾 命中提取缓存，跳过LLM调用")
+            return schema.model_validate(cached), True
+
+        self._log(f"🤖 开始LLM提取...")
+        data, complete = self._extract(text, schema, prompt, token_budget)
+        self._log(f"✅ LLM提取完成")
+        self._log(f"📦 原始数据: {data}", "debug")
+        result = schema.model_validate(data)
+        if complete:
+            self.extract_cache.set(cache_key, data)
+        else:
+            self._log(f"⚠️ 部分文本块提取失败，结果不写入缓存")
+        return result, False
+
+    def _template_slot(self, url: str, schema: type[BaseModel], prompt: str):
+        """返回 (模板字典, 模板键, 持久化键)：有 SiteConfig 时存放在其 selector_templates 中，否则按域名存放"""
+        site_config = self._detect_site_config(url)
+        if site_config is not None:
+            templates, site = site_config.selector_templates, site_config.name
+        else:
+            site = urlparse(url).netloc.lower()
+            templates = self._host_templates.setdefault(site, {})
+        schema_json = json.dumps(schema.model_json_schema(), sort_keys=True, ensure_ascii=False)
+        key = f"{hash_content(schema_json)[:16]}:{hash_content(prompt)[:16]}"
+        return templates, key, f"selector_template:{hash_content(site)[:16]}:{key}"
+
+    @staticmethod
+    def _is_empty_value(value: Any) -> bool:
+        return value is None or value == "" or value == [] or value == {}
+
+    @staticmethod
+    def _template_agrees(applied: Dict[str, Any], data: Dict[str, Any]) -> bool:
+        """模板在学习页面上的结果需与LLM结果一致：标量相同，列表条数不少于LLM结果的80%"""
+        for name, value in applied.items():
+            expected = data.get(name)
+            if isinstance(expected, list):
+                if not isinstance(value, list) or len(value) < 0.8 * len(expected):
+                    return False
+            elif isinstance(expected, (int, float)) and not isinstance(expected, bool):
+                if value is None or float(value) != float(expected):
+                    return False
+            elif " ".join(str(value or "").split()) != " ".join(str(expected or "").split()):
+                return False
+        return True
+
+    def _extract_with_template(self, url: str, html: str, schema: Type[T], prompt: str) -> Optional[T]:
+        """按已学习的模板提取，没有模板或结果未通过校验时返回 None"""
+        templates, key, store_key = self._template_slot(url, schema, prompt)
+        template = templates.get(key)
+        if template is None:
+            template = self.extract_cache.get(store_key)
+            if template is None:
+                return None
+            templates[key] = template
+
+        data = apply_template(html, template, url)
+        if data is not None:
+            # 学习时每个字段都有值，读到空值说明页面结构不同，不能把缺失的字段当作 None 返回
+            empty = [name for name in template.get("fields", {}) if self._is_empty_value(data.get(name))]
+            if empty:
+                self._log(f"⚠️ 选择器模板未读到字段: {', '.join(empty)}")
+                data = None
+        if data is not None:
+            try:
+                result = schema.model_validate(data)
+                self.template_stats["hits"] += 1
+                self._log(f"🧭 选择器模板提取成功，跳过LLM调用")
+                return result
+            except Exception as e:
+                self._log(f"⚠️ 选择器模板结果校验失败: {e}")
+        self.template_stats["fallbacks"] += 1
+        self._log(f"🔄 选择器模板失效，回退到LLM提取")
+        return None
+
+    def _learn_selector_template(self, url: str, html: str, schema: Type[T], prompt: str, result: T):
+        """
+        根据LLM提取结果学习模板：LLM结果中每个非空字段都必须学到选择器，且在学习页面上能复现LLM结果，
+        模板才会保存（否则未学到的字段在之后的页面上会被当作空值返回）
+        """
+        templates, key, store_key = self._template_slot(url, schema, prompt)
+        data = result.model_dump(mode="json")
+        template = learn_template(html, data, schema.model_json_schema())
+        if template is not None:
+            unlearned = [name for name, value in data.items()
+                         if not self._is_empty_value(value) and name not in template["fields"]]
+            if unlearned:
+                self._log(f"🧭 字段 {', '.join(unlearned)} 无法对应到页面元素，不使用选择器模板")
+                template = None
+        if template is not None:
+            applied = apply_template(html, template, url)
+            try:
+                if applied is None or not self._template_agrees(applied, data):
+                    template = None
+                else:
+                    schema.model_validate(applied)
+            except Exception:
+                template = None
+
+        if template is None:
+            templates.pop(key, None)
+            self.extract_cache.delete(store_key)
+            return
+        template["learned_from"] = url
+        templates[key] = template
+        self.extract_cache.set(store_key, template, ttl=None)
+        self.template_stats["learned"] += 1
+        self._log(f"🧭 已学习选择器模板: {', '.join(template['fields'])}")
+
+    def _extract_for_page(
+        self,
+        url: str,
+        html: str,
+        text: str,
+        schema: Type[T],
+        prompt: str,
+        token_budget: Optional[int] = None
+    ):
+        """
+        页面级提取：启用 learn_selectors 时优先使用选择器模板，失败时回退到LLM并重新学习
+
+        Returns:
+            (结果, 来源)，来源为 "template" / "cache" / "llm"
+        """
+        if self.learn_selectors:
+            result = self._extract_with_template(url, html, schema, prompt)
+            if result is not None:
+                return result, "template"
+
+        result, from_cache = self._cached_extract(text, schema, prompt, token_budget)
+        if self.learn_selectors:
+            try:
+                self._learn_selector_template(url, html, schema, prompt, result)
+            except Exception as e:
+                self._log(f"⚠️ 选择器模板学习失败: {e}")
+        return result, "cache" if from_cache else "llm"
+
+    def _build_results(self, html: str, text: str, formats: List[str]) -> Dict[str, Any]:
+        """根据 formats 组装 html/markdown 结果（extract 由调用方填充）"""
+        results = {}
+        if "html" in formats:
+            results["html"] = html
+        if "markdown" in formats:
+            try:
+                from markdownify import markdownify
+                results["markdown"] = markdownify(html)
+            except ImportError:
+                if self.content_format == "markdown":
+                    results["markdown"] = text
+                else:
+                    mode = "full" if self.content_mode == "legacy" else self.content_mode
+                    results["markdown"] = extract_content(html, mode=mode, output="markdown")
+        return results
+
+    # ========== 异步批量抓取 ==========
+    async def _async_fetch_html_with_playwright(self, browser, url: str, site_config: Optional[SiteConfig] = None) -> str:
+        """使用共享的异步浏览器获取页面内容，每个URL使用独立的上下文；site_config 为空时按URL检测"""
+        context = await browser.new_context(
+            user_agent=DEFAULT_USER_AGENT,
+            extra_http_headers=DEFAULT_BROWSER_HEADERS
+        )
+        context.set_default_navigation_timeout(60000)
+        context.set_default_timeout(30000)
+        try:
+            page = await context.new_page()
+            tracker = NetworkIdleTracker(page)
+            started = time.monotonic()
+            site_config = site_config or self._detect_site_config(url)
+            if site_config:
+                self._log(f"🎯 检测到网站: {site_config.name}")
+            mode = self._readiness_mode(site_config)
+            request_filter = RequestFilter.for_site(site_config) if self.block_resources else None
+            if request_filter:
+                await request_filter.async_attach(page)
+            reason, loaded = await async_run_page_steps(page, self._load_page_steps(url, tracker, site_config, mode))
+
+            self._record_timing(url, site_config, mode, reason, started, loaded)
+            self._record_resource_stats(url, request_filter)
+
+            return await page.content()
+        finally:
+            await context.close()
+
+    async def _async_fetch_html_with_http(self, http_client, url: str) -> str:
+        """使用异步HTTP获取静态页面内容（同样经过 HttpCache 发起条件请求）；未安装 httpx 时在线程中调用 requests"""
+        if http_client is None:
+            return await asyncio.to_thread(self._fetch_html_with_requests, url)
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                result = await self.http_cache.aget(http_client, url, timeout=30)
+                if result.revalidated:
+                    self._log(f"💾 页面未修改 (304)，复用缓存内容: {url}")
+                return result.text
+            except httpx.HTTPError as e:
+                if attempt == max_retries - 1:
+                    raise e
+                self._log(f"⚠️ 第 {attempt + 1} 次尝试失败: {e}")
+                await asyncio.sleep(2)
+
+    async def _async_fetch_html(self, browser, http_client, url: str, site_config: Optional[SiteConfig] = None) -> str:
+        if browser is not None:
+            try:
+                return await self._async_fetch_html_with_playwright(browser, url, site_config)
+            except Exception as e:
+                self._log(f"⚠️ Playwright 失败，回退到HTTP: {e}")
+        return await self._async_fetch_html_with_http(http_client, url)
+
+    async def ascrape_many(
+        self,
+        urls: List[str],
+        schema: Optional[Type[T]] = None,
+        prompt: str = "",
+        formats: List[str] = ["extract"],
+        concurrency: int = 5,
+        max_per_domain: int = 2,
+        domain_delay: float = 1.0,
+        extract_concurrency: int = 4,
+        token_budget: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发爬取多个URL，按完成顺序逐个返回结果（异步生成器）
+
+        抓取与LLM提取是流水线式的：页面抓取完成后立即释放抓取名额，
+        提取在独立的线程名额中进行，因此后续页面的抓取与前面页面的提取相互重叠。
+
+        Args:
+            urls: 目标URL列表
+            schema: 数据结构模型
+            prompt: 提取提示
+            formats: 返回格式
+            concurrency: 同时抓取的页面数上限
+            max_per_domain: 同一域名同时抓取的页面数上限
+            domain_delay: 同一域名相邻请求的最小间隔(秒)
+            extract_concurrency: 同时进行的LLM提取数上限
+            token_budget: 单次LLM提取的页面文本token上限（None 时使用客户端设置）
+
+        Yields:
+            Dict: 与 scrape_url 相同的结果，并附加 "url" 字段；失败时为 {"url": ..., "error": ...}
+        """
+        fetch_semaphore = asyncio.Semaphore(max(1, concurrency))
+        extract_semaphore = asyncio.Semaphore(max(1, extract_concurrency))
+        throttle = DomainThrottle(max_per_domain=max_per_domain, delay=domain_delay)
+
+        async def process(url: str) -> Dict[str, Any]:
+            try:
+                results, _ = await self._async_scrape_one(
+                    fetch, url, schema, prompt, formats, token_budget,
+                    fetch_semaphore, throttle, extract_semaphore
+                )
+                return results
+            except Exception as e:
+                self._log(f"❌ 爬取失败 {url}: {e}")
+                return {"url": url, "error": str(e)}
+
+        async with self._async_fetch_session(concurrency) as fetch:
+            tasks = [asyncio.create_task(process(url)) for url in urls]
+            try:
+                for finished in asyncio.as_completed(tasks):
+                    yield await finished
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    @asynccontextmanager
+    async def _async_fetch_session(self, concurrency: int):
+        """批量抓取共用的浏览器与HTTP连接池，产出 fetch(url) 协程函数，退出时释放资源"""
+        playwright = None
+        browser = None
+        http_client = None
+        try:
+            if self.use_playwright:
+                playwright, browser = await self._launch_async_browser()
+            if HTTPX_AVAILABLE:
+                http_client = self._create_http_client(concurrency)
+
+            async def fetch(url: str) -> str:
+                return await self._async_fetch_html(browser, http_client, url)
+
+            yield fetch
+        finally:
+            if http_client is not None:
+                await http_client.aclose()
+            if browser is not None:
+                await browser.close()
+            if playwright is not None:
+                await playwright.stop()
+
+    @staticmethod
+    async def _launch_async_browser():
+        """启动异步 Playwright 与 Chromium，返回 (playwright, browser)"""
+        playwright = await async_playwright().start()
+        try:
+            browser = await playwright.chromium.launch(
+                headless=True,
+                args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-blink-features=AutomationControlled']
+            )
+        except Exception:
+            await playwright.stop()
+            raise
+        return playwright, browser
+
+    @staticmethod
+    def _create_http_client(max_connections: int):
+        """创建异步抓取使用的 httpx 客户端（只声明已安装解码器支持的压缩格式）"""
+        return httpx.AsyncClient(
+            headers={"User-Agent": DEFAULT_USER_AGENT, **DEFAULT_BROWSER_HEADERS, "Accept-Encoding": ACCEPT_ENCODING},
+            timeout=30,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max(1, max_connections))
+        )
+
+    async def _async_scrape_one(
+        self,
+        fetch: Callable,
+        url: str,
+        schema: Optional[Type[T]],
+        prompt: str,
+        formats: List[str],
+        token_budget: Optional[int],
+        fetch_semaphore: asyncio.Semaphore,
+        throttle: "DomainThrottle",
+        extract_semaphore: asyncio.Semaphore
+    ):
+        """抓取并处理单个页面，返回 (结果, html)；抓取名额在提取开始前释放"""
+        async with fetch_semaphore:
+            async with throttle.slot(url):
+                started = time.monotonic()
+                html = await fetch(url)
+                fetched = time.monotonic()
+
+        text = await asyncio.to_thread(self._clean_html, html)
+        cleaned = time.monotonic()
+        results = self._build_results(html, text, formats)
+        source = None
+        if "extract" in formats and schema:
+            async with extract_semaphore:
+                results["extract"], source = await asyncio.to_thread(
+                    self._extract_for_page, url, html, text, schema, prompt, token_budget
+                )
+        self._record_page(url, html, text, started, fetched, cleaned, source)
+        results["url"] = url
+        return results, html
+
+    # ========== 整站抓取 ==========
+    def _load_robots(self, url: str) -> RobotFileParser:
+        """获取并解析站点的 robots.txt；不存在或获取失败时视为全部允许"""
+        parts = urlparse(url)
+        robots_url = f"{parts.scheme}://{parts.netloc}/robots.txt"
+        parser = RobotFileParser(robots_url)
+        try:
+            parser.parse(self.http_cache.get(robots_url, timeout=10).text.splitlines())
+        except Exception as e:
+            self._log(f"⚠️ 无法获取 robots.txt ({robots_url}): {e}")
+            parser.parse([])
+        return parser
+
+    def _discover_sitemap_urls(self, seed: str, robots: RobotFileParser, limit: int) -> List[str]:
+        """从 robots.txt 声明的 sitemap（默认 /sitemap.xml）中收集页面URL，支持 sitemap 索引与 .gz"""
+        parts = urlparse(seed)
+        pending = list(robots.site_maps() or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"])
+        visited = set()
+        pages: List[str] = []
+        while pending and len(visited) < 50 and len(pages) < limit:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            try:
+                if sitemap_url.endswith(".gz"):
+                    resp = self.http_cache.session.get(sitemap_url, headers=self.http_cache.default_headers, timeout=30)
+                    resp.raise_for_status()
+                    content = resp.content
+                else:
+                    content = self.http_cache.get(sitemap_url, timeout=30).text.encode("utf-8")
+                page_urls, child_sitemaps = parse_sitemap(content)
+            except Exception as e:
+                self._log(f"⚠️ 无法解析 sitemap ({sitemap_url}): {e}")
+                continue
+            pages.extend(page_urls)
+            pending.extend(child_sitemaps)
+        self._log(f"🗺️ sitemap 发现 {len(pages)} 个URL（解析 {len(visited)} 个 sitemap 文件）")
+        return pages[:limit]
+
+    async def acrawl_site(
+        self,
+        seed: str,
+        max_pages: int = 100,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        schema: Optional[Type[T]] = None,
+        prompt: str = "",
+        formats: List[str] = ["extract"],
+        max_depth: Optional[int] = None,
+        same_host: bool = True,
+        respect_robots: bool = True,
+        use_sitemap: bool = True,
+        state_path: Optional[str] = None,
+        concurrency: int = 5,
+        max_per_domain: int = 2,
+        domain_delay: float = 1.0,
+        extract_concurrency: int = 4,
+        token_budget: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        从种子URL出发抓取整个站点，按完成顺序逐个返回页面结果（异步生成器）
+
+        页面按 scrape_url 的 formats 处理，并从HTML中发现新链接加入队列（广度优先）。
+        提供 state_path 时队列与已见集合持久化到 SQLite，中断后以相同参数再次调用即可继续，
+        max_pages 统计包含之前已处理的页面。
+
+        Args:
+            seed: 种子URL
+            max_pages: 最多处理的页面数
+            include: URL需匹配其中至少一个正则（为空时不限制，种子URL不受限制）
+            exclude: URL匹配其中任一正则时跳过
+            schema / prompt / formats / token_budget: 与 scrape_url 相同
+            max_depth: 距种子URL的最大链接深度（None 不限制）
+            same_host: 是否只抓取与种子URL相同域名的页面
+            respect_robots: 是否遵守 robots.txt（含 Crawl-delay）
+            use_sitemap: 是否从 sitemap 中发现URL
+            state_path: 抓取状态的 SQLite 文件路径，为空时只保存在内存中
+            concurrency / max_per_domain / domain_delay / extract_concurrency: 与 ascrape_many 相同
+
+        Yields:
+            Dict: 与 ascrape_many 相同的结果，并附加 "depth" 字段
+        """
+        seed_url = normalize_url(seed)
+        if seed_url is None:
+            raise ValueError(f"无效的种子URL: {seed}")
+        seed_host = urlparse(seed_url).netloc
+        include_patterns = [re.compile(p) for p in include or []]
+        exclude_patterns = [re.compile(p) for p in exclude or []]
+
+        fetch_semaphore = asyncio.Semaphore(max(1, concurrency))
+        extract_semaphore = asyncio.Semaphore(max(1, extract_concurrency))
+        throttle = DomainThrottle(max_per_domain=max_per_domain, delay=domain_delay)
+        robots: Dict[str, RobotFileParser] = {}
+
+        async def robots_for(url: str) -> RobotFileParser:
+            host = urlparse(url).netloc
+            if host not in robots:
+                robots[host] = await asyncio.to_thread(self._load_robots, url)
+                crawl_delay = robots[host].crawl_delay("*")
+                if crawl_delay and float(crawl_delay) > domain_delay:
+                    throttle.set_delay(host, float(crawl_delay))
+            return robots[host]
+
+        async def in_scope(url: str) -> bool:
+            if same_host and urlparse(url).netloc != seed_host:
+                return False
+            if url != seed_url and include_patterns and not any(p.search(url) for p in include_patterns):
+                return False
+            if any(p.search(url) for p in exclude_patterns):
+                return False
+            if respect_robots and not (await robots_for(url)).can_fetch(DEFAULT_USER_AGENT, url):
+                return False
+            return True
+
+        # 队列操作会读写 SQLite，全部放到线程中执行，不阻塞事件循环中的并发抓取
+        frontier = await asyncio.to_thread(CrawlFrontier, state_path)
+        processed = frontier.stats["done"] + frontier.stats["failed"]
+        if processed:
+            pending = await asyncio.to_thread(frontier.pending_count)
+            self._log(f"♻️ 从上次状态继续: 已处理 {processed} 页，待抓取 {pending} 页")
+
+        async def enqueue(urls: List[str], depth: int) -> int:
+            candidates = [url for url in urls if url not in frontier.seen and await in_scope(url)]
+            if not candidates:
+                return 0
+            return await asyncio.to_thread(frontier.add_many, [(url, depth) for url in candidates])
+
+        async def process(url: str, depth: int) -> Dict[str, Any]:
+            try:
+                results, html = await self._async_scrape_one(
+                    fetch, url, schema, prompt, formats, token_budget,
+                    fetch_semaphore, throttle, extract_semaphore
+                )
+            except Exception as e:
+                self._log(f"❌ 爬取失败 {url}: {e}")
+                await asyncio.to_thread(frontier.done, url, False)
+                return {"url": url, "depth": depth, "error": str(e)}
+
+            if max_depth is None or depth < max_depth:
+                links = await asyncio.to_thread(extract_links, html, url)
+                added = await enqueue(links, depth + 1)
+                if added:
+                    self._log(f"🔗 {url} 发现 {added} 个新链接")
+            await asyncio.to_thread(frontier.done, url)
+            results["depth"] = depth
+            return results
+
+        running: Dict[asyncio.Task, str] = {}
+        try:
+            async with self._async_fetch_session(concurrency) as fetch:
+                await enqueue([seed_url], 0)
+                if use_sitemap and not processed:
+                    robots_parser = await robots_for(seed_url)
+                    sitemap_urls = await asyncio.to_thread(self._discover_sitemap_urls, seed_url, robots_parser, max_pages * 2)
+                    await enqueue([url for url in map(normalize_url, sitemap_urls) if url], 1)
+
+                while True:
+                    while len(running) < max(1, concurrency) and processed + len(running) < max_pages:
+                        item = await asyncio.to_thread(frontier.pop)
+                        if item is None:
+                            break
+                        running[asyncio.create_task(process(*item))] = item[0]
+                    if not running:
+                        break
+                    finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        running.pop(task)
+                        processed += 1
+                        yield task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            self._log(f"📊 抓取状态: {await asyncio.to_thread(frontier.info)}")
+            await asyncio.to_thread(frontier.close)
 
     # ========== 公开方法 ==========
     def scrape_url(
@@ -420,7 +1799,8 @@ Extract data according to the schema. {prompt}"""
         schema: Optional[Type[T]] = None,
         prompt: str = "",
         formats: List[str] = ["extract"],
-        custom_config: Optional[SiteConfig] = None
+        custom_config: Optional[SiteConfig] = None,
+        token_budget: Optional[int] = None
     ):
         """
         爬取URL并提取结构化数据
@@ -431,37 +1811,32 @@ Extract data according to the schema. {prompt}"""
             prompt: 提取提示
             formats: 返回格式
             custom_config: 自定义网站配置（可选）
+            token_budget: 单次LLM提取的页面文本token上限，超过时分块提取（None 时使用客户端设置）
         """
-        print(f"🌐 正在爬取: {url}")
-        print(f"🔧 爬取方法: {'Playwright' if self.use_playwright else 'Requests'}")
+        self._log(f"🌐 正在爬取: {url}")
+        self._log(f"🔧 爬取方法: {'Playwright' if self.use_playwright else 'Requests'}")
         
         # 如果提供了自定义配置，临时使用
         if custom_config:
             original_config = self.site_configs.get(url)
             self.site_configs[url] = custom_config
-            print(f"🎛️ 使用自定义配置: {custom_config.name}")
+            self._log(f"🎛️ 使用自定义配置: {custom_config.name}")
         
         try:
+            started = time.monotonic()
             html = self._fetch_html(url)
+            fetched = time.monotonic()
             text = self._clean_html(html)
+            cleaned = time.monotonic()
             
-            print(f"📄 清理后的文本长度: {len(text)} 字符")
-            print(f"📝 文本:\n{text}")
+            self._log(f"📄 清理后的文本长度: {len(text)} 字符")
+            self._log(f"📝 文本:\n{text}", "debug")
 
-            results = {}
-            if "html" in formats:
-                results["html"] = html
-            if "markdown" in formats:
-                try:
-                    from markdownify import markdownify
-                    results["markdown"] = markdownify(html)
-                except ImportError:
-                    results["markdown"] = text
+            results = self._build_results(html, text, formats)
+            source = None
             if "extract" in formats and schema:
-                print(f"🤖 开始LLM提取...")
-                data = self._extract_with_llm(text, schema, prompt)
-                print(f"✅ LLM提取完成，原始数据: {data}")
-                results["extract"] = schema.model_validate(data)
+                results["extract"], source = self._extract_for_page(url, html, text, schema, prompt, token_budget)
+            self._record_page(url, html, text, started, fetched, cleaned, source)
 
             return results
             
@@ -473,6 +1848,131 @@ Extract data according to the schema. {prompt}"""
                 else:
                     self.site_configs.pop(url, None)
 
+    def scrape_many(
+        self,
+        urls: List[str],
+        schema: Optional[Type[T]] = None,
+        prompt: str = "",
+        formats: List[str] = ["extract"],
+        concurrency: int = 5,
+        max_per_domain: int = 2,
+        domain_delay: float = 1.0,
+        extract_concurrency: int = 4,
+        token_budget: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        并发爬取多个URL，按完成顺序逐个返回结果（同步生成器）
+
+        内部在后台线程中运行 ascrape_many 的事件循环，参数含义与 ascrape_many 相同。
+
+        Usage:
+            for result in client.scrape_many(urls, schema=RepoList, concurrency=8):
+                print(result["url"], result.get("extract"))
+        """
+        return self._iterate_in_thread(lambda: self.ascrape_many(
+            urls, schema=schema, prompt=prompt, formats=formats,
+            concurrency=concurrency, max_per_domain=max_per_domain,
+            domain_delay=domain_delay, extract_concurrency=extract_concurrency,
+            token_budget=token_budget
+        ))
+
+    def crawl_site(
+        self,
+        seed: str,
+        max_pages: int = 100,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        schema: Optional[Type[T]] = None,
+        prompt: str = "",
+        formats: List[str] = ["extract"],
+        **kwargs
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        从种子URL出发抓取整个站点（同步生成器），其余参数见 acrawl_site
+
+        Usage:
+            for page in client.crawl_site("https://docs.example.com", max_pages=200,
+                                          include=[r"/docs/"], formats=["markdown"],
+                                          state_path="./crawl_state.db"):
+                print(page["url"], page["depth"])
+        """
+        return self._iterate_in_thread(lambda: self.acrawl_site(
+            seed, max_pages=max_pages, include=include, exclude=exclude,
+            schema=schema, prompt=prompt, formats=formats, **kwargs
+        ))
+
+    @staticmethod
+    def _iterate_in_thread(make_generator: Callable[[], AsyncIterator[Any]], max_buffer: int = 16) -> Iterator[Any]:
+        """
+        在后台线程的事件循环中消费异步生成器，以同步生成器的形式逐个返回
+
+        最多缓存 max_buffer 个未取走的结果，缓存满时暂停抓取；调用方提前停止迭代（break 或关闭生成器）时
+        取消后台的抓取任务
+        """
+        results: "queue.Queue" = queue.Queue(maxsize=max(1, max_buffer))
+        stop = threading.Event()
+        done = object()
+        running: Dict[str, Any] = {}
+
+        def offer(item) -> bool:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def runner():
+            async def consume():
+                running["loop"] = asyncio.get_running_loop()
+                running["task"] = asyncio.current_task()
+                if stop.is_set():
+                    return
+                generator = make_generator()
+                try:
+                    async for result in generator:
+                        # 不阻塞事件循环：队列满时让出控制权，等调用方取走结果
+                        while True:
+                            try:
+                                results.put_nowait(result)
+                                break
+                            except queue.Full:
+                                if stop.is_set():
+                                    return
+                                await asyncio.sleep(0.05)
+                finally:
+                    await generator.aclose()
+            try:
+                asyncio.run(consume())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                offer(e)
+            finally:
+                offer(done)
+
+        worker = threading.Thread(target=runner, daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = results.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            loop, task = running.get("loop"), running.get("task")
+            if loop is not None and task is not None:
+                try:
+                    loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    # 事件循环已结束
+                    pass
+            worker.join(timeout=5)
+
     def list_site_configs(self):
         """列出所有已配置的网站"""
         print("📋 已配置的网站:")
@@ -482,4 +1982,5 @@ Extract data according to the schema. {prompt}"""
             print(f"    - 等待时间: {config.wait_time}ms")
             print(f"    - 滚动行为: {config.scroll_behavior}")
             print(f"    - 自定义操作: {len(config.custom_actions)}个")
+            print(f"    - 就绪策略: {config.readiness or self.readiness} (静默 {config.quiet_window}ms, 上限 {config.max_ready_time}ms)")
             print()
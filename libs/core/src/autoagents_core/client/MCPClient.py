@@ -1,27 +1,308 @@
+import json
+import time
+import asyncio
+import hashlib
+import anyio
+import httpx
 import mcp
 from mcp.client.streamable_http import streamablehttp_client
-from typing import Dict, List, Any, Optional, Union
-from dataclasses import dataclass
+from mcp.client.stdio import stdio_client, StdioServerParameters
+from mcp.shared.exceptions import McpError
+from contextlib import AsyncExitStack
+from typing import Dict, List, Any, Optional, Union, Callable, Awaitable
+from dataclasses import dataclass, fields, asdict
+from ..utils.disk_cache import DiskCache
 
 @dataclass
 class McpServerConfig:
     """MCP服务器配置"""
     transport: str  # "stdio" 或 "streamable_http"
-    
+
     # streamable_http相关配置
     url: Optional[str] = None
-    
+
     # stdio相关配置
     command: Optional[str] = None
     args: Optional[List[str]] = None
-    
+    env: Optional[Dict[str, str]] = None  # 子进程环境变量，None 时使用 MCP SDK 的默认安全环境
+    cwd: Optional[str] = None
+    pool_size: int = 1  # 常驻子进程数；大于1时并发请求分配到不同进程，不在同一管道上排队
+
+    # 连接相关配置
+    max_concurrency: int = 8  # 同一服务器同时进行的请求数上限（pool_size > 1 时由池内所有连接共享）
+    keepalive_interval: Optional[float] = 30.0  # 空闲时发送 ping 的间隔(秒)，None 不发送
+    connect_timeout: float = 30.0  # 建立连接并完成 initialize 的超时(秒)
+    call_timeout: Optional[float] = None  # 单次工具调用的超时(秒)，None 不限制
+
+
+# 视为连接已断开、需要重连的异常
+CONNECTION_ERRORS = (
+    anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream,
+    ConnectionError, OSError, httpx.TransportError
+)
+
+
+def _is_connection_error(error: BaseException) -> bool:
+    if isinstance(error, CONNECTION_ERRORS):
+        return True
+    return isinstance(error, McpError) and error.error.code == mcp.types.CONNECTION_CLOSED
+
+
+class McpConnection:
+    """
+    单个MCP服务器的长连接
+
+    - 连接在后台任务中建立并保持（传输层的上下文必须在同一任务中进入和退出），调用方共享同一个 ClientSession
+    - 空闲时按 keepalive_interval 发送 ping，失败时关闭连接，下次请求时自动重连
+    - 幂等请求（list_tools、ping 等）因连接断开失败时重连并重试一次；
+      工具调用可能已在服务器上执行，连接断开时只重置连接并抛出异常，不自动重试
+    - 用 Semaphore 限制同时进行的请求数
+    - 事件循环变化（例如多次 asyncio.run）时丢弃旧连接并在新的事件循环中重建
+    """
+
+    def __init__(self, name: str, config: McpServerConfig, message_handler: Optional[Callable[..., Awaitable[None]]] = None):
+        self.name = name
+        self.config = config
+        self.message_handler = message_handler
+        self.stats = {"connects": 0, "reconnects": 0, "requests": 0, "failures": 0}
+        self.in_flight = 0  # 进行中（含排队）的请求数，用于连接池分配
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[mcp.ClientSession] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._error: Optional[BaseException] = None
+
+    def _bind_loop(self):
+        """首次使用或事件循环变化时，创建绑定到当前事件循环的同步原语"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._task = None
+        self._session = None
+        self._semaphore = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        self._connect_lock = asyncio.Lock()
+
+    async def _open_transport(self, stack: AsyncExitStack):
+        """打开传输层，返回 (read_stream, write_stream)"""
+        if self.config.transport == "streamable_http":
+            if not self.config.url:
+                raise ValueError(f"HTTP server {self.name} missing URL")
+            read_stream, write_stream, _ = await stack.enter_async_context(streamablehttp_client(self.config.url))
+            return read_stream, write_stream
+        elif self.config.transport == "stdio":
+            if not self.config.command:
+                raise ValueError(f"stdio server {self.name} missing command")
+            params = StdioServerParameters(
+                command=self.config.command,
+                args=self.config.args or [],
+                env=self.config.env,
+                cwd=self.config.cwd
+            )
+            read_stream, write_stream = await stack.enter_async_context(stdio_client(params))
+            return read_stream, write_stream
+        raise ValueError(f"不支持的transport类型: {self.config.transport}")
+
+    async def _run(self):
+        """后台任务：建立连接，保持到关闭或 keepalive 失败"""
+        try:
+            async with AsyncExitStack() as stack:
+                read_stream, write_stream = await self._open_transport(stack)
+                session = await stack.enter_async_context(
+                    mcp.ClientSession(read_stream, write_stream, message_handler=self.message_handler)
+                )
+                await session.initialize()
+                self._session = session
+                self._error = None
+                self._ready.set()
+                await self._keepalive(session)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._session = None
+            self._ready.set()
+
+    async def _keepalive(self, session: mcp.ClientSession):
+        interval = self.config.keepalive_interval
+        while True:
+            try:
+                await asyncio.wait_for(self._closing.wait(), timeout=interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await asyncio.wait_for(session.send_ping(), timeout=self.config.connect_timeout)
+            except Exception as e:
+                print(f"⚠️ MCP服务器 {self.name} keepalive 失败，将在下次请求时重连: {e}")
+                return
+
+    async def session(self) -> mcp.ClientSession:
+        """返回可用的会话，未连接或连接已断开时建立新连接"""
+        self._bind_loop()
+        async with self._connect_lock:
+            if self._session is not None and self._task is not None and not self._task.done():
+                return self._session
+
+            if self._task is not None:
+                await self._stop_task()
+            if self.stats["connects"]:
+                self.stats["reconnects"] += 1
+            print(f"连接到MCP服务器: {self.name} ({self.config.url or self.config.command})")
+            self._ready = asyncio.Event()
+            self._closing = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=self.config.connect_timeout)
+            except asyncio.TimeoutError:
+                await self._stop_task()
+                raise TimeoutError(f"连接MCP服务器 {self.name} 超时 ({self.config.connect_timeout}s)")
+            if self._session is None:
+                raise ConnectionError(f"连接MCP服务器 {self.name} 失败: {self._error}") from self._error
+            self.stats["connects"] += 1
+            return self._session
+
+    async def request(self, operation: Callable[[mcp.ClientSession], Awaitable[Any]], timeout: Optional[float] = None,
+                      retry: bool = True) -> Any:
+        """
+        在共享会话上执行请求；因连接断开失败时重置连接，retry 为 True 时重连并重试一次
+
+        Args:
+            operation: 接收 ClientSession 的协程函数
+            timeout: 请求超时(秒)
+            retry: 请求是否可以安全地重复执行（非幂等的请求如 call_tool 应传 False）
+        """
+        self._bind_loop()
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                return await self._request(operation, timeout, retry)
+        finally:
+            self.in_flight -= 1
+
+    async def _request(self, operation: Callable[[mcp.ClientSession], Awaitable[Any]], timeout: Optional[float],
+                       retry: bool) -> Any:
+        self.stats["requests"] += 1
+        for attempt in range(2):
+            try:
+                session = await self.session()
+            except Exception:
+                self.stats["failures"] += 1
+                raise
+            try:
+                return await asyncio.wait_for(operation(session), timeout=timeout)
+            except Exception as e:
+                if _is_connection_error(e):
+                    await self.reset(session)
+                    if retry and attempt == 0:
+                        print(f"⚠️ MCP服务器 {self.name} 连接断开，重连后重试: {e}")
+                        continue
+                    if not retry:
+                        print(f"⚠️ MCP服务器 {self.name} 连接断开，请求可能已执行，不自动重试: {e}")
+                self.stats["failures"] += 1
+                raise
+
+    async def _stop_task(self):
+        task, self._task = self._task, None
+        self._session = None
+        if task is None or task.done():
+            return
+        if self._closing is not None:
+            self._closing.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=5)
+        except (asyncio.TimeoutError, Exception):
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def reset(self, session: Optional[mcp.ClientSession] = None):
+        """关闭当前连接，下次请求时重新连接；指定 session 时只有它仍是当前会话才关闭（避免关掉其他请求刚重建的连接）"""
+        self._bind_loop()
+        async with self._connect_lock:
+            if session is not None and self._session is not None and self._session is not session:
+                return
+            await self._stop_task()
+
+    async def close(self):
+        if self._loop is not asyncio.get_running_loop():
+            # 创建连接的事件循环已结束，无需（也无法）关闭
+            self._task = None
+            self._session = None
+            return
+        await self.reset()
+
+
+class McpConnectionPool:
+    """
+    同一服务器的一组连接，请求分配给进行中请求最少的连接
+
+    stdio 服务器的每个连接对应一个常驻子进程，pool_size > 1 时并发调用不会在同一管道上排队；
+    子进程崩溃后对应连接在下次请求时自动重启。max_concurrency 限制整个池同时进行的请求数
+    """
+
+    def __init__(self, name: str, config: McpServerConfig, size: int = 1,
+                 message_handler: Optional[Callable[..., Awaitable[None]]] = None):
+        self.name = name
+        self.config = config
+        size = max(1, size)
+        self.workers = [
+            McpConnection(name if size == 1 else f"{name}#{i}", config, message_handler)
+            for i in range(size)
+        ]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for worker in self.workers:
+            for key, value in worker.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        totals["workers"] = len(self.workers)
+        return totals
+
+    async def request(self, operation: Callable[[mcp.ClientSession], Awaitable[Any]], timeout: Optional[float] = None,
+                      retry: bool = True) -> Any:
+        if len(self.workers) == 1:
+            return await self.workers[0].request(operation, timeout, retry)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(max(1, self.config.max_concurrency))
+        # 先占用池的名额再选择连接，各连接自身的信号量不会再成为限制
+        async with self._semaphore:
+            worker = min(self.workers, key=lambda w: w.in_flight)
+            return await worker.request(operation, timeout, retry)
+
+    async def warm_up(self):
+        """提前建立所有连接（启动全部子进程）"""
+        await asyncio.gather(*(worker.session() for worker in self.workers))
+
+    async def close(self):
+        await asyncio.gather(*(worker.close() for worker in self.workers), return_exceptions=True)
 
 
 class MCPClient:
-    def __init__(self, servers_config: Dict[str, Union[Dict[str, Any], McpServerConfig]]):
+    def __init__(
+        self,
+        servers_config: Dict[str, Union[Dict[str, Any], McpServerConfig]],
+        discovery_timeout: float = 10.0,
+        catalog_ttl: Optional[float] = 300.0,
+        catalog_path: Optional[str] = None
+    ):
         """
         初始化MCP客户端
-        
+
+        每个服务器保持一个长连接，在多次 get_tools / call_tool 之间复用；
+        推荐以 `async with MCPClient(...) as client:` 使用，退出时关闭所有连接。
+
+        工具目录按服务器缓存 catalog_ttl 秒，收到服务器的 tools/list_changed 通知时立即失效。
+        提供 catalog_path 时目录持久化到磁盘：启动时直接使用上次的目录，过期的目录先返回、
+        再在后台刷新，因此 get_tools 不必等待所有服务器完成握手。
+
         Args:
             servers_config: 服务器配置字典，格式为:
             {
@@ -30,14 +311,17 @@ class MCPClient:
                     "url": "http://localhost:8000/mcp"
                 },
                 "another_server": {
-                    "transport": "stdio", 
+                    "transport": "stdio",
                     "command": "python",
                     "args": ["/path/to/server.py"]
                 }
             }
+            discovery_timeout: 单个服务器获取工具列表的超时(秒)，超时的服务器使用旧目录或被跳过
+            catalog_ttl: 工具目录的缓存时间(秒)，None 表示一直有效（直到 list_changed 通知）
+            catalog_path: 工具目录持久化的 SQLite 文件路径，为空时只缓存在内存中
         """
         self.servers_config = {}
-        
+
         # 转换配置为McpServerConfig对象
         for name, config in servers_config.items():
             if isinstance(config, McpServerConfig):
@@ -45,85 +329,201 @@ class MCPClient:
                 self.servers_config[name] = config
             else:
                 # 如果是字典，转换为McpServerConfig对象
-                self.servers_config[name] = McpServerConfig(
-                    transport=config.get("transport"),
-                    command=config.get("command"),
-                    args=config.get("args"),
-                    url=config.get("url")
-                )
-    
-    async def get_tools(self) -> List[Any]:
+                known = {f.name for f in fields(McpServerConfig)}
+                self.servers_config[name] = McpServerConfig(**{k: v for k, v in config.items() if k in known})
+
+        self._connections: Dict[str, McpConnectionPool] = {}
+        self.discovery_timeout = discovery_timeout
+        self.catalog_ttl = catalog_ttl
+        self._catalog: Dict[str, Dict[str, Any]] = {}  # 服务器名 -> {"tools": [...], "fetched_at": 时间戳}
+        self._catalog_store = DiskCache(path=catalog_path, ttl=None) if catalog_path else None
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+
+    def _connection(self, server_name: str) -> McpConnectionPool:
+        if server_name not in self.servers_config:
+            raise ValueError(f"未找到服务器: {server_name}")
+        if server_name not in self._connections:
+            config = self.servers_config[server_name]
+            # HTTP 连接本身支持并发请求，只有 stdio 需要多个子进程
+            size = config.pool_size if config.transport == "stdio" else 1
+            self._connections[server_name] = McpConnectionPool(
+                server_name, config, size,
+                message_handler=lambda message: self._on_server_message(server_name, message)
+            )
+        return self._connections[server_name]
+
+    async def _on_server_message(self, server_name: str, message: Any):
+        """处理服务器推送的消息：tools/list_changed 时使该服务器的工具目录失效"""
+        if isinstance(message, mcp.types.ServerNotification) and \
+                isinstance(message.root, mcp.types.ToolListChangedNotification):
+            print(f"🔄 MCP服务器 {server_name} 的工具列表已变化，刷新工具目录")
+            self.invalidate_catalog(server_name)
+
+    # ========== 工具目录 ==========
+    def _catalog_key(self, server_name: str) -> str:
+        config = asdict(self.servers_config[server_name])
+        identity = {k: config.get(k) for k in ("transport", "url", "command", "args", "cwd")}
+        digest = hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        return f"mcp_catalog:{server_name}:{digest}"
+
+    def _cached_catalog(self, server_name: str) -> Optional[Dict[str, Any]]:
+        entry = self._catalog.get(server_name)
+        if entry is None and self._catalog_store is not None:
+            entry = self._catalog_store.get(self._catalog_key(server_name))
+            if entry is not None:
+                self._catalog[server_name] = entry
+        return entry
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return self.catalog_ttl is None or time.time() - entry["fetched_at"] < self.catalog_ttl
+
+    def invalidate_catalog(self, server_name: Optional[str] = None):
+        """使工具目录失效（server_name 为空时全部失效），下次 get_tools 时重新获取"""
+        names = [server_name] if server_name else list(self.servers_config)
+        for name in names:
+            self._catalog.pop(name, None)
+            if self._catalog_store is not None and name in self.servers_config:
+                self._catalog_store.delete(self._catalog_key(name))
+
+    async def _fetch_catalog(self, server_name: str) -> Dict[str, Any]:
+        """从服务器获取完整的工具列表（处理分页）并写入缓存"""
+        connection = self._connection(server_name)
+        tools: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            result = await connection.request(
+                lambda session: session.list_tools(cursor=cursor),
+                timeout=self.discovery_timeout
+            )
+            tools.extend(
+                {"name": tool.name, "description": tool.description, "inputSchema": tool.inputSchema}
+                for tool in result.tools
+            )
+            cursor = result.nextCursor
+            if not cursor:
+                break
+
+        entry = {"tools": tools, "fetched_at": time.time()}
+        self._catalog[server_name] = entry
+        if self._catalog_store is not None:
+            self._catalog_store.set(self._catalog_key(server_name), entry)
+        return entry
+
+    def _refresh_in_background(self, server_name: str):
+        task = self._refresh_tasks.get(server_name)
+        if task is not None and not task.done():
+            return
+
+        async def refresh():
+            try:
+                await self._fetch_catalog(server_name)
+            except Exception as e:
+                print(f"⚠️ 后台刷新服务器 {server_name} 的工具目录失败: {e}")
+
+        self._refresh_tasks[server_name] = asyncio.create_task(refresh())
+
+    async def _server_tools(self, server_name: str, refresh: bool) -> List[Dict[str, Any]]:
+        cached = None if refresh else self._cached_catalog(server_name)
+        if cached is not None:
+            if not self._is_fresh(cached):
+                # 先返回旧目录，后台刷新
+                self._refresh_in_background(server_name)
+            return cached["tools"]
+
+        try:
+            return (await asyncio.wait_for(self._fetch_catalog(server_name), timeout=self.discovery_timeout))["tools"]
+        except Exception as e:
+            stale = self._catalog.get(server_name)
+            if stale is not None:
+                print(f"⚠️ 获取服务器 {server_name} 的工具列表失败，使用缓存的目录: {e}")
+                return stale["tools"]
+            raise
+
+    async def warm_up(self, server_names: Optional[List[str]] = None):
+        """
+        提前连接服务器（stdio 服务器会启动全部常驻子进程），避免首次调用时等待握手
+
+        Args:
+            server_names: 要预热的服务器，None 表示全部
+        """
+        names = server_names or list(self.servers_config)
+        results = await asyncio.gather(*(self._connection(name).warm_up() for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                print(f"连接到服务器 {name} 失败: {result}")
+
+    async def get_tools(self, refresh: bool = False) -> List[Any]:
         """
-        获取所有MCP服务器的工具列表
-        
+        并发获取所有MCP服务器的工具列表（优先使用缓存的工具目录）
+
+        Args:
+            refresh: 是否忽略缓存，重新从所有服务器获取
+
         Returns:
             List[Any]: 所有可用工具的列表
         """
+        names = list(self.servers_config)
+        results = await asyncio.gather(
+            *(self._server_tools(name, refresh) for name in names),
+            return_exceptions=True
+        )
+
         all_tools = []
-        
-        for server_name, config in self.servers_config.items():
-            try:
-                if config.transport == "streamable_http":
-                    if not config.url:
-                        raise ValueError(f"HTTP server {server_name} missing URL")
-                    
-                    print(f"连接到MCP服务器: {server_name} ({config.url})")
-
-                    async with streamablehttp_client(config.url) as (read_stream, write_stream, _):
-                        async with mcp.ClientSession(read_stream, write_stream) as session:
-                            await session.initialize()
-                            tools_result = await session.list_tools()
-                            
-                            for tool in tools_result.tools:
-                                tool_dict = {
-                                    "name": tool.name,
-                                    "description": tool.description,
-                                    "inputSchema": tool.inputSchema,
-                                    "server_name": server_name,  # 添加服务器名称用于后续调用
-                                    "server_config": config     # 添加服务器配置用于后续调用
-                                }
-                                all_tools.append(tool_dict)
-                                
-                elif config.transport == "stdio":
-                    print(f"暂不支持stdio transport for server: {server_name}")
-                    # TODO: 实现stdio连接
-                    pass
-                else:
-                    print(f"不支持的transport类型: {config.transport} for server: {server_name}")
-            except Exception as e:
-                print(f"连接到服务器 {server_name} 失败: {e}")
+        for server_name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.TimeoutError):
+                    result = f"超过 {self.discovery_timeout}s 未响应"
+                print(f"连接到服务器 {server_name} 失败: {result}")
                 continue
-        
+            config = self.servers_config[server_name]
+            for tool in result:
+                all_tools.append({
+                    **tool,
+                    "server_name": server_name,  # 添加服务器名称用于后续调用
+                    "server_config": config     # 添加服务器配置用于后续调用
+                })
+
         return all_tools
 
     async def call_tool(self, tool_name: str, server_name: str, arguments: Dict[str, Any]) -> Any:
         """
-        调用指定服务器的工具
-        
+        调用指定服务器的工具（复用该服务器的长连接）
+
+        工具调用可能有副作用，连接在调用过程中断开时不会自动重试，连接会在下次请求时重建
+
         Args:
             tool_name: 工具名称
-            server_name: 服务器名称  
+            server_name: 服务器名称
             arguments: 工具参数
-            
+
         Returns:
             Any: 工具执行结果
         """
-        if server_name not in self.servers_config:
-            raise ValueError(f"未找到服务器: {server_name}")
-        
-        config = self.servers_config[server_name]
-        
-        if config.transport == "streamable_http":
-            if not config.url:
-                raise ValueError("HTTP server missing URL")
-            
-            async with streamablehttp_client(config.url) as (read_stream, write_stream, _):
-                async with mcp.ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    result = await session.call_tool(tool_name, arguments)
-                    return result
-                    
-        elif config.transport == "stdio":
-            raise NotImplementedError("stdio transport 暂未实现")
-        else:
-            raise ValueError(f"不支持的transport类型: {config.transport}")
+        connection = self._connection(server_name)
+        return await connection.request(
+            lambda session: session.call_tool(tool_name, arguments),
+            timeout=connection.config.call_timeout,
+            retry=False
+        )
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """各服务器的连接、重连（stdio 下即子进程重启）、请求与失败次数"""
+        return {name: dict(connection.stats) for name, connection in self._connections.items()}
+
+    async def aclose(self):
+        """关闭所有服务器连接与工具目录存储"""
+        for task in self._refresh_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._refresh_tasks.values(), return_exceptions=True)
+        self._refresh_tasks.clear()
+        await asyncio.gather(*(c.close() for c in self._connections.values()), return_exceptions=True)
+        self._connections.clear()
+        if self._catalog_store is not None:
+            self._catalog_store.close()
+            self._catalog_store = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
@@ -2,9 +2,10 @@ from .ChatClient import ChatClient
 from .KbClient import KbClient
 from .MCPClient import MCPClient
 from .CrawlClient import CrawlClient
+from .AsyncCrawlClient import AsyncCrawlClient
 from .SupabaseClient import SupabaseClient
 
-__all__ = ["ChatClient", "KbClient", "MCPClient", "SupabaseClient", "CrawlClient"]
+__all__ = ["ChatClient", "KbClient", "MCPClient", "SupabaseClient", "CrawlClient", "AsyncCrawlClient"]
 
 
 def main() -> None:
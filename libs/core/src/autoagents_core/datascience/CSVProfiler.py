@@ -0,0 +1,320 @@
+import os
+import math
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+# 统计行数时每次读取的字节数
+LINE_SCAN_BLOCK = 8 * 1024 * 1024
+
+# pyarrow 流式读取时单块原始数据的上限
+MAX_BLOCK_SIZE = 64 * 1024 * 1024
+
+# top_sample / freq_sample 只基于样本行统计，其余各行覆盖已扫描的全部数据；
+# invalid 为数值列中无法转换为数字的值的个数（count + null + invalid 等于扫描行数）
+DESCRIBE_ROWS = ["count", "null", "invalid", "unique", "top_sample", "freq_sample", "mean", "std", "min", "max"]
+
+
+def count_rows(path: str, deadline: Optional[float] = None) -> Tuple[int, bool]:
+    """
+    按换行符统计数据行数（不解析CSV，减去表头一行）
+
+    Returns:
+        (行数, 是否读完整个文件)；到达 deadline 时按已读部分的平均行长外推
+    """
+    size = os.path.getsize(path)
+    lines = 0
+    read = 0
+    last = b"\n"
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            block = f.read(LINE_SCAN_BLOCK)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            read += len(block)
+            last = block[-1:]
+            if deadline is not None and read < size and time.monotonic() >= deadline:
+                return max(0, int(lines * size / read) - 1), False
+    if read and last != b"\n":
+        lines += 1
+    return max(0, lines - 1), True
+
+
+def sample_row_bytes(path: str, sample_bytes: int = 1 << 20) -> int:
+    """按文件开头 sample_bytes 字节估算的平均每行字节数"""
+    with open(path, "rb") as f:
+        data = f.read(sample_bytes)
+    return max(1, len(data) // max(1, data.count(b"\n")))
+
+
+class DistinctSketch:
+    """
+    KMV（k个最小哈希值）基数估计
+
+    只保留 k 个 64 位哈希，内存固定；不同值少于 k 个时结果精确，否则相对误差约 1/sqrt(k)
+    """
+
+    def __init__(self, k: int = 2048):
+        self.k = k
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def update(self, values: pd.Series):
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        if len(self.hashes) >= self.k:
+            hashes = hashes[hashes < self.hashes[-1]]
+        if len(hashes):
+            self.hashes = np.unique(np.concatenate([self.hashes, hashes]))[:self.k]
+
+    @property
+    def exact(self) -> bool:
+        return len(self.hashes) < self.k
+
+    def estimate(self) -> int:
+        if self.exact:
+            return len(self.hashes)
+        return int((self.k - 1) / (float(self.hashes[-1]) / 2.0 ** 64))
+
+
+class ColumnStats:
+    """单列的流式统计：空值数、近似不同值数，数值列另有无效值数与均值/标准差/最值（分块合并）"""
+
+    def __init__(self, numeric: bool, distinct_k: int):
+        self.numeric = numeric
+        self.nulls = 0
+        self.invalid = 0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.distinct = DistinctSketch(distinct_k)
+
+    def update(self, values: pd.Series):
+        self.nulls += int(values.isna().sum())
+        values = values.dropna()
+        if self.numeric:
+            # 分块推断的类型可能不同（如某块中混入文本），统一转成浮点数再统计，无法转换的值单独计数
+            converted = pd.to_numeric(values, errors="coerce")
+            self.invalid += int(converted.isna().sum())
+            values = converted.dropna().astype("float64")
+            self._update_moments(values.to_numpy())
+        else:
+            values = values.astype(str)
+            self.count += len(values)
+        self.distinct.update(values)
+
+    def _update_moments(self, array: np.ndarray):
+        n = len(array)
+        if not n:
+            return
+        mean = float(array.mean())
+        m2 = float(((array - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, float(array.min()))
+        self.max = max(self.max, float(array.max()))
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else math.nan
+
+
+@dataclass
+class CSVProfile:
+    """CSV文件概况，字段与 DSAgent.get_csv_info 的返回值对应"""
+    path: str
+    columns: List[str]
+    dtypes: pd.Series          # 基于前 sample_rows 行推断
+    rows: int
+    rows_source: str           # "scan" 完整解析计数 / "lines" 按换行符计数 / "estimate" 按字节外推
+    head: pd.DataFrame
+    describe: pd.DataFrame     # unique 超过 distinct_k 时为估计值，top_sample/freq_sample 只来自样本
+    sample_rows: int
+    scanned_rows: int
+    complete: bool             # 统计是否覆盖了全部数据
+    engine: str
+    elapsed: float
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.rows, len(self.columns)
+
+
+class CSVProfiler:
+    """
+    大CSV文件的快速概况
+
+    - 只完整读取前 sample_rows 行，用于推断类型、预览数据和类别列的 top_sample/freq_sample
+    - 行数先按换行符快速统计，不解析CSV
+    - 之后分块（或使用 pyarrow 流式读取）计算空值数、近似不同值数与数值列的均值/标准差/最值，
+      每块的大小按 memory_budget_mb 计算
+    - 到达 time_budget 后停止，统计基于已读取的部分（complete=False）
+
+    Usage:
+        profile = CSVProfiler(time_budget=5).profile("big.csv")
+        print(profile.shape, profile.describe)
+    """
+
+    def __init__(
+        self,
+        sample_rows: int = 10000,
+        time_budget: Optional[float] = 10.0,
+        memory_budget_mb: Optional[int] = 256,
+        chunk_rows: int = 200000,
+        engine: str = "auto",
+        distinct_k: int = 2048
+    ):
+        """
+        Args:
+            sample_rows: 样本行数
+            time_budget: 总时间预算(秒)，其中最多一半用于统计行数；None 表示读完整个文件
+            memory_budget_mb: 分块读取时单块数据的内存预算(MB)，None 表示只按 chunk_rows 分块
+            chunk_rows: 每块最多行数
+            engine: "auto"（安装了 pyarrow 时使用 pyarrow）、"pyarrow" 或 "pandas"
+            distinct_k: 近似不同值计数保留的哈希数，越大越精确
+        """
+        if engine not in ("auto", "pyarrow", "pandas"):
+            raise ValueError(f"engine 必须是 'auto'、'pyarrow' 或 'pandas': {engine}")
+        if engine == "pyarrow" and not PYARROW_AVAILABLE:
+            raise ImportError("engine='pyarrow' 需要安装 pyarrow: pip install pyarrow")
+        self.sample_rows = max(1, sample_rows)
+        self.time_budget = time_budget
+        self.memory_budget_mb = memory_budget_mb
+        self.chunk_rows = max(1, chunk_rows)
+        self.engine = "pyarrow" if engine == "auto" and PYARROW_AVAILABLE else ("pandas" if engine == "auto" else engine)
+        self.distinct_k = distinct_k
+
+    def profile(self, path: str) -> CSVProfile:
+        started = time.monotonic()
+        deadline = started + self.time_budget if self.time_budget is not None else None
+
+        sample = pd.read_csv(path, nrows=self.sample_rows)
+        columns = sample.columns.tolist()
+        numeric = {
+            column for column in columns
+            if pd.api.types.is_numeric_dtype(sample[column]) and not pd.api.types.is_bool_dtype(sample[column])
+        }
+
+        if len(sample) < self.sample_rows:
+            # 样本已是全部数据
+            stats = self._new_stats(columns, numeric)
+            self._update(stats, sample, columns)
+            rows, rows_source, scanned, complete, engine = len(sample), "scan", len(sample), True, "pandas"
+        else:
+            line_deadline = started + self.time_budget / 2 if self.time_budget is not None else None
+            rows, counted = count_rows(path, line_deadline)
+            rows_source = "lines" if counted else "estimate"
+
+            engine = self.engine
+            stats = self._new_stats(columns, numeric)
+            try:
+                scanned, complete = self._scan(path, engine, sample, columns, stats, deadline)
+            except ValueError as e:
+                if engine != "pyarrow":
+                    raise
+                # pyarrow 按首块推断列类型，后续数据类型不一致时会报错
+                print(f"⚠️ pyarrow 读取失败，改用 pandas 分块读取: {e}")
+                engine = "pandas"
+                stats = self._new_stats(columns, numeric)
+                scanned, complete = self._scan(path, engine, sample, columns, stats, deadline)
+            if complete:
+                rows, rows_source = scanned, "scan"
+
+        return CSVProfile(
+            path=path,
+            columns=columns,
+            dtypes=sample.dtypes,
+            rows=rows,
+            rows_source=rows_source,
+            head=sample.head(),
+            describe=self._describe(sample, columns, stats),
+            sample_rows=len(sample),
+            scanned_rows=scanned,
+            complete=complete,
+            engine=engine,
+            elapsed=time.monotonic() - started
+        )
+
+    def _new_stats(self, columns: List[str], numeric: set) -> Dict[str, ColumnStats]:
+        return {column: ColumnStats(column in numeric, self.distinct_k) for column in columns}
+
+    @staticmethod
+    def _update(stats: Dict[str, ColumnStats], chunk: pd.DataFrame, columns: List[str]):
+        if len(chunk.columns) == len(columns):
+            chunk.columns = columns
+        for column in columns:
+            if column in chunk:
+                stats[column].update(chunk[column])
+
+    def _scan(
+        self,
+        path: str,
+        engine: str,
+        sample: pd.DataFrame,
+        columns: List[str],
+        stats: Dict[str, ColumnStats],
+        deadline: Optional[float]
+    ) -> Tuple[int, bool]:
+        """分块读取并更新统计，返回 (已读取行数, 是否读完)"""
+        scanned = 0
+        for chunk in self._iter_chunks(path, engine, sample):
+            self._update(stats, chunk, columns)
+            scanned += len(chunk)
+            if deadline is not None and time.monotonic() >= deadline:
+                return scanned, False
+        return scanned, True
+
+    def _iter_chunks(self, path: str, engine: str, sample: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        # 按样本的平均每行内存估算块大小，解析时的临时内存按两倍计
+        row_bytes = max(1, int(sample.memory_usage(deep=True).sum() / max(1, len(sample))))
+        chunk_rows = self.chunk_rows
+        if self.memory_budget_mb:
+            chunk_rows = max(1000, min(chunk_rows, self.memory_budget_mb * 1024 * 1024 // (2 * row_bytes)))
+
+        if engine == "pyarrow":
+            # 块大小按原始字节计，同样受内存预算限制
+            max_block = MAX_BLOCK_SIZE
+            if self.memory_budget_mb:
+                max_block = min(max_block, self.memory_budget_mb * 1024 * 1024 // 2)
+            block_size = max(1 << 20, min(max_block, chunk_rows * sample_row_bytes(path)))
+            reader = pa_csv.open_csv(path, read_options=pa_csv.ReadOptions(block_size=block_size))
+            for batch in reader:
+                yield batch.to_pandas()
+        else:
+            with pd.read_csv(path, chunksize=chunk_rows, low_memory=False) as reader:
+                for chunk in reader:
+                    yield chunk
+
+    def _describe(self, sample: pd.DataFrame, columns: List[str], stats: Dict[str, ColumnStats]) -> pd.DataFrame:
+        data: Dict[str, Dict[str, Any]] = {}
+        for column in columns:
+            column_stats = stats[column]
+            values: Dict[str, Any] = {
+                "count": column_stats.count,
+                "null": column_stats.nulls,
+                "invalid": column_stats.invalid if column_stats.numeric else None,
+                "unique": column_stats.distinct.estimate()
+            }
+            if column_stats.numeric and column_stats.count:
+                values.update(mean=column_stats.mean, std=column_stats.std, min=column_stats.min, max=column_stats.max)
+            elif not column_stats.numeric:
+                counts = sample[column].value_counts()
+                if not counts.empty:
+                    values.update(top_sample=counts.index[0], freq_sample=int(counts.iloc[0]))
+            data[column] = values
+        return pd.DataFrame(data, index=DESCRIBE_ROWS, columns=columns, dtype=object)
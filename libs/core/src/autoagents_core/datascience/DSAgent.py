@@ -1,22 +1,87 @@
 from ..client import ChatClient
 from ..utils.extractor import extract_python_code
-from ..sandbox import LocalSandboxService
+from ..sandbox import LocalSandboxService, SandboxExecutor
+from .CSVProfiler import CSVProfiler
+from typing import Optional
 import pandas as pd
+import os
+
+
+def _is_local_file(file_path) -> bool:
+    """是否为本地文件路径（pd.read_csv 也接受URL与文件对象，这些输入不能按本地文件处理）"""
+    return isinstance(file_path, (str, os.PathLike)) and os.path.isfile(file_path)
 
-class DSAgent:
-    def __init__(self):
-        self.sandbox = LocalSandboxService()
 
-    def get_csv_info(self, file_path: str):
-        """获取CSV文件的列名、数据类型、数据形状、前5行数据、描述性统计"""
+class DSAgent:
+    def __init__(
+        self,
+        executor: Optional[SandboxExecutor] = None,
+        timeout: Optional[float] = None,
+        figures: str = "file",
+        figure_dpi: Optional[int] = None,
+        profiler: Optional[CSVProfiler] = None,
+        profile_threshold_mb: Optional[float] = 100
+    ):
+        """
+        Args:
+            executor: 多个 DSAgent 共享的 SandboxExecutor，代码按租户公平排队执行；默认使用独立的本地沙箱
+            timeout: 生成代码的执行超时(秒)，默认使用沙箱设置
+            figures: "file" 图表保存在执行的工作目录中；"memory" 图表以字节形式返回在 artifacts 中，不写文件
+            figure_dpi: 图表最大DPI（交互使用时可设为 72~100 以加快出图），None 表示按代码中的设置
+            profiler: 大文件使用的 CSVProfiler（抽样 + 分块统计，受时间/内存预算限制），默认 CSVProfiler()
+            profile_threshold_mb: 文件超过该大小(MB)时 get_csv_info 自动使用 profiler，None 表示不自动使用
+        """
+        self.executor = executor
+        self.sandbox = executor.sandbox if executor else LocalSandboxService()
+        self.timeout = timeout
+        self.figures = figures
+        self.figure_dpi = figure_dpi
+        self.profiler = profiler or CSVProfiler()
+        self.profile_threshold_mb = profile_threshold_mb
+
+    def get_csv_info(self, file_path: str, profile: Optional[bool] = None):
+        """
+        获取CSV文件的列名、数据类型、数据形状、前5行数据、描述性统计
+
+        profile 为 True 时使用 self.profiler 快速生成概况（类型基于样本推断，行数与统计可能是近似值），
+        为 None 时文件超过 profile_threshold_mb 才使用；profiler 只支持本地文件，URL 等输入直接用 pandas 读取
+        """
+        local = _is_local_file(file_path)
+        if profile is None:
+            profile = local and self.profile_threshold_mb is not None and \
+                os.path.getsize(file_path) >= self.profile_threshold_mb * 1024 * 1024
+        elif profile and not local:
+            print(f"⚠️ CSV概况只支持本地文件，改用 pandas 完整读取: {file_path}")
+            profile = False
+        if profile:
+            result = self.profiler.profile(file_path)
+            if not result.complete:
+                print(f"⏱️ CSV概况在预算内只统计了 {result.scanned_rows}/{result.rows} 行")
+            return result.columns, result.dtypes, result.shape, result.head, result.describe
         df = pd.read_csv(file_path)
         return df.columns.tolist(), df.dtypes, df.shape, df.head(), df.describe(include='all')
 
-    def analyze_csv(self, user_query: str, file_path: str, verbose: bool = False):
-        """使用AI生成代码并分析CSV数据"""
+    @staticmethod
+    def _print_execution_result(result):
+        """打印执行结果：输出与生成文件的名称和大小（artifacts 可能包含图表字节，不直接打印）"""
+        if not isinstance(result, dict):
+            print(f"Execution result:\n{result}")
+            return
+        status = "成功" if result.get("success") else ("超时" if result.get("timed_out") else "失败")
+        print(f"Execution result: {status} (returncode={result.get('returncode')}, {result.get('duration', 0):.2f}s)")
+        if result.get("stdout"):
+            print(f"stdout:\n{result['stdout']}")
+        if result.get("stderr"):
+            print(f"stderr:\n{result['stderr']}")
+        for artifact in result.get("artifacts") or []:
+            print(f"📎 {artifact.get('name')} ({artifact.get('size', 0)} bytes)")
+
+    def analyze_csv(self, user_query: str, file_path: str, verbose: bool = False, tenant: str = "default"):
+        """使用AI生成代码并分析CSV数据，tenant 为使用 executor 时的租户（用户）标识"""
         columns, dtypes, shape, head, describe = self.get_csv_info(file_path)
 
-        dataset_path = file_path
+        # 代码在沙箱的临时工作目录中执行，本地文件需使用绝对路径；URL 原样传入
+        dataset_path = os.path.abspath(file_path) if _is_local_file(file_path) else file_path
         # 构建优化的分析提示词
         prompt = f"""
 你是一位专业的数据科学家，需要编写完整的Python代码来分析CSV数据。
@@ -165,9 +230,19 @@ print(f"\\n✅ 分析完成，共生成 {{chart_count}} 张图表")
 
             try:
                 # 执行代码
-                execution_result = self.sandbox.run_code(content)
-
-                print(f"Execution result:\n{execution_result}")
+                run_options = {
+                    "timeout": self.timeout,
+                    "figures": self.figures,
+                    "figure_dpi": self.figure_dpi,
+                    # verbose 时边执行边打印输出
+                    "on_output": (lambda stream, text: print(text, end='', flush=True)) if verbose else None
+                }
+                if self.executor:
+                    execution_result = self.executor.submit(content, tenant=tenant, **run_options).result()
+                else:
+                    execution_result = self.sandbox.run_code(content, **run_options)
+
+                self._print_execution_result(execution_result)
                 return execution_result
             except Exception as e:
                 print(f"Error executing code: {e}")
@@ -1,3 +1,4 @@
 from .DSAgent import DSAgent
+from .CSVProfiler import CSVProfiler, CSVProfile
 
-__all__ = ["DSAgent"]
\ No newline at end of file
+__all__ = ["DSAgent", "CSVProfiler", "CSVProfile"]
\ No newline at end of file
@@ -1,69 +1,152 @@
-from typing import List, Dict, Any, Callable, Union
+import time
+from typing import List, Dict, Any, Callable, Union, Optional, AsyncIterator
 from ..tools.ToolManager import ToolManager, ToolWrapper
+from ..utils.async_stream import iterate_in_thread
+from ..utils.chunked_extraction import estimate_tokens
 
 
 class ReActAgent:
-    def __init__(self, chat_client, tools: List[Union[Dict[str, Any], Callable, 'ToolWrapper']]):
+    def __init__(
+        self,
+        chat_client,
+        tools: List[Union[Dict[str, Any], Callable, 'ToolWrapper']],
+        max_iterations: int = 5,
+        time_budget: Optional[float] = None,
+        token_budget: Optional[int] = None,
+        **tool_options
+    ):
+        """
+        Args:
+            chat_client: 对话客户端
+            tools: 工具列表（MCP工具字典、普通函数、ToolWrapper）
+            max_iterations: 最多进行几轮"选择工具 -> 执行工具"
+            time_budget: 工具轮次的总时间预算(秒)，用完后直接基于已有结果回答；None 表示不限
+            token_budget: 工具选择累计消耗的token预算（估算值），用完后直接回答；None 表示不限
+            **tool_options: 传给 ToolManager 的其他参数（max_concurrency、tool_timeout、tool_top_k 等）
+        """
         self.chat_client = chat_client
-        self.tool_manager = ToolManager(chat_client, tools)
+        self.tool_manager = ToolManager(chat_client, tools, **tool_options)
+        self.max_iterations = max(1, max_iterations)
+        self.time_budget = time_budget
+        self.token_budget = token_budget
+        self.last_run: Dict[str, Any] = {}
 
     async def ainvoke(self, prompt: str) -> str:
         """
         react agent的调用函数，处理用户查询，智能选择工具并生成回答
         """
+        return "".join([token async for token in self.astream(prompt)])
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        多轮选择并执行工具，然后流式返回最终回答的文本片段
+
+        每一轮的工具结果会交给下一轮的工具选择，直到模型不再选择工具、达到 max_iterations
+        或用完时间/token预算；每轮的耗时与token消耗记录在 last_run 中
+        """
         try:
-            # 1. 使用ToolManager智能选择工具
-            selected_tools = await self.tool_manager.select_tools(prompt)
-            
-            if not selected_tools:
-                response_generator = self.chat_client.invoke(prompt)
-                # 处理生成器响应
-                full_response = ""
-                for event in response_generator:
-                    if event.get('type') == 'token':
-                        full_response += event.get('content', '')
-                return full_response
-            
-            # 2. 使用ToolManager执行选中的工具
-            tool_results = await self.tool_manager.execute_tools(selected_tools)
-            
-            # 3. 生成最终回答 - 拼接工具结果和原始问题
+            tool_results = await self._run_tools(prompt)
+
+            if not tool_results:
+                async for token in self._stream_answer(prompt):
+                    yield token
+                return
+
+            # 生成最终回答 - 拼接工具结果和原始问题
             print("🤖 基于工具结果生成最终回答...")
-            
-            # 构建包含工具执行结果的上下文
             context = f"""用户原始问题：{prompt}
 
 以下是工具执行结果：
-"""
-            for result in tool_results:
-                if result.get('status') == 'success':
-                    context += f"""
+{self._format_results(tool_results)}
+请基于上述工具执行结果，详细回答用户的问题：{prompt}"""
+            async for token in self._stream_answer(context):
+                yield token
+
+        except Exception as e:
+            yield f"处理查询时发生错误: {str(e)}"
+
+    async def _run_tools(self, prompt: str) -> List[Dict[str, Any]]:
+        """循环"选择工具 -> 执行工具"，返回所有轮次的工具结果"""
+        started = time.monotonic()
+        run: Dict[str, Any] = {"iterations": [], "tokens": 0, "stop_reason": "max_iterations"}
+        self.last_run = run
+        tool_results: List[Dict[str, Any]] = []
+        seen_calls = set()
+
+        for iteration in range(1, self.max_iterations + 1):
+            stop_reason = self._budget_exhausted(started, run["tokens"])
+            if stop_reason:
+                run["stop_reason"] = stop_reason
+                break
+
+            iteration_started = time.monotonic()
+            # 工具在模型输出计划的同时开始执行；与之前轮次完全相同的调用会被跳过，避免反复调用同一个工具
+            selected_tools, results = await self.tool_manager.select_and_execute(
+                prompt,
+                self._format_results(tool_results),
+                exclude=seen_calls,
+                deadline=started + self.time_budget if self.time_budget is not None else None
+            )
+            tokens = self.tool_manager.last_selection_tokens
+            run["tokens"] += tokens
+            tool_results.extend(results)
+            run["iterations"].append(self._iteration_stats(iteration, results, iteration_started, tokens))
+
+            if not results:
+                if not selected_tools:
+                    run["stop_reason"] = "no_more_tools"
+                else:
+                    run["stop_reason"] = self._budget_exhausted(started, run["tokens"]) or "repeated_calls"
+                break
+            print(f"🔁 第 {iteration} 轮完成: {len(results)} 个工具, 耗时 {time.monotonic() - iteration_started:.2f}s, 约 {tokens} tokens")
+
+        run["elapsed"] = time.monotonic() - started
+        return tool_results
+
+    def _budget_exhausted(self, started: float, tokens: int) -> Optional[str]:
+        if self.time_budget is not None and time.monotonic() - started >= self.time_budget:
+            print("⏱️ 时间预算已用完，基于已有结果回答")
+            return "time_budget"
+        if self.token_budget is not None and tokens >= self.token_budget:
+            print("🪙 token预算已用完，基于已有结果回答")
+            return "token_budget"
+        return None
+
+    @staticmethod
+    def _iteration_stats(iteration: int, results: List[Dict[str, Any]], started: float, tokens: int) -> Dict[str, Any]:
+        return {
+            "iteration": iteration,
+            "tools": [result.get('tool') for result in results],
+            "errors": sum(1 for result in results if result.get('status') != 'success'),
+            "elapsed": time.monotonic() - started,
+            "tokens": tokens
+        }
+
+    @staticmethod
+    def _format_results(tool_results: List[Dict[str, Any]]) -> str:
+        context = ""
+        for result in tool_results:
+            if result.get('status') == 'success':
+                context += f"""
 工具：{result.get('tool', 'unknown')}
+调用参数：{result.get('arguments', {})}
 执行结果：{result.get('result', 'No result')}
 """
-                else:
-                    context += f"""
+            else:
+                context += f"""
 工具：{result.get('tool', 'unknown')}
 执行失败：{result.get('error', 'Unknown error')}
 """
-            
-            context += f"\n请基于上述工具执行结果，详细回答用户的问题：{prompt}"
-            
-            # 调用ChatClient生成最终回答
-            try:
-                final_answer = await self.chat_client.invoke_async(context)
-            except AttributeError:
-                # 如果没有async方法，使用同步方法
-                response_generator = self.chat_client.invoke(context)
-                # 处理生成器响应
-                final_answer = ""
-                for event in response_generator:
-                    if event.get('type') == 'token':
-                        final_answer += event.get('content', '')
-                    elif event.get('type') == 'finish':
-                        break
-            
-            return final_answer
-            
-        except Exception as e:
-            return f"处理查询时发生错误: {str(e)}"
\ No newline at end of file
+        return context
+
+    async def _stream_answer(self, prompt: str) -> AsyncIterator[str]:
+        """在线程中读取 ChatClient 的事件流，边生成边返回回答片段"""
+        answer_tokens = 0
+        async for event in iterate_in_thread(lambda: self.chat_client.invoke(prompt)):
+            if event.get('type') == 'token':
+                content = event.get('content', '')
+                answer_tokens += estimate_tokens(content)
+                yield content
+            elif event.get('type') == 'finish':
+                break
+        self.last_run["answer_tokens"] = estimate_tokens(prompt) + answer_tokens
@@ -1,21 +1,452 @@
-import subprocess
-import tempfile
 import os
+import sys
+import json
+import time
+import queue
+import base64
+import shutil
+import select
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from typing import Optional, Dict, Any, List, Sequence, Callable, Iterator
+
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SandboxWorker.py")
+
+# 工作进程启动时预先导入的库（DSAgent 生成的代码都会用到）
+DEFAULT_PRELOAD = ("numpy", "pandas", "matplotlib", "matplotlib.pyplot", "seaborn")
+
+# 预热进程池依赖 fork，不支持的平台（Windows）每次启动新的解释器
+FORK_AVAILABLE = hasattr(os, "fork")
+
+# 冷启动方式执行时写入工作目录的脚本，不算作产出文件
+COLD_SCRIPT = "_sandbox_main.py"
+
+ARTIFACT_MODES = ("paths", "bytes", "none")
+
+
+class SandboxWorkerProcess:
+    """一个预热的工作进程（见 SandboxWorker.py），按行收发 JSON 消息"""
+
+    def __init__(self, preload: Sequence[str], python: str = sys.executable, startup_timeout: float = 120):
+        env = dict(os.environ, MPLBACKEND="Agg", PYTHONIOENCODING="utf-8")
+        self.process = subprocess.Popen(
+            [python, WORKER_SCRIPT, *preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env
+        )
+        self.runs = 0
+        self._buffer = b""
+        try:
+            ready = self._read_message(time.monotonic() + startup_timeout)
+        except Exception:
+            self.close()
+            raise
+        self.preloaded: List[str] = ready.get("preloaded", [])
+
+    def _read_message(self, deadline: Optional[float]) -> Dict[str, Any]:
+        fd = self.process.stdout.fileno()
+        while b"\n" not in self._buffer:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("沙箱工作进程没有响应")
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError("沙箱工作进程意外退出")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def run(self, job: Dict[str, Any], on_message: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        提交一个任务并等待结果；超时由工作进程负责，这里多留余量以防工作进程卡死
+
+        on_message 接收执行过程中的 output 消息
+        """
+        self.runs += 1
+        self.process.stdin.write((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.process.stdin.flush()
+        timeout = job.get("timeout")
+        deadline = time.monotonic() + timeout + 10 if timeout else None
+        while True:
+            message = self._read_message(deadline)
+            if message.get("type") == "result":
+                return message
+            if message.get("type") == "output" and on_message:
+                on_message(message)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except Exception:
+                self.process.kill()
+                self.process.wait()
+
 
 class LocalSandboxService:
-    def run_code(self, code: str):
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".py") as f:
-            f.write(code.encode('utf-8'))
-            temp_path = f.name
+    """
+    本地Python代码执行沙箱
+
+    - 维护 pool_size 个预热的工作进程，pandas / matplotlib / seaborn 已提前导入，代码启动无需等待导入
+    - 每次执行从工作进程 fork 出独立的子进程：全新的全局变量、独立的临时工作目录、
+      内存与CPU时间限制(rlimit)、超时后连同其启动的进程一起结束
+    - 工作进程执行 max_runs_per_worker 次后自动替换，避免长期运行的状态累积
+    - 输出可通过 on_output 回调或 run_code_stream 边执行边获取
+    - 代码生成的文件作为 artifacts 返回（路径或字节），工作目录自动清理；
+      图表可限制DPI，或直接在内存中生成而不写文件
+    - 不支持 fork 的平台（或 warm=False）退回到每次启动新解释器的方式，此时只有超时限制，
+      输出在执行结束后一次性回调，内存图表模式退化为写入临时目录后读回
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 1,
+        timeout: Optional[float] = 30,
+        memory_limit_mb: Optional[int] = 2048,
+        cpu_time_limit: Optional[int] = None,
+        max_runs_per_worker: int = 50,
+        preload: Sequence[str] = DEFAULT_PRELOAD,
+        warm: bool = True,
+        prewarm: bool = True,
+        work_root: Optional[str] = None,
+        figure_dpi: Optional[int] = None,
+        keep_runs: int = 20
+    ):
+        """
+        Args:
+            pool_size: 预热工作进程数，也是可同时执行的代码数
+            timeout: 默认的执行超时(秒，墙上时间)，None 表示不限
+            memory_limit_mb: 默认的内存上限（预加载库之外可额外使用的MB），None 表示不限
+            cpu_time_limit: 默认的CPU时间上限(秒)，None 表示不限
+            max_runs_per_worker: 工作进程执行多少次后替换
+            preload: 工作进程预先导入的模块
+            warm: 是否使用预热进程池
+            prewarm: 创建时是否在后台立即启动工作进程
+            work_root: 每次执行的临时工作目录所在的目录，默认使用系统临时目录
+            figure_dpi: 默认的图表最大DPI，None 表示不限制
+            keep_runs: artifacts="paths" 时最多保留最近多少次执行的工作目录，更早的自动删除
+        """
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_time_limit = cpu_time_limit
+        self.max_runs_per_worker = max(1, max_runs_per_worker)
+        self.preload = tuple(preload)
+        self.warm = warm and FORK_AVAILABLE
+        self.work_root = work_root
+        self.figure_dpi = figure_dpi
+        self.keep_runs = max(1, keep_runs)
+        if work_root:
+            os.makedirs(work_root, exist_ok=True)
+
+        self._slots = threading.Semaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._idle: List[SandboxWorkerProcess] = []
+        self._closed = False
+        self._kept_dirs: deque = deque()
+        self.stats = {"runs": 0, "warm_runs": 0, "timeouts": 0, "workers_started": 0, "workers_recycled": 0}
+
+        if self.warm and prewarm:
+            threading.Thread(target=self.warm_up, daemon=True).start()
+
+    def warm_up(self):
+        """启动全部工作进程（已启动的不会重复启动）"""
+        for _ in range(self.pool_size):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                with self._lock:
+                    if len(self._idle) >= self.pool_size or self._closed:
+                        continue
+                worker = self._spawn()
+                with self._lock:
+                    self._idle.append(worker)
+            except Exception as e:
+                print(f"⚠️ 沙箱工作进程启动失败: {e}")
+            finally:
+                self._slots.release()
+
+    def _spawn(self) -> SandboxWorkerProcess:
+        worker = SandboxWorkerProcess(self.preload)
+        self.stats["workers_started"] += 1
+        return worker
+
+    def _checkout(self) -> SandboxWorkerProcess:
+        """占用一个执行位并取得可用的工作进程（调用方需在结束后调用 _checkin）"""
+        self._slots.acquire()
+        try:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is not None and not worker.alive():
+                worker.close()
+                worker = None
+            return worker or self._spawn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _checkin(self, worker: SandboxWorkerProcess, healthy: bool = True):
+        """归还工作进程；达到执行次数上限或出错的进程在后台替换，替换完成前继续占用执行位"""
+        if healthy and worker.alive() and worker.runs < self.max_runs_per_worker and not self._closed:
+            with self._lock:
+                self._idle.append(worker)
+            self._slots.release()
+            return
+
+        worker.close()
+        self.stats["workers_recycled"] += 1
+
+        def replace():
+            try:
+                if not self._closed:
+                    replacement = self._spawn()
+                    with self._lock:
+                        self._idle.append(replacement)
+            except Exception as e:
+                print(f"⚠️ 沙箱工作进程启动失败: {e}")
+            finally:
+                self._slots.release()
+
+        threading.Thread(target=replace, daemon=True).start()
+
+    def _new_work_dir(self) -> str:
+        return tempfile.mkdtemp(prefix="sandbox_run_", dir=self.work_root)
+
+    def run_code(
+        self,
+        code: str,
+        timeout: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        artifacts: str = "paths",
+        output_dir: Optional[str] = None,
+        figures: str = "file",
+        figure_dpi: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        执行Python代码
+
+        Args:
+            code: 要执行的代码
+            timeout: 本次执行的超时(秒)，默认使用实例设置
+            memory_limit_mb: 本次执行的内存上限(MB)，默认使用实例设置
+            cpu_time_limit: 本次执行的CPU时间上限(秒)，默认使用实例设置
+            on_output: 输出回调 on_output(stream, text)，stream 为 "stdout" 或 "stderr"，执行过程中随输出调用
+            artifacts: 代码生成文件的返回方式
+                - "paths": 返回文件路径，文件保留在工作目录（或移动到 output_dir）
+                - "bytes": 返回文件内容，工作目录立即删除
+                - "none": 不返回文件，工作目录立即删除
+            output_dir: artifacts="paths" 时把生成的文件移动到该目录（同名文件会被覆盖），工作目录随即删除
+            figures: "file" 图表正常写入工作目录；"memory" 图表不写文件，以字节形式出现在 artifacts 中
+            figure_dpi: 本次执行的图表最大DPI，默认使用实例设置
+
+        Returns:
+            {"success", "stdout", "stderr", "returncode", "timed_out", "duration", "artifacts", "work_dir"}
+            artifacts 为 [{"name", "size", "path"}] 或 [{"name", "size", "data"}]，name 为相对工作目录的文件名；
+            work_dir 为保留的工作目录，已删除时为 None
+        """
+        if artifacts not in ARTIFACT_MODES:
+            raise ValueError(f"artifacts 必须是 {ARTIFACT_MODES} 之一: {artifacts}")
+        if figures not in ("file", "memory"):
+            raise ValueError(f"figures 必须是 'file' 或 'memory': {figures}")
+        job = {
+            "code": code,
+            "cwd": self._new_work_dir(),
+            "timeout": self.timeout if timeout is None else timeout,
+            "memory_limit_mb": self.memory_limit_mb if memory_limit_mb is None else memory_limit_mb,
+            "cpu_time_limit": self.cpu_time_limit if cpu_time_limit is None else cpu_time_limit,
+            "stream": on_output is not None,
+            "figures": figures,
+            "figure_dpi": self.figure_dpi if figure_dpi is None else figure_dpi
+        }
+        self.stats["runs"] += 1
+        try:
+            if self.warm:
+                result = self._run_warm(job, on_output)
+            else:
+                result = self._run_cold(job, on_output)
+        except BaseException:
+            shutil.rmtree(job["cwd"], ignore_errors=True)
+            raise
+        if result["timed_out"]:
+            self.stats["timeouts"] += 1
+        figure_data = result.pop("figures", [])
+        result["artifacts"], result["work_dir"] = self._collect_artifacts(job["cwd"], artifacts, output_dir, figures)
+        result["artifacts"] += [
+            {"name": figure["name"], "size": len(data), "data": data}
+            for figure in figure_data
+            for data in [base64.b64decode(figure["data"])]
+        ]
+        return result
+
+    def run_code_stream(self, code: str, **options) -> Iterator[Dict[str, Any]]:
+        """
+        执行代码并逐条返回事件，参数同 run_code
+
+            {"type": "output", "stream": "stdout" | "stderr", "content": ...}
+            {"type": "result", ...run_code 的返回值}
+        """
+        events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+        def on_output(stream: str, content: str):
+            events.put({"type": "output", "stream": stream, "content": content})
+
+        def run():
+            try:
+                result = self.run_code(code, on_output=on_output, **options)
+                events.put({"type": "result", **result})
+            except BaseException as e:
+                events.put({"type": "error", "error": e})
+
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            event = events.get()
+            if event["type"] == "error":
+                raise event["error"]
+            yield event
+            if event["type"] == "result":
+                return
+
+    def _collect_artifacts(self, work_dir: str, mode: str, output_dir: Optional[str], figures: str):
+        """收集工作目录中生成的文件，按 mode 返回路径或内容，并清理工作目录"""
+        if not self.warm and figures == "memory" and mode == "paths":
+            # 冷启动方式下图表已写入工作目录，读回后删除，与预热方式的结果一致
+            mode = "bytes"
+        files = []
+        for root, dirs, names in os.walk(work_dir):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for name in names:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, work_dir)
+                if relative != COLD_SCRIPT:
+                    files.append((relative, path))
+        files.sort()
+
+        collected = []
+        if mode == "bytes":
+            for relative, path in files:
+                with open(path, "rb") as f:
+                    data = f.read()
+                collected.append({"name": relative, "size": len(data), "data": data})
+        elif mode == "paths" and output_dir:
+            for relative, path in files:
+                target = os.path.join(os.path.abspath(output_dir), relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+                collected.append({"name": relative, "size": os.path.getsize(target), "path": target})
+        elif mode == "paths":
+            collected = [{"name": relative, "size": os.path.getsize(path), "path": path} for relative, path in files]
+            self._keep_work_dir(work_dir)
+            return collected, work_dir
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+        return collected, None
+
+    def _keep_work_dir(self, work_dir: str):
+        """保留工作目录，超过 keep_runs 时删除最早的"""
+        with self._lock:
+            self._kept_dirs.append(work_dir)
+            expired = []
+            while len(self._kept_dirs) > self.keep_runs:
+                expired.append(self._kept_dirs.popleft())
+        for path in expired:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def release(self, result: Dict[str, Any]):
+        """删除某次执行保留的工作目录及其中的文件"""
+        work_dir = result.get("work_dir")
+        if not work_dir:
+            return
+        with self._lock:
+            if work_dir in self._kept_dirs:
+                self._kept_dirs.remove(work_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        result["work_dir"] = None
+
+    def _run_warm(self, job: Dict[str, Any], on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        worker = self._checkout()
+        healthy = True
+        on_message = (lambda message: on_output(message["stream"], message["content"])) if on_output else None
+        try:
+            message = worker.run(job, on_message)
+            self.stats["warm_runs"] += 1
+        except Exception as e:
+            healthy = False
+            message = {"returncode": -1, "stdout": "", "stderr": f"沙箱工作进程异常: {e}", "timed_out": isinstance(e, TimeoutError), "duration": 0.0}
+            if on_output:
+                on_output("stderr", message["stderr"])
+        finally:
+            self._checkin(worker, healthy)
+        return {
+            "success": message["returncode"] == 0,
+            "stdout": message["stdout"],
+            "stderr": message["stderr"],
+            "returncode": message["returncode"],
+            "timed_out": message["timed_out"],
+            "duration": message["duration"],
+            "figures": message.get("figures", [])
+        }
+
+    def _run_cold(self, job: Dict[str, Any], on_output: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """不使用进程池：把代码写入工作目录并启动新的解释器执行，输出在结束后一次性回调"""
+        script = os.path.join(job["cwd"], COLD_SCRIPT)
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(job["code"])
+        config = json.dumps({"figure_dpi": job["figure_dpi"]})
+        started = time.monotonic()
         try:
             result = subprocess.run(
-                ["python", temp_path],
-                capture_output=True, text=True, timeout=30
+                [sys.executable, WORKER_SCRIPT, "--run-file", script, config],
+                capture_output=True, text=True, timeout=job["timeout"], cwd=job["cwd"],
+                env=dict(os.environ, MPLBACKEND="Agg", PYTHONIOENCODING="utf-8")
             )
-            return {"success": result.returncode == 0, "stdout": result.stdout, "stderr": result.stderr}
+            returncode, stdout, stderr, timed_out = result.returncode, result.stdout, result.stderr, False
+        except subprocess.TimeoutExpired as e:
+            stdout = e.stdout.decode("utf-8", errors="replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+            stderr = e.stderr.decode("utf-8", errors="replace") if isinstance(e.stderr, bytes) else (e.stderr or "")
+            returncode, timed_out = -9, True
+            stderr += f"\n执行超时（{job['timeout']}秒），已终止"
         finally:
-            os.remove(temp_path)
-
+            os.remove(script)
+        if on_output:
+            for stream, content in (("stdout", stdout), ("stderr", stderr)):
+                if content:
+                    on_output(stream, content)
+        return {
+            "success": returncode == 0,
+            "stdout": stdout,
+            "stderr": stderr,
+            "returncode": returncode,
+            "timed_out": timed_out,
+            "duration": time.monotonic() - started
+        }
 
+    def close(self):
+        """关闭所有空闲的工作进程，删除保留的工作目录"""
+        self._closed = True
+        with self._lock:
+            workers, self._idle = self._idle, []
+            kept, self._kept_dirs = list(self._kept_dirs), deque()
+        for worker in workers:
+            worker.close()
+        for path in kept:
+            shutil.rmtree(path, ignore_errors=True)
 
+    def __enter__(self):
+        return self
 
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
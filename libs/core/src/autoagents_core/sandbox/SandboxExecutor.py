@@ -0,0 +1,214 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, Deque
+from .LocalSandbox import LocalSandboxService
+
+
+class SandboxJob:
+    """排队中的一次代码执行"""
+
+    def __init__(self, code: str, tenant: str, options: Dict[str, Any]):
+        self.code = code
+        self.tenant = tenant
+        self.options = options
+        self.future: Future = Future()
+        self.submitted_at = time.monotonic()
+
+
+class SandboxExecutor:
+    """
+    多用户共享的沙箱执行器：submit(code) 立即返回 Future，代码在有界的预热进程池中排队执行
+
+    - 同时执行的代码数不超过 max_workers，其余任务排队
+    - 每个租户（用户）有独立的队列，执行位按租户轮转分配：某个用户一次提交大量任务时，
+      其他用户的任务不需要等它们全部执行完
+    - 队列总长度与单个租户的排队数都有上限，超出时 submit 抛出 RuntimeError
+    - metrics() 返回队列深度、执行中数量、等待/执行耗时等指标
+
+    Usage:
+        executor = SandboxExecutor(max_workers=4)
+        future = executor.submit(code, tenant=user_id, timeout=60)
+        result = future.result()                          # 同步等待
+        result = await asyncio.wrap_future(future)        # 在事件循环中等待
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 1000,
+        max_queue_per_tenant: Optional[int] = 100,
+        timeout: Optional[float] = 30,
+        memory_limit_mb: Optional[int] = 2048,
+        cpu_time_limit: Optional[int] = None,
+        sandbox: Optional[LocalSandboxService] = None
+    ):
+        """
+        Args:
+            max_workers: 同时执行的代码数（传入 sandbox 时使用其 pool_size）
+            max_queue: 所有租户排队任务数上限
+            max_queue_per_tenant: 单个租户排队任务数上限，None 表示只受 max_queue 限制
+            timeout: 默认的执行超时(秒)
+            memory_limit_mb: 默认的内存上限(MB)
+            cpu_time_limit: 默认的CPU时间上限(秒)
+            sandbox: 使用已有的 LocalSandboxService；默认创建一个 pool_size=max_workers 的沙箱
+        """
+        self._owns_sandbox = sandbox is None
+        self.sandbox = sandbox or LocalSandboxService(
+            pool_size=max_workers,
+            timeout=timeout,
+            memory_limit_mb=memory_limit_mb,
+            cpu_time_limit=cpu_time_limit
+        )
+        self.max_workers = self.sandbox.pool_size
+        self.max_queue = max_queue
+        self.max_queue_per_tenant = max_queue_per_tenant
+
+        self._queues: "OrderedDict[str, Deque[SandboxJob]]" = OrderedDict()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._queued = 0
+        self._running = 0
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "rejected": 0, "timeouts": 0,
+            "total_wait": 0.0, "total_run": 0.0, "max_queue_depth": 0
+        }
+        self._runners = [
+            threading.Thread(target=self._run_loop, name=f"sandbox-executor-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for runner in self._runners:
+            runner.start()
+
+    def submit(
+        self,
+        code: str,
+        tenant: str = "default",
+        timeout: Optional[float] = None,
+        memory_limit_mb: Optional[int] = None,
+        cpu_time_limit: Optional[int] = None,
+        **run_options
+    ) -> Future:
+        """
+        提交代码执行，返回 concurrent.futures.Future，结果与 LocalSandboxService.run_code 相同
+
+        Args:
+            code: 要执行的Python代码
+            tenant: 租户（用户）标识，用于公平调度与排队上限
+            timeout / memory_limit_mb / cpu_time_limit: 本次执行的限制，默认使用沙箱设置
+            **run_options: 其他传给 run_code 的参数（on_output、artifacts、figures 等）
+        """
+        job = SandboxJob(code, tenant, {
+            "timeout": timeout,
+            "memory_limit_mb": memory_limit_mb,
+            "cpu_time_limit": cpu_time_limit,
+            **run_options
+        })
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("沙箱执行器已关闭")
+            tenant_queue = self._queues.get(tenant)
+            tenant_depth = len(tenant_queue) if tenant_queue else 0
+            if self._queued >= self.max_queue or (
+                self.max_queue_per_tenant is not None and tenant_depth >= self.max_queue_per_tenant
+            ):
+                self._stats["rejected"] += 1
+                raise RuntimeError(f"沙箱任务队列已满（租户 {tenant} 排队 {tenant_depth} 个，总计 {self._queued} 个）")
+            if tenant_queue is None:
+                tenant_queue = self._queues[tenant] = deque()
+            tenant_queue.append(job)
+            self._queued += 1
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued)
+            self._condition.notify()
+        return job.future
+
+    def _next_job(self) -> Optional[SandboxJob]:
+        """按租户轮转取出下一个任务（调用方需持有锁）"""
+        if self._queues:
+            tenant, tenant_queue = next(iter(self._queues.items()))
+            job = tenant_queue.popleft()
+            self._queued -= 1
+            if tenant_queue:
+                self._queues.move_to_end(tenant)
+            else:
+                del self._queues[tenant]
+            return job
+        return None
+
+    def _run_loop(self):
+        while True:
+            with self._condition:
+                while not self._queues and not self._shutdown:
+                    self._condition.wait()
+                job = self._next_job()
+                if job is None:
+                    return
+                if not job.future.set_running_or_notify_cancel():
+                    self._stats["cancelled"] += 1
+                    continue
+                self._running += 1
+                self._stats["total_wait"] += time.monotonic() - job.submitted_at
+
+            started = time.monotonic()
+            try:
+                result = self.sandbox.run_code(job.code, **job.options)
+            except BaseException as e:
+                with self._condition:
+                    self._running -= 1
+                    self._stats["failed"] += 1
+                    self._stats["total_run"] += time.monotonic() - started
+                job.future.set_exception(e)
+                continue
+
+            with self._condition:
+                self._running -= 1
+                self._stats["completed" if result.get("success") else "failed"] += 1
+                if result.get("timed_out"):
+                    self._stats["timeouts"] += 1
+                self._stats["total_run"] += time.monotonic() - started
+            job.future.set_result(result)
+
+    def metrics(self) -> Dict[str, Any]:
+        """当前队列深度、执行中数量与累计统计"""
+        with self._condition:
+            finished = self._stats["completed"] + self._stats["failed"]
+            started = finished + self._running
+            return {
+                "queued": self._queued,
+                "queued_by_tenant": {tenant: len(jobs) for tenant, jobs in self._queues.items()},
+                "running": self._running,
+                "max_workers": self.max_workers,
+                **{k: v for k, v in self._stats.items() if not k.startswith("total_")},
+                "avg_wait": self._stats["total_wait"] / started if started else 0.0,
+                "avg_run": self._stats["total_run"] / finished if finished else 0.0
+            }
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        """
+        停止接收新任务
+
+        Args:
+            wait: 是否等待已排队与执行中的任务完成
+            cancel_futures: 是否取消尚未开始的任务
+        """
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queues:
+                    job = self._next_job()
+                    if job.future.cancel():
+                        self._stats["cancelled"] += 1
+            self._condition.notify_all()
+        if wait:
+            for runner in self._runners:
+                runner.join()
+        if self._owns_sandbox:
+            self.sandbox.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
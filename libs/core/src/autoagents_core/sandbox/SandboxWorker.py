@@ -0,0 +1,332 @@
+"""
+LocalSandboxService 的预热工作进程（以独立脚本方式启动，不依赖 autoagents_core 包）
+
+启动时预先导入 pandas / matplotlib / seaborn 等库，之后每个任务 fork 一个子进程执行：
+子进程继承已导入的库（写时复制），但拥有全新的全局变量、独立的工作目录与资源限制，
+执行结束即退出，不会污染工作进程本身。
+
+协议：标准输入/输出上每行一个 JSON 消息
+    -> {"id": ..., "code": ..., "cwd": ..., "timeout": ..., "memory_limit_mb": ..., "cpu_time_limit": ...,
+        "stream": ..., "figures": "file" | "memory", "figure_dpi": ...}
+    <- {"type": "ready", "preloaded": [...]}
+    <- {"type": "output", "id": ..., "stream": "stdout" | "stderr", "content": ...}    （仅 stream 为真时）
+    <- {"type": "result", "id": ..., "returncode": ..., "stdout": ..., "stderr": ..., "timed_out": ..., "duration": ...,
+        "figures": [{"name": ..., "data": <base64>}]}
+
+不支持 fork 的平台上以 `SandboxWorker.py --run-file <脚本> <JSON配置>` 的方式在新解释器中执行单个脚本。
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import codecs
+import signal
+import linecache
+import importlib
+import traceback
+import selectors
+import weakref
+
+# 输出上限，避免失控的 print 占满内存
+MAX_OUTPUT_BYTES = 10 * 1024 * 1024
+MAX_FIGURE_BYTES = 100 * 1024 * 1024
+CODE_FILENAME = "<sandbox>"
+
+
+def preload(modules):
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            pass
+    return loaded
+
+
+def vm_size_bytes():
+    """当前进程的虚拟内存大小，用于在已加载库的基础上计算内存上限"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def apply_limits(job):
+    import resource
+    memory_limit_mb = job.get("memory_limit_mb")
+    if memory_limit_mb:
+        limit = vm_size_bytes() + int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    cpu_time_limit = job.get("cpu_time_limit")
+    if cpu_time_limit:
+        seconds = max(1, int(cpu_time_limit))
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+
+
+def configure_figures(job, figure_fd=None):
+    """
+    按任务设置调整 matplotlib 保存图表的方式
+
+    - figure_dpi: 保存图表的最大DPI，代码中显式传入更高的 dpi 也会被降低
+    - figures="memory": savefig 不写文件，图表数据经 figure_fd 交给工作进程；plt.show() 保存当前所有图表
+    """
+    figure_dpi = job.get("figure_dpi")
+    in_memory = job.get("figures") == "memory" and figure_fd is not None
+    if not figure_dpi and not in_memory:
+        return
+    try:
+        import matplotlib
+        from matplotlib.figure import Figure
+    except ImportError:
+        return
+
+    original_savefig = Figure.savefig
+    # 已通过 savefig 保存过的图表，plt.show() 时不再重复保存
+    saved = weakref.WeakSet()
+
+    def savefig(self, fname, *args, **kwargs):
+        if figure_dpi:
+            dpi = kwargs.get("dpi")
+            if not isinstance(dpi, (int, float)) or dpi > figure_dpi:
+                kwargs["dpi"] = figure_dpi
+        if in_memory and isinstance(fname, (str, os.PathLike)):
+            name = os.fspath(fname)
+            fmt = kwargs.pop("format", None) or os.path.splitext(name)[1][1:] or matplotlib.rcParams["savefig.format"]
+            buffer = io.BytesIO()
+            original_savefig(self, buffer, *args, format=fmt, **kwargs)
+            saved.add(self)
+            write_all(figure_fd, json.dumps({
+                "name": name,
+                "data": base64.b64encode(buffer.getvalue()).decode("ascii")
+            }).encode("ascii") + b"\n")
+            return None
+        return original_savefig(self, fname, *args, **kwargs)
+
+    Figure.savefig = savefig
+
+    if in_memory:
+        import matplotlib.pyplot as plt
+        shown = [0]
+
+        def show(*args, **kwargs):
+            for num in plt.get_fignums():
+                figure = plt.figure(num)
+                if figure in saved:
+                    continue
+                shown[0] += 1
+                figure.savefig(f"figure_{shown[0]:02d}.png")
+            plt.close("all")
+
+        plt.show = show
+
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def execute(code):
+    """在当前进程中执行代码，返回退出码"""
+    exit_code = 0
+    try:
+        linecache.cache[CODE_FILENAME] = (len(code), None, code.splitlines(True), CODE_FILENAME)
+        exec(compile(code, CODE_FILENAME, "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=sys.stderr)
+    except BaseException as e:
+        # 去掉工作进程自身的栈帧，只显示用户代码的错误位置
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+    return exit_code
+
+
+def run_child(job, out_w, err_w, fig_w):
+    """在 fork 出的子进程中执行代码，不返回"""
+    exit_code = 1
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(out_w, 1)
+        os.dup2(err_w, 2)
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        os.chdir(job["cwd"])
+        sys.path.insert(0, job["cwd"])
+        sys.argv = [CODE_FILENAME]
+        apply_limits(job)
+        configure_figures(job, fig_w)
+        exit_code = execute(job["code"])
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(exit_code)
+
+
+def run_job(job):
+    started = time.monotonic()
+    timeout = job.get("timeout")
+    deadline = started + timeout if timeout else None
+    stream = job.get("stream")
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    fig_r, fig_w = os.pipe()
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    pid = os.fork()
+    if pid == 0:
+        os.close(out_r)
+        os.close(err_r)
+        os.close(fig_r)
+        run_child(job, out_w, err_w, fig_w)
+    os.close(out_w)
+    os.close(err_w)
+    os.close(fig_w)
+
+    buffers = {out_r: bytearray(), err_r: bytearray(), fig_r: bytearray()}
+    limits = {out_r: MAX_OUTPUT_BYTES, err_r: MAX_OUTPUT_BYTES, fig_r: MAX_FIGURE_BYTES}
+    # 流式输出时按 UTF-8 增量解码，避免多字节字符被拆开
+    decoders = {fd: (name, codecs.getincrementaldecoder("utf-8")(errors="replace")) for fd, name in ((out_r, "stdout"), (err_r, "stderr"))}
+    selector = selectors.DefaultSelector()
+    for fd in buffers:
+        selector.register(fd, selectors.EVENT_READ)
+    status = None
+    timed_out = False
+
+    while True:
+        if status is None:
+            if os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+                # 子进程已退出但尚未回收（进程组ID不会被复用），先结束它留下的后台进程
+                kill_group(pid)
+                _, status = os.waitpid(pid, 0)
+        if status is not None and not selector.get_map():
+            break
+        if deadline is not None and status is None and time.monotonic() >= deadline:
+            timed_out = True
+            kill_group(pid)
+            _, status = os.waitpid(pid, 0)
+            continue
+        wait = 0.05
+        if deadline is not None:
+            wait = max(0.0, min(wait, deadline - time.monotonic()))
+        events = selector.select(wait if status is None else 0)
+        if status is not None and not events:
+            # 子进程已退出，它启动的后台进程可能仍持有管道，不再等待
+            break
+        for key, _ in events:
+            chunk = os.read(key.fd, 65536)
+            if not chunk:
+                selector.unregister(key.fd)
+                continue
+            if len(buffers[key.fd]) >= limits[key.fd]:
+                continue
+            buffers[key.fd] += chunk
+            if stream and key.fd in decoders:
+                name, decoder = decoders[key.fd]
+                send_output(job, name, decoder.decode(chunk))
+
+    selector.close()
+    for fd in buffers:
+        os.close(fd)
+    if stream:
+        for name, decoder in decoders.values():
+            send_output(job, name, decoder.decode(b"", final=True))
+
+    stdout = buffers[out_r].decode("utf-8", errors="replace")
+    stderr = buffers[err_r].decode("utf-8", errors="replace")
+    returncode = os.waitstatus_to_exitcode(status)
+    if timed_out:
+        stderr += f"\n执行超时（{timeout}秒），已终止"
+    elif returncode == -signal.SIGXCPU:
+        stderr += f"\nCPU时间超过限制（{job.get('cpu_time_limit')}秒），已终止"
+    figures = []
+    for line in bytes(buffers[fig_r]).splitlines():
+        try:
+            figures.append(json.loads(line))
+        except ValueError:
+            # 超过 MAX_FIGURE_BYTES 被截断的图表
+            pass
+    return {
+        "type": "result",
+        "id": job.get("id"),
+        "returncode": returncode,
+        "stdout": stdout,
+        "stderr": stderr,
+        "timed_out": timed_out,
+        "duration": time.monotonic() - started,
+        "figures": figures
+    }
+
+
+def kill_group(pid):
+    """结束子进程及其启动的所有进程"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def send(message):
+    sys.stdout.write(json.dumps(message, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def send_output(job, name, content):
+    if content:
+        send({"type": "output", "id": job.get("id"), "stream": name, "content": content})
+
+
+def run_file(path, config):
+    """在当前解释器中执行单个脚本（不支持 fork 的平台使用），图表只支持写文件"""
+    with open(path, encoding="utf-8") as f:
+        code = f.read()
+    sys.argv = [CODE_FILENAME]
+    sys.path.insert(0, os.getcwd())
+    configure_figures(config)
+    return execute(code)
+
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "--run-file":
+        sys.exit(run_file(sys.argv[2], json.loads(sys.argv[3]) if len(sys.argv) > 3 else {}))
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    loaded = preload(sys.argv[1:])
+    send({"type": "ready", "preloaded": loaded, "pid": os.getpid()})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        try:
+            result = run_job(job)
+        except Exception:
+            result = {
+                "type": "result",
+                "id": job.get("id"),
+                "returncode": -1,
+                "stdout": "",
+                "stderr": traceback.format_exc(),
+                "timed_out": False,
+                "duration": 0.0,
+                "figures": []
+            }
+        send(result)
+
+
+if __name__ == "__main__":
+    main()
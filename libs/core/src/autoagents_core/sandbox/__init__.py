@@ -1,4 +1,5 @@
 from .E2BSandbox import E2BSandboxService
 from .LocalSandbox import LocalSandboxService
+from .SandboxExecutor import SandboxExecutor
 
-__all__ = ["E2BSandboxService", "LocalSandboxService"]
\ No newline at end of file
+__all__ = ["E2BSandboxService", "LocalSandboxService", "SandboxExecutor"]
\ No newline at end of file
@@ -0,0 +1,206 @@
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Callable, Awaitable, Tuple
+from pydantic import BaseModel
+from ..utils.disk_cache import DiskCache
+
+
+_MISSING = object()
+
+_IMMUTABLE_TYPES = (str, bytes, int, float, bool, type(None))
+
+
+def _is_error_result(value: Any) -> bool:
+    """MCP 工具以 isError=True 的结果报告执行失败（而不是抛出异常），这类结果不缓存"""
+    if isinstance(value, dict):
+        return value.get("isError") is True
+    return getattr(value, "isError", None) is True
+
+
+# 磁盘层中 pydantic 模型（如 MCP 的 CallToolResult）的标记键
+_MODEL_KEY = "__pydantic_model__"
+
+
+def _to_disk(value: Any) -> Any:
+    """转换为可 JSON 序列化的值：pydantic 模型记录类名与 JSON 形式的字段，其他值原样返回"""
+    if isinstance(value, BaseModel):
+        cls = type(value)
+        return {_MODEL_KEY: f"{cls.__module__}:{cls.__qualname__}", "data": value.model_dump(mode="json", by_alias=True)}
+    return value
+
+
+def _from_disk(value: Any) -> Any:
+    """还原 _to_disk 保存的值；模型类无法导入或校验失败时视为未命中"""
+    if not (isinstance(value, dict) and _MODEL_KEY in value):
+        return value
+    try:
+        module_name, qualname = value[_MODEL_KEY].split(":", 1)
+        target = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            target = getattr(target, part)
+        if not (isinstance(target, type) and issubclass(target, BaseModel)):
+            return _MISSING
+        return target.model_validate(value["data"])
+    except Exception:
+        return _MISSING
+
+
+def _copy_result(value: Any) -> Any:
+    """返回结果的副本，避免调用方修改缓存中的对象"""
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    try:
+        return copy.deepcopy(value)
+    except Exception:
+        return value
+
+
+@dataclass
+class TTLPolicy:
+    """
+    工具结果缓存策略，只应用于幂等的工具（相同参数总是返回相同结果，且没有副作用）
+
+    Usage:
+        @tool(cache=TTLPolicy(ttl=600, max_entries=2048))
+        def get_exchange_rate(base: str, quote: str) -> float:
+            ...
+    """
+    ttl: Optional[float] = 300.0          # 过期时间(秒)，None 表示永不过期
+    max_entries: int = 1024               # 内存层条目上限，超出后按最近使用淘汰(LRU)
+    disk_path: Optional[str] = None       # 可选的磁盘层（SQLite），多个进程可共享同一文件；结果需可 JSON 序列化或为 pydantic 模型
+
+
+class ToolResultCache:
+    """
+    单个工具的结果缓存：内存 LRU + TTL，可选的磁盘层，以及相同参数并发调用的合并
+
+    - 缓存键是参数的规范 JSON（键排序）的哈希，参数顺序不同也能命中
+    - 同一事件循环中相同参数的并发调用只执行一次，其余调用等待同一个结果
+    - 调用失败（抛出异常或返回 isError=True 的 MCP 结果）不缓存；某个等待方超时或取消不会中断共享的调用
+    - 每个调用方拿到结果的独立副本，修改返回值不会影响缓存
+    """
+
+    def __init__(self, name: str, policy: TTLPolicy):
+        self.name = name
+        self.policy = policy
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._disk = DiskCache(policy.disk_path, ttl=policy.ttl) if policy.disk_path else None
+        self.stats = {"hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0}
+        self._warned_unserializable = False
+
+    def make_key(self, arguments: Dict[str, Any]) -> str:
+        canonical = json.dumps(arguments, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return f"tool:{self.name}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+    def _get_memory(self, key: str) -> Any:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_memory(self, key: str, value: Any):
+        expires_at = time.time() + self.policy.ttl if self.policy.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max(1, self.policy.max_entries):
+                self._entries.popitem(last=False)
+
+    def _get_disk(self, key: str) -> Any:
+        value = self._disk.get(key, _MISSING)
+        return value if value is _MISSING else _from_disk(value)
+
+    def _set_disk(self, key: str, value: Any):
+        value = _to_disk(value)
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError) as e:
+            # 不能 JSON 序列化的结果只保存在内存层
+            if not self._warned_unserializable:
+                self._warned_unserializable = True
+                print(f"⚠️ 工具 {self.name} 的结果无法 JSON 序列化，不写入磁盘缓存: {e}")
+            return
+        self._disk.set(key, value)
+
+    async def get_or_call(self, arguments: Dict[str, Any], call: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """
+        读取缓存或执行调用
+
+        Returns:
+            (结果, 来源)，来源为 "memory" / "disk" / "coalesced" / "call"
+        """
+        key = self.make_key(arguments)
+        value = self._get_memory(key)
+        if value is not _MISSING:
+            self.stats["hits"] += 1
+            return _copy_result(value), "memory"
+
+        loop = asyncio.get_running_loop()
+        future = self._in_flight.get(key)
+        if future is not None and future.get_loop() is loop:
+            self.stats["coalesced"] += 1
+            return _copy_result(await asyncio.shield(future)), "coalesced"
+
+        future = loop.create_future()
+        self._in_flight[key] = future
+        task = asyncio.ensure_future(self._fill(key, call, future))
+        source = await asyncio.shield(task)
+        return _copy_result(future.result()), source
+
+    async def _fill(self, key: str, call: Callable[[], Awaitable[Any]], future: asyncio.Future) -> str:
+        """执行一次真正的查找/调用并把结果交给所有等待方"""
+        try:
+            source = "call"
+            value = _MISSING
+            if self._disk is not None:
+                value = await asyncio.to_thread(self._get_disk, key)
+                if value is not _MISSING:
+                    source = "disk"
+                    self.stats["disk_hits"] += 1
+            if value is _MISSING:
+                self.stats["misses"] += 1
+                value = await call()
+                if _is_error_result(value):
+                    future.set_result(value)
+                    return source
+                if self._disk is not None:
+                    await asyncio.to_thread(self._set_disk, key, value)
+            self._set_memory(key, value)
+            future.set_result(value)
+            return source
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待方时避免 "Future exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def clear(self):
+        """清空内存层与磁盘层"""
+        with self._lock:
+            self._entries.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {"tool": self.name, "entries": len(self._entries), **self.stats}
@@ -1,17 +1,65 @@
-from typing import List, Dict, Any, Optional, Callable, Union
+from typing import List, Dict, Any, Optional, Callable, Union, Tuple
 import json
+import time
 import asyncio
-import inspect
-from ..utils.extractor import extract_json
+import functools
+import importlib
+import contextvars
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from ..utils.extractor import extract_json, JsonArrayStreamParser
+from ..utils.async_stream import iterate_in_thread
+from ..utils.chunked_extraction import estimate_tokens
+from .ToolRegistry import ToolRegistry, RegisteredTool, build_input_schema
+from .ToolRetriever import ToolRetriever
+from .ToolCache import TTLPolicy, ToolResultCache
 from ..client.MCPClient import MCPClient
 
 
+# 多轮调用时参与工具检索的上下文长度（取最近的部分，避免大段工具结果淹没用户问题）
+RETRIEVAL_CONTEXT_CHARS = 2000
+
+# 当前工具调用提交到线程池 / 进程池的任务，超时后用于判断线程是否仍在运行
+_executor_calls: contextvars.ContextVar[Optional[List[Future]]] = contextvars.ContextVar("tool_executor_calls", default=None)
+
+
 class ToolManager:
     """工具管理器，负责工具的标准化、选择和执行"""
     
-    def __init__(self, chat_client, tools: List[Union[Dict[str, Any], Callable, 'ToolWrapper']]):
+    def __init__(
+        self,
+        chat_client,
+        tools: List[Union[Dict[str, Any], Callable, 'ToolWrapper']],
+        max_concurrency: int = 8,
+        tool_timeout: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        tool_top_k: Optional[int] = None,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None
+    ):
+        """
+        Args:
+            chat_client: 用于工具选择的对话客户端
+            tools: 工具列表（MCP工具字典、普通函数、ToolWrapper）
+            max_concurrency: execute_tools 同时执行的工具数上限
+            tool_timeout: 单个工具的默认超时(秒)，None 表示不限；工具自身的 timeout 优先
+            max_workers: 执行同步函数的线程池 / 进程池大小，默认与 max_concurrency 相同
+            tool_top_k: 工具数超过该值时，先在本地检索出 tool_top_k 个候选工具再交给LLM选择；默认 None 不筛选
+            embed_fn: 可选的批量向量化函数，提供后检索同时使用 BM25 与向量相似度（需要 NumPy）
+        """
         self.chat_client = chat_client
         self.tools = self.normalize_tools(tools)
+        self.registry = ToolRegistry(self.tools)
+        self.tool_top_k = tool_top_k
+        self.retriever = ToolRetriever([entry.config for entry in self.registry], embed_fn=embed_fn)
+        self._full_catalog: Optional[str] = None
+        self.last_selection_tokens = 0
+        self.max_concurrency = max(1, max_concurrency)
+        self.tool_timeout = tool_timeout
+        self.max_workers = max_workers or self.max_concurrency
+        # 信号量绑定首次使用它的事件循环，按当前事件循环创建（ToolManager 可在多次 asyncio.run 之间复用）
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
         
         # 初始化MCP客户端，从工具中提取服务器配置
         mcp_servers = {}
@@ -57,40 +105,8 @@ class ToolManager:
         tool_name = getattr(func, '_tool_name', None) or func.__name__
         tool_description = getattr(func, '_tool_description', None) or func.__doc__ or f"执行函数 {func.__name__}"
         
-        # 获取函数签名
-        try:
-            sig = inspect.signature(func)
-            parameters = {}
-            
-            for param_name, param in sig.parameters.items():
-                param_info = {
-                    "type": "string"  # 默认类型
-                }
-                
-                # 尝试从类型注解获取类型信息
-                if param.annotation != inspect.Parameter.empty:
-                    if param.annotation == int:
-                        param_info["type"] = "integer"
-                    elif param.annotation == float:
-                        param_info["type"] = "number"
-                    elif param.annotation == bool:
-                        param_info["type"] = "boolean"
-                    elif param.annotation == list:
-                        param_info["type"] = "array"
-                    # 其他保持默认的string
-                
-                parameters[param_name] = param_info
-            
-            input_schema = {
-                "type": "object",
-                "properties": parameters,
-                "required": list(parameters.keys())
-            }
-            
-        except Exception as e:
-            print(f"⚠️ 获取函数签名失败: {e}")
-            input_schema = {"type": "object", "properties": {}}
-        
+        input_schema = build_input_schema(func)
+
         return {
             "name": tool_name,
             "description": tool_description,
@@ -99,35 +115,48 @@ class ToolManager:
             "function": func  # 保存原始函数对象
         }
     
-    async def select_tools(self, user_query: str) -> List[Dict[str, Any]]:
+    def _tools_catalog(self, user_query: str, context: str = "") -> str:
         """
-        使用ChatClient智能选择相关的工具
+        生成选择提示词中的工具列表
+
+        工具数超过 tool_top_k 时先用本地检索挑出候选工具，检索词包含用户问题与本轮之前的工具结果
+        （后续轮次需要的工具往往由前面的结果决定）；每个工具的 JSON 片段在注册时已生成，
+        这里只做拼接，完整列表也只拼接一次
         """
-        if not self.tools:
-            return []
-        
-        # 构建工具选择的提示
-        tools_info = []
-        for tool in self.tools:
-            tool_info = {
-                "name": tool["name"],
-                "description": tool["description"],
-                "tool_type": tool.get("tool_type", "unknown")
-            }
-            
-            # 简化inputSchema显示
-            if "inputSchema" in tool and "properties" in tool["inputSchema"]:
-                tool_info["parameters"] = list(tool["inputSchema"]["properties"].keys())
-            
-            tools_info.append(tool_info)
-        
-        system_prompt = f"""你是一个智能工具选择助手。用户会提出问题，你需要从可用工具中选择最相关的工具来帮助回答。
+        if self.tool_top_k and len(self.registry) > self.tool_top_k:
+            query = f"{user_query}\n{context[-RETRIEVAL_CONTEXT_CHARS:]}" if context else user_query
+            candidates = self.retriever.search(query, self.tool_top_k)
+            if candidates:
+                print(f"🔎 从 {len(self.registry)} 个工具中预筛选出 {len(candidates)} 个候选工具")
+                entries = [self.registry.get(tool["name"]).catalog_entry for tool in candidates]
+                return "[\n  " + ",\n  ".join(entries) + "\n]"
+            print("🔎 本地检索没有命中任何工具，使用完整工具列表")
+        if self._full_catalog is None:
+            self._full_catalog = "[\n  " + ",\n  ".join(entry.catalog_entry for entry in self.registry) + "\n]"
+        return self._full_catalog
+
+    @staticmethod
+    def _context_section(context: str) -> str:
+        if not context:
+            return ""
+        return f"""
+已经执行过的工具及结果：
+{context}
+
+如果这些结果已足以回答问题，返回空列表；只在仍缺少信息时选择新的工具，不要重复相同参数的调用。
+"""
+
+    def _selection_prompt(self, user_query: str, context: str = "") -> str:
+        # 构建工具选择的提示（只包含预筛选出的候选工具）
+        tools_catalog = self._tools_catalog(user_query, context)
+
+        return f"""你是一个智能工具选择助手。用户会提出问题，你需要从可用工具中选择最相关的工具来帮助回答。
 
 可用工具列表：
-{json.dumps(tools_info, ensure_ascii=False, indent=2)}
+{tools_catalog}
 
 请根据用户问题选择合适的工具，并为每个工具提供参数。如果不需要任何工具，返回空列表。
-
+{self._context_section(context)}
 用户问题：{user_query}
 
 请以JSON格式返回选择结果，格式如下：
@@ -141,16 +170,24 @@ class ToolManager:
     ]
 }}
 """
-        
-        response_generator = self.chat_client.invoke(system_prompt)
-        # 处理生成器响应
+
+    async def _stream_selection(self, system_prompt: str, on_tool: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """在线程中读取响应事件流（不阻塞事件循环）；提供 on_tool 时每解析出一个完整的工具就回调一次"""
+        parser = JsonArrayStreamParser("selected_tools") if on_tool else None
         full_response = ""
-        for event in response_generator:
+        async for event in iterate_in_thread(lambda: self.chat_client.invoke(system_prompt)):
             if event.get('type') == 'token':
-                full_response += event.get('content', '')
+                content = event.get('content', '')
+                full_response += content
+                if parser:
+                    for tool_info in parser.feed(content):
+                        on_tool(tool_info)
             elif event.get('type') == 'finish':
                 break
-        
+        self.last_selection_tokens = estimate_tokens(system_prompt) + estimate_tokens(full_response)
+        return full_response
+
+    def _parse_selection(self, full_response: str) -> List[Dict[str, Any]]:
         # 解析ChatClient的响应
         try:
             # 使用工具方法提取JSON
@@ -178,105 +215,295 @@ class ToolManager:
         except Exception as e:
             print(f"❌ 解析ChatClient响应失败: {e}")
             return []
-    
+
+    async def select_tools(self, user_query: str, context: str = "") -> List[Dict[str, Any]]:
+        """
+        使用ChatClient智能选择相关的工具
+
+        Args:
+            user_query: 用户问题（同时用于本地预筛选候选工具）
+            context: 之前轮次的工具执行结果，多轮调用时提供，只放进提示词
+        """
+        self.last_selection_tokens = 0
+        if not self.tools:
+            return []
+        full_response = await self._stream_selection(self._selection_prompt(user_query, context))
+        return self._parse_selection(full_response)
+
+    @staticmethod
+    def call_key(tool_info: Dict[str, Any]) -> tuple:
+        """工具调用的去重键：工具名 + 规范化的参数"""
+        arguments = json.dumps(tool_info.get('arguments', {}), sort_keys=True, ensure_ascii=False, default=str)
+        return tool_info.get('tool_name'), arguments
+
+    async def select_and_execute(
+        self,
+        user_query: str,
+        context: str = "",
+        exclude: Optional[set] = None,
+        deadline: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        边选择边执行：模型的响应流中每个工具的JSON对象一完整就立即开始执行，
+        前面工具的I/O与模型生成后续工具重叠
+
+        Args:
+            user_query: 用户问题
+            context: 之前轮次的工具执行结果
+            exclude: 已执行过的调用（call_key 集合），其中的调用不再执行；本次执行的调用会加入该集合
+            deadline: time.monotonic() 截止时间，到期时取消尚未完成的工具，只返回已完成的结果
+
+        Returns:
+            (模型选择的工具列表, 本次执行的工具结果列表（按选择顺序）)
+        """
+        self.last_selection_tokens = 0
+        if not self.tools:
+            return [], []
+        exclude = exclude if exclude is not None else set()
+        tasks: List[asyncio.Future] = []
+
+        def dispatch(tool_info: Dict[str, Any]):
+            if not isinstance(tool_info, dict):
+                return
+            key = self.call_key(tool_info)
+            if key in exclude:
+                return
+            exclude.add(key)
+            print(f"⚡ 开始执行工具: {tool_info.get('tool_name', 'unknown')}")
+            tasks.append(asyncio.ensure_future(self._execute_one(tool_info)))
+
+        try:
+            full_response = await self._stream_selection(self._selection_prompt(user_query, context), dispatch)
+            selected_tools = self._parse_selection(full_response)
+            # 增量解析没有识别出的工具（如响应格式不规范）在完整解析后补充执行；
+            # 按 call_key 判断是否已执行，不依赖两种解析结果的顺序一致
+            for tool_info in selected_tools:
+                dispatch(tool_info)
+            if not tasks:
+                return selected_tools, []
+
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            if pending:
+                print(f"⏱️ 时间已到，取消 {len(pending)} 个未完成的工具")
+                for task in pending:
+                    task.cancel()
+                # 等待取消完成，不让未完成的工具在返回后继续运行
+                await asyncio.gather(*pending, return_exceptions=True)
+            return selected_tools, [task.result() for task in tasks if task in done]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
     async def execute_tools(self, selected_tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        执行选定的工具
+        并发执行选定的工具，结果按选择顺序返回
+
+        - 同时执行的工具数不超过 max_concurrency
+        - 同步函数在线程池（或 executor="process" 时在进程池）中执行，不阻塞事件循环
+        - 单个工具超时或失败只影响它自己的结果；取消 execute_tools 会取消所有未完成的工具
+        - 同步函数的超时是尽力而为的：线程无法被中断，超时后会继续运行到结束，在此之前仍占用并发名额
         """
-        results = []
-        
-        for tool_info in selected_tools:
+        if not selected_tools:
+            return []
+        return list(await asyncio.gather(*(self._execute_one(tool_info) for tool_info in selected_tools)))
+
+    async def _execute_one(self, tool_info: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单个工具，异常与超时都转换为 status="error" 的结果"""
+        tool_name = tool_info.get('tool_name', 'unknown')
+        arguments = tool_info.get('arguments', {})
+        reason = tool_info.get('reason', '')
+        timeout = None
+        try:
+            entry = self.registry.get(tool_name)
+            if entry is None:
+                raise ValueError(f"未找到工具: {tool_name}")
+
+            tool_type = entry.tool_type
+            timeout = entry.config.get('timeout', self.tool_timeout)
+            semaphore = self._get_semaphore()
+            await semaphore.acquire()
+            calls: List[Future] = []
+            token = _executor_calls.set(calls)
             try:
-                tool_name = tool_info.get('tool_name')
-                arguments = tool_info.get('arguments', {})
-                reason = tool_info.get('reason', '')
-                
-                # 查找对应的工具配置
-                tool_config = None
-                for tool in self.tools:
-                    if tool['name'] == tool_name:
-                        tool_config = tool
-                        break
-                
-                if not tool_config:
-                    raise ValueError(f"未找到工具: {tool_name}")
-                
-                # 根据工具类型执行不同的调用逻辑
-                tool_type = tool_config.get('tool_type', 'unknown')
-                
-                if tool_type == 'mcp':
-                    # MCP工具调用
-                    if not self.mcp_client:
-                        raise ValueError("MCP客户端未初始化")
-                    server_name = tool_config.get('server_name', 'default')
-                    result = await self.mcp_client.call_tool(tool_name, server_name, arguments)
-                elif tool_type == 'function':
-                    # 自定义函数调用
-                    result = await self.call_custom_function(tool_config, arguments)
-                else:
-                    raise ValueError(f"不支持的工具类型: {tool_type}")
-                
-                # 打印工具执行结果
-                print(f"✅ 工具执行成功: {tool_name}")
-                print(f"   工具类型: {tool_type}")
-                print(f"   调用参数: {arguments}")
-                print(f"   执行结果: {result}")
-                print()
-                
-                results.append({
-                    "tool": tool_name,
-                    "tool_type": tool_type,
-                    "reason": reason,
-                    "arguments": arguments,
-                    "result": result,
-                    "status": "success"
-                })
-                
-            except Exception as e:
-                tool_name = tool_info.get('tool_name', 'unknown')
-                print(f"❌ 工具执行失败: {tool_name}")
-                print(f"   错误信息: {e}")
-                print(f"   调用参数: {tool_info.get('arguments', {})}")
-                print()
-                
-                results.append({
-                    "tool": tool_name,
-                    "error": str(e),
-                    "status": "error"
-                })
-        
-        return results
-    
+                result = await asyncio.wait_for(self._invoke_tool(entry, arguments), timeout)
+            finally:
+                _executor_calls.reset(token)
+                self._release_when_finished(semaphore, calls)
+
+            # 打印工具执行结果
+            print(f"✅ 工具执行成功: {tool_name}")
+            print(f"   工具类型: {tool_type}")
+            print(f"   调用参数: {arguments}")
+            print(f"   执行结果: {result}")
+            print()
+
+            return {
+                "tool": tool_name,
+                "tool_type": tool_type,
+                "reason": reason,
+                "arguments": arguments,
+                "result": result,
+                "status": "success"
+            }
+
+        except Exception as e:
+            error = f"工具执行超时（{timeout}秒）" if isinstance(e, asyncio.TimeoutError) else str(e)
+            print(f"❌ 工具执行失败: {tool_name}")
+            print(f"   错误信息: {error}")
+            print(f"   调用参数: {arguments}")
+            print()
+
+            return {
+                "tool": tool_name,
+                "error": error,
+                "status": "error"
+            }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @staticmethod
+    def _release_when_finished(semaphore: asyncio.Semaphore, calls: List[Future]):
+        """释放并发名额；超时或取消后仍在运行的同步函数结束时才释放"""
+        running = [call for call in calls if not call.done()]
+        if not running:
+            semaphore.release()
+            return
+        loop = asyncio.get_running_loop()
+        remaining = [len(running)]
+
+        def on_done(_):
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                try:
+                    loop.call_soon_threadsafe(semaphore.release)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    pass
+
+        for call in running:
+            call.add_done_callback(on_done)
+
+    async def _invoke_tool(self, entry: RegisteredTool, arguments: Dict[str, Any]) -> Any:
+        """校验参数后根据工具类型执行不同的调用逻辑"""
+        if entry.tool_type not in ('mcp', 'function'):
+            raise ValueError(f"不支持的工具类型: {entry.tool_type}")
+        try:
+            arguments = entry.validate(arguments)
+        except ValueError as e:
+            raise ValueError(f"参数校验失败: {e}")
+
+        if entry.cache is None:
+            return await self._dispatch(entry, arguments)
+        result, source = await entry.cache.get_or_call(arguments, lambda: self._dispatch(entry, arguments))
+        if source != "call":
+            print(f"♻️ 使用缓存的工具结果({source}): {entry.name}")
+        return result
+
+    async def _dispatch(self, entry: RegisteredTool, arguments: Dict[str, Any]) -> Any:
+        if entry.tool_type == 'mcp':
+            # MCP工具调用
+            if not self.mcp_client:
+                raise ValueError("MCP客户端未初始化")
+            server_name = entry.config.get('server_name', 'default')
+            return await self.mcp_client.call_tool(entry.name, server_name, arguments)
+        # 自定义函数调用
+        return await self._call_registered_function(entry, arguments)
+
     async def call_custom_function(self, tool_config: Dict[str, Any], arguments: Dict[str, Any]) -> Any:
         """
-        调用自定义Python函数
+        调用自定义Python函数；已注册的工具直接使用预编译的适配器
         """
-        func = tool_config.get('function')
-        if not callable(func):
+        if not callable(tool_config.get('function')):
             raise ValueError("工具配置中没有可调用的函数")
-        
-        # 获取函数签名，匹配参数
+        entry = self.registry.get(tool_config.get('name'))
+        if entry is None or entry.config is not tool_config:
+            entry = ToolRegistry.compile(tool_config)
         try:
-            sig = inspect.signature(func)
-            bound_args = sig.bind(**arguments)
-            bound_args.apply_defaults()
-            
-            # 检查函数是否是异步的
-            if asyncio.iscoroutinefunction(func):
-                result = await func(**bound_args.arguments)
+            arguments = entry.validate(arguments)
+        except ValueError as e:
+            raise ValueError(f"调用函数失败: {e}")
+        return await self._call_registered_function(entry, arguments)
+
+    async def _call_registered_function(self, entry: RegisteredTool, arguments: Dict[str, Any]) -> Any:
+        """按预编译的适配器调用函数；同步函数交给线程池或进程池执行"""
+        func = entry.function
+        args, kwargs = entry.bind(arguments)
+        try:
+            if entry.is_async:
+                return await func(*args, **kwargs)
+
+            kind = entry.config.get('executor', 'thread')
+            if kind == 'process':
+                # 按模块与名称在子进程中重新导入函数，@tool 装饰后的函数同样可用
+                call = functools.partial(_call_in_process, func.__module__, func.__qualname__, args, kwargs)
             else:
-                result = func(**bound_args.arguments)
-            
-            return result
-            
+                call = functools.partial(func, *args, **kwargs)
+            future = self._get_executor(kind).submit(call)
+            calls = _executor_calls.get()
+            if calls is not None:
+                calls.append(future)
+            return await asyncio.wrap_future(future)
+
         except Exception as e:
             raise ValueError(f"调用函数失败: {e}")
 
+    def _get_executor(self, kind: str) -> Executor:
+        """按需创建执行同步工具的线程池 / 进程池"""
+        if kind == 'process':
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._process_pool
+        if kind != 'thread':
+            raise ValueError(f"不支持的执行方式: {kind}")
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        return self._thread_pool
+
+    def cache_stats(self) -> List[Dict[str, Any]]:
+        """启用了结果缓存的工具的命中统计"""
+        return [entry.cache.info() for entry in self.registry if entry.cache is not None]
+
+    async def aclose(self):
+        """关闭线程池、进程池与MCP连接；仍在运行的同步工具不再等待"""
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
+        if self.mcp_client:
+            await self.mcp_client.aclose()
+
+
+
+def _call_in_process(module_name: str, qualname: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """在进程池中执行同步工具：按名称导入函数（ToolWrapper 取其原函数）后调用"""
+    target = importlib.import_module(module_name)
+    for part in qualname.split('.'):
+        target = getattr(target, part)
+    if isinstance(target, ToolWrapper):
+        target = target.func
+    return target(*args, **kwargs)
 
 
 # 工具包装器类，用于更灵活地定义自定义工具
 class ToolWrapper:
-    def __init__(self, func: Callable, name: Optional[str] = None, description: Optional[str] = None):
+    def __init__(
+        self,
+        func: Callable,
+        name: Optional[str] = None,
+        description: Optional[str] = None,
+        timeout: Optional[float] = None,
+        executor: str = "thread",
+        cache: Optional[TTLPolicy] = None
+    ):
         """
         工具包装器
         
@@ -284,52 +511,52 @@ class ToolWrapper:
             func: 要包装的函数
             name: 工具名称（如果不提供则使用函数名）
             description: 工具描述（如果不提供则使用函数文档）
+            timeout: 执行超时(秒)，覆盖 ToolManager 的 tool_timeout
+            executor: 同步函数的执行方式，"thread"（线程池）或 "process"（进程池，适合CPU密集型函数，函数与参数需可pickle）
+            cache: 结果缓存策略，仅用于幂等工具；缓存属于工具本身，使用该工具的所有 ToolManager 共享
         """
         self.func = func
         self.name = name or func.__name__
         self.description = description or func.__doc__ or f"自定义工具: {self.name}"
+        self.timeout = timeout
+        self.executor = executor
+        self.cache = ToolResultCache(self.name, cache) if cache else None
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为标准工具字典格式"""
-        # 获取函数签名
-        sig = inspect.signature(self.func)
-        parameters = {}
-        for param_name, param in sig.parameters.items():
-            param_type = "string"  # 默认类型
-            if param.annotation != inspect.Parameter.empty:
-                if param.annotation == int:
-                    param_type = "number"
-                elif param.annotation == float:
-                    param_type = "number"
-                elif param.annotation == bool:
-                    param_type = "boolean"
-            
-            parameters[param_name] = {
-                "type": param_type,
-                "description": f"参数 {param_name}"
-            }
-        
-        return {
+        tool_dict = {
             "name": self.name,
             "description": self.description,
             "tool_type": "function",
             "function": self.func,
             "server_name": "local",
-            "inputSchema": {
-                "type": "object",
-                "properties": parameters
-            }
+            "executor": self.executor,
+            "inputSchema": build_input_schema(self.func)
         }
+        if self.timeout is not None:
+            tool_dict["timeout"] = self.timeout
+        if self.cache is not None:
+            tool_dict["cache"] = self.cache
+        return tool_dict
 
 
 # 便捷的装饰器函数
-def tool(name: Optional[str] = None, description: Optional[str] = None):
+def tool(
+    name: Optional[str] = None,
+    description: Optional[str] = None,
+    timeout: Optional[float] = None,
+    executor: str = "thread",
+    cache: Optional[TTLPolicy] = None
+):
     """
     装饰器，用于将函数标记为工具
     
     Args:
         name: 工具名称
         description: 工具描述
+        timeout: 执行超时(秒)
+        executor: 同步函数的执行方式，"thread" 或 "process"
+        cache: 结果缓存策略（TTLPolicy），用于纯查询类的幂等工具
     
     Usage:
         @tool(name="加法计算器", description="计算两个数的和")
@@ -337,5 +564,5 @@ def tool(name: Optional[str] = None, description: Optional[str] = None):
             return a + b
     """
     def decorator(func: Callable) -> ToolWrapper:
-        return ToolWrapper(func, name, description)
+        return ToolWrapper(func, name, description, timeout, executor, cache)
     return decorator
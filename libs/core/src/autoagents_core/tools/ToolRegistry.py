@@ -0,0 +1,364 @@
+import json
+import types
+import typing
+import inspect
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator, Union, Literal
+from .ToolCache import TTLPolicy, ToolResultCache
+
+
+# Python 类型注解到 JSON Schema 类型的映射
+JSON_TYPES = {
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    str: "string",
+    list: "array",
+    tuple: "array",
+    set: "array",
+    dict: "object",
+}
+
+
+def annotation_to_schema(annotation: Any) -> Dict[str, Any]:
+    """
+    将参数的类型注解转换为 JSON Schema 片段
+
+    支持 int/float/bool/str/list/dict、List[X]、Dict[K, V]、Optional[X]、Literal[...]，
+    其他类型按 string 处理
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is Union or origin is types.UnionType:
+        options = [arg for arg in args if arg is not type(None)]
+        schemas = [annotation_to_schema(arg) for arg in options]
+        if len(schemas) == 1:
+            schema = dict(schemas[0])
+            if len(options) < len(args) and "type" in schema:
+                schema["type"] = [schema["type"], "null"]
+            return schema
+        return {"anyOf": schemas}
+
+    if origin is Literal:
+        schema: Dict[str, Any] = {"enum": list(args)}
+        if args and type(args[0]) in JSON_TYPES:
+            schema["type"] = JSON_TYPES[type(args[0])]
+        return schema
+
+    if origin in (list, tuple, set):
+        schema = {"type": "array"}
+        if args and args[0] is not Ellipsis:
+            schema["items"] = annotation_to_schema(args[0])
+        return schema
+
+    if origin is dict:
+        return {"type": "object"}
+
+    return {"type": JSON_TYPES.get(annotation, "string")}
+
+
+def resolve_annotations(func: Callable) -> Dict[str, Any]:
+    """
+    解析函数参数的类型注解
+
+    使用 `from __future__ import annotations` 的模块中注解都是字符串，需要用 typing.get_type_hints 求值；
+    求值失败（如引用了未导入的名称）时退回原始注解
+    """
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return {}
+    annotations = {
+        name: param.annotation for name, param in params.items()
+        if param.annotation is not inspect.Parameter.empty
+    }
+    try:
+        hints = typing.get_type_hints(func)
+    except Exception:
+        return annotations
+    return {name: hints.get(name, annotation) for name, annotation in annotations.items()}
+
+
+def build_input_schema(func: Callable) -> Dict[str, Any]:
+    """
+    根据函数签名生成工具的 inputSchema
+
+    - 有类型注解的参数按注解映射类型，没有注解的默认为 string
+    - 没有默认值的参数为必需参数；*args / **kwargs 不出现在 schema 中
+    """
+    properties: Dict[str, Any] = {}
+    required: List[str] = []
+    try:
+        sig = inspect.signature(func)
+    except (TypeError, ValueError) as e:
+        print(f"⚠️ 获取函数签名失败: {e}")
+        return {"type": "object", "properties": {}}
+
+    annotations = resolve_annotations(func)
+    for param_name, param in sig.parameters.items():
+        if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        if param_name not in annotations:
+            param_info = {"type": "string"}
+        else:
+            param_info = annotation_to_schema(annotations[param_name])
+        param_info["description"] = f"参数 {param_name}"
+        properties[param_name] = param_info
+        if param.default is inspect.Parameter.empty:
+            required.append(param_name)
+
+    return {"type": "object", "properties": properties, "required": required}
+
+
+def _coerce_integer(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        return int(value.strip())
+    raise TypeError
+
+
+def _coerce_number(value: Any) -> Any:
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        return float(value.strip())
+    raise TypeError
+
+
+def _coerce_boolean(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise TypeError
+
+
+def _expect(*kinds: type) -> Callable[[Any], Any]:
+    def check(value: Any) -> Any:
+        if isinstance(value, kinds) and not isinstance(value, bool):
+            return value
+        raise TypeError
+    return check
+
+
+def _check_string(value: Any) -> Any:
+    if isinstance(value, str):
+        return value
+    raise TypeError
+
+
+def _check_null(value: Any) -> Any:
+    if value is None:
+        return value
+    raise TypeError
+
+
+# LLM 经常把数字、布尔值写成字符串，这里做宽松的类型转换
+TYPE_COERCERS: Dict[str, Callable[[Any], Any]] = {
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "boolean": _coerce_boolean,
+    "string": _check_string,
+    "array": _expect(list, tuple),
+    "object": _expect(dict),
+    "null": _check_null,
+}
+
+
+def _compile_property(name: str, schema: Dict[str, Any]) -> Optional[Callable[[Any], Any]]:
+    """把单个属性的 schema 编译为校验/转换函数；无法校验的 schema 返回 None（不检查）"""
+    type_names = schema.get("type")
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    coercers = [TYPE_COERCERS[t] for t in (type_names or []) if t in TYPE_COERCERS]
+    enum = schema.get("enum")
+    if not coercers and enum is None:
+        return None
+    expected = "/".join(type_names or []) or f"{enum}"
+
+    def check(value: Any) -> Any:
+        if coercers:
+            for coerce in coercers:
+                try:
+                    value = coerce(value)
+                    break
+                except (TypeError, ValueError):
+                    continue
+            else:
+                raise ValueError(f"参数 {name} 应为 {expected}，实际为 {value!r}")
+        if enum is not None and value not in enum:
+            raise ValueError(f"参数 {name} 应为 {enum} 之一，实际为 {value!r}")
+        return value
+
+    return check
+
+
+def compile_validator(
+    properties: Dict[str, Dict[str, Any]],
+    required: List[str],
+    allow_extra: bool = True
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    把 inputSchema 编译为参数校验函数
+
+    校验函数返回类型转换后的新参数字典；缺少必需参数、出现未知参数（allow_extra=False 时）
+    或类型不符时抛出 ValueError
+    """
+    checks = {}
+    for name, schema in properties.items():
+        check = _compile_property(name, schema) if isinstance(schema, dict) else None
+        if check is not None:
+            checks[name] = check
+    required = list(required)
+    known = set(properties)
+
+    def validate(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(arguments, dict):
+            raise ValueError(f"参数应为对象，实际为 {type(arguments).__name__}")
+        missing = [name for name in required if name not in arguments]
+        if missing:
+            raise ValueError(f"缺少必需参数: {', '.join(missing)}")
+        if not allow_extra:
+            unknown = [name for name in arguments if name not in known]
+            if unknown:
+                raise ValueError(f"未知参数: {', '.join(unknown)}")
+        validated = dict(arguments)
+        for name, check in checks.items():
+            if name in validated:
+                validated[name] = check(validated[name])
+        return validated
+
+    return validate
+
+
+@dataclass
+class RegisteredTool:
+    """注册后的工具：标准化的工具字典 + 预编译的参数校验器与调用适配器"""
+    name: str
+    tool_type: str
+    config: Dict[str, Any]
+    validate: Callable[[Dict[str, Any]], Dict[str, Any]]
+    function: Optional[Callable] = None
+    is_async: bool = False
+    positional_only: Tuple[str, ...] = field(default_factory=tuple)
+    catalog_entry: str = ""
+    cache: Optional[ToolResultCache] = None
+
+    def bind(self, arguments: Dict[str, Any]) -> Tuple[tuple, Dict[str, Any]]:
+        """把（已校验的）参数字典拆分为函数调用的 args 与 kwargs"""
+        if not self.positional_only:
+            return (), arguments
+        kwargs = dict(arguments)
+        args = tuple(kwargs.pop(name) for name in self.positional_only if name in kwargs)
+        return args, kwargs
+
+
+class ToolRegistry:
+    """
+    按名称索引的工具注册表
+
+    注册时一次性完成 schema 解析、签名分析与校验器编译，之后按名称 O(1) 查找，
+    每次调用的开销与工具数量无关
+    """
+
+    def __init__(self, tools: Optional[List[Dict[str, Any]]] = None):
+        self._tools: Dict[str, RegisteredTool] = {}
+        for tool in tools or []:
+            self.register(tool)
+
+    @staticmethod
+    def catalog_entry(config: Dict[str, Any]) -> str:
+        """工具在选择提示词中的单行 JSON 描述（注册时生成一次，之后直接拼接）"""
+        tool_info = {
+            "name": config["name"],
+            "description": config.get("description", ""),
+            "tool_type": config.get("tool_type", "unknown")
+        }
+        schema = config.get("inputSchema") or {}
+        if "properties" in schema:
+            tool_info["parameters"] = list(schema["properties"].keys())
+        return json.dumps(tool_info, ensure_ascii=False)
+
+    @staticmethod
+    def compile(config: Dict[str, Any]) -> RegisteredTool:
+        """为标准化的工具字典预编译校验器、调用适配器与提示词片段"""
+        schema = config.get("inputSchema") or {}
+        properties = schema.get("properties") or {}
+        required = schema.get("required") or []
+        func = config.get("function")
+        cache = config.get("cache")
+        if isinstance(cache, TTLPolicy):
+            cache = ToolResultCache(config["name"], cache)
+
+        if config.get("tool_type") != "function" or not callable(func):
+            return RegisteredTool(
+                name=config["name"],
+                tool_type=config.get("tool_type", "unknown"),
+                config=config,
+                validate=compile_validator(properties, required, schema.get("additionalProperties") is not False),
+                catalog_entry=ToolRegistry.catalog_entry(config),
+                cache=cache
+            )
+
+        try:
+            params = list(inspect.signature(func).parameters.values())
+        except (TypeError, ValueError):
+            params = []
+        accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params) or not params
+        named = [p for p in params if p.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)]
+        # 只校验有类型注解的参数，没有注解的参数原样传入
+        annotations = resolve_annotations(func)
+        annotated = {p.name: annotation_to_schema(annotations[p.name]) for p in named if p.name in annotations}
+        validate = compile_validator(
+            {**{p.name: {} for p in named}, **annotated},
+            [p.name for p in named if p.default is inspect.Parameter.empty],
+            allow_extra=accepts_kwargs
+        )
+        return RegisteredTool(
+            name=config["name"],
+            tool_type="function",
+            config=config,
+            validate=validate,
+            function=func,
+            is_async=asyncio.iscoroutinefunction(func),
+            positional_only=tuple(p.name for p in named if p.kind == inspect.Parameter.POSITIONAL_ONLY),
+            catalog_entry=ToolRegistry.catalog_entry(config),
+            cache=cache
+        )
+
+    def register(self, config: Dict[str, Any]) -> Optional[RegisteredTool]:
+        """注册工具；名称重复时保留先注册的工具并返回 None"""
+        name = config.get("name")
+        if not name:
+            print(f"⚠️ 跳过没有名称的工具: {config}")
+            return None
+        if name in self._tools:
+            print(f"⚠️ 工具名称重复，已忽略: {name}")
+            return None
+        entry = self.compile(config)
+        self._tools[name] = entry
+        return entry
+
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def __iter__(self) -> Iterator[RegisteredTool]:
+        return iter(self._tools.values())
+
+    def names(self) -> List[str]:
+        return list(self._tools)
@@ -0,0 +1,135 @@
+import re
+import math
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Optional, Callable, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_WORD = re.compile(r"[a-z0-9]+")
+_CJK_RUN = re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    BM25 分词：英文按 camelCase / snake_case / 非字母数字切分并转小写，
+    中文按单字与相邻两字切分（不依赖分词词典）
+    """
+    if not text:
+        return []
+    tokens = _WORD.findall(_CAMEL_BOUNDARY.sub(" ", text).lower())
+    for run in _CJK_RUN.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def tool_document(tool: Dict[str, Any]) -> str:
+    """用于检索的工具文本：名称、描述、参数名与参数描述"""
+    parts = [tool.get("name", ""), tool.get("description") or ""]
+    properties = (tool.get("inputSchema") or {}).get("properties") or {}
+    for param_name, param in properties.items():
+        parts.append(param_name)
+        if isinstance(param, dict) and param.get("description"):
+            parts.append(str(param["description"]))
+    return " ".join(parts)
+
+
+class ToolRetriever:
+    """
+    本地工具检索：在调用 LLM 选择工具之前，用 BM25（可选叠加向量相似度）挑出候选工具
+
+    - 索引在创建时一次性建立，查询只遍历命中词项的倒排表
+    - 提供 embed_fn 且安装了 NumPy 时，BM25 与向量检索的排名按 RRF 融合
+
+    Usage:
+        retriever = ToolRetriever(tools)
+        candidates = retriever.search("查询北京明天的天气", top_k=10)
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Dict[str, Any]],
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """
+        Args:
+            tools: 标准化后的工具字典列表
+            embed_fn: 可选的批量向量化函数（文本列表 -> 向量列表），需要 NumPy
+            k1: BM25 词频饱和参数
+            b: BM25 文档长度归一化参数
+        """
+        self.tools = list(tools)
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, List[tuple]] = defaultdict(list)
+        self._doc_lengths: List[int] = []
+        documents = [tool_document(tool) for tool in self.tools]
+        for index, document in enumerate(documents):
+            tokens = tokenize(document)
+            self._doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self._postings[term].append((index, freq))
+        self._avg_length = (sum(self._doc_lengths) / len(self._doc_lengths)) if self._doc_lengths else 0.0
+        count = len(self.tools)
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+        self.embed_fn = None
+        self._embeddings = None
+        if embed_fn is not None:
+            if not NUMPY_AVAILABLE:
+                print("⚠️ 未安装 numpy，工具检索仅使用 BM25")
+            elif self.tools:
+                self.embed_fn = embed_fn
+                self._embeddings = self._normalize(np.asarray(embed_fn(documents), dtype=np.float32))
+
+    @staticmethod
+    def _normalize(vectors):
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def bm25_scores(self, query: str) -> Dict[int, float]:
+        """返回 {工具下标: BM25 分数}，只包含至少命中一个词项的工具"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for index, freq in postings:
+                length_norm = 1 - self.b + self.b * self._doc_lengths[index] / (self._avg_length or 1)
+                scores[index] += idf * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+        return scores
+
+    def search(self, query: str, top_k: int = 20) -> List[Dict[str, Any]]:
+        """
+        返回与查询最相关的至多 top_k 个工具（按相关度降序）
+
+        没有任何工具与查询相关时返回空列表，由调用方决定是否退回完整工具列表
+        """
+        bm25 = self.bm25_scores(query)
+        ranked = sorted(bm25, key=lambda index: (-bm25[index], index))
+
+        if self._embeddings is not None:
+            query_vector = self._normalize(np.asarray(self.embed_fn([query])[0], dtype=np.float32))
+            similarity = self._embeddings @ query_vector
+            dense = [int(index) for index in np.argsort(-similarity)[:top_k * 2]]
+            # Reciprocal Rank Fusion：只依赖排名，不需要对两种分数做归一化
+            fused: Dict[int, float] = defaultdict(float)
+            for ranking in (ranked, dense):
+                for rank, index in enumerate(ranking):
+                    fused[index] += 1.0 / (60 + rank)
+            ranked = sorted(fused, key=lambda index: (-fused[index], index))
+
+        return [self.tools[index] for index in ranked[:top_k]]
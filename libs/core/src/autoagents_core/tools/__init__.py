@@ -5,9 +5,17 @@ autoagents_core Tools Module
 """
 
 from .ToolManager import ToolManager, ToolWrapper, tool
+from .ToolRegistry import ToolRegistry, RegisteredTool
+from .ToolRetriever import ToolRetriever
+from .ToolCache import TTLPolicy, ToolResultCache
 
 __all__ = [
     'ToolManager',
     'ToolWrapper', 
-    'tool'
+    'tool',
+    'ToolRegistry',
+    'RegisteredTool',
+    'ToolRetriever',
+    'TTLPolicy',
+    'ToolResultCache'
 ] 
\ No newline at end of file
@@ -1,7 +1,9 @@
 from .extractor import extract_json
 from .uploader import FileUploader
+from .http_cache import HttpCache
+from .disk_cache import DiskCache
 
-__all__ = ["extract_json", "FileUploader"]
+__all__ = ["extract_json", "FileUploader", "HttpCache", "DiskCache"]
 
 
 def main() -> None:
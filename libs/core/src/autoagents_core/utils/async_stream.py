@@ -0,0 +1,47 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+    """
+    在后台线程中消费同步迭代器（如 ChatClient.invoke 的事件流），逐个转交给事件循环
+
+    同步迭代器中的阻塞 I/O 不会卡住事件循环；异步迭代提前结束时，后台线程在下一个元素后停止
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item: Any):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            # 事件循环已关闭
+            stop.set()
+
+    def produce():
+        try:
+            for item in make_iterator():
+                if stop.is_set():
+                    break
+                put(item)
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -0,0 +1,152 @@
+import re
+import json
+from typing import List, Dict, Any, Optional
+
+
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数：中日韩字符按1个token计，其余按4个字符1个token计"""
+    if not text:
+        return 0
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _split_blocks(text: str) -> List[str]:
+    """按结构拆分：优先按空行分段，没有空行时按行拆分"""
+    blocks = [b for b in re.split(r"\n\s*\n", text) if b.strip()]
+    if len(blocks) > 1:
+        return blocks
+    return [line for line in text.split("\n") if line.strip()]
+
+
+def _split_oversized(block: str, max_tokens: int) -> List[str]:
+    """单个块超过预算时按行、再按字符切分"""
+    if estimate_tokens(block) <= max_tokens:
+        return [block]
+    lines = block.split("\n")
+    if len(lines) > 1:
+        pieces: List[str] = []
+        for line in lines:
+            pieces.extend(_split_oversized(line, max_tokens))
+        return pieces
+    # 单行仍然过长，按估算的字符数硬切
+    ratio = max(1, len(block) // max(1, estimate_tokens(block)))
+    size = max(1, max_tokens * ratio)
+    return [block[i:i + size] for i in range(0, len(block), size)]
+
+
+def split_text(text: str, max_tokens: int, overlap_tokens: int = 200) -> List[str]:
+    """
+    按文本结构切分为不超过 max_tokens 的块，相邻块之间保留约 overlap_tokens 的重叠，
+    避免跨块的记录被截断后丢失
+
+    Args:
+        text: 待切分文本
+        max_tokens: 每块的token上限
+        overlap_tokens: 相邻块重叠的token数
+
+    Returns:
+        List[str]: 文本块列表
+    """
+    max_tokens = max(1, max_tokens)
+    overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+    separator = "\n\n" if "\n\n" in text else "\n"
+
+    units: List[str] = []
+    for block in _split_blocks(text):
+        units.extend(_split_oversized(block, max_tokens))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(separator.join(current))
+            # 从上一块的末尾取若干单元作为重叠
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous)
+                if overlap_size + previous_tokens > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous_tokens
+            current, current_tokens = overlap, overlap_size
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def _resolve(schema: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """解析 $ref 与 Optional(anyOf 含 null) 包装"""
+    while True:
+        if "$ref" in schema:
+            schema = defs.get(schema["$ref"].split("/")[-1], {})
+            continue
+        variants = schema.get("anyOf") or schema.get("oneOf")
+        if variants:
+            non_null = [v for v in variants if v.get("type") != "null"]
+            if len(non_null) == 1:
+                schema = non_null[0]
+                continue
+        return schema
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _merge_values(values: List[Any], schema: Dict[str, Any], defs: Dict[str, Any]) -> Any:
+    schema = _resolve(schema, defs)
+    present = [v for v in values if not _is_empty(v)]
+    if not present:
+        return values[0] if values else None
+
+    if schema.get("type") == "array" or all(isinstance(v, list) for v in present):
+        # 列表：按块顺序拼接并去重（重叠区域会产生重复记录）
+        merged: List[Any] = []
+        seen = set()
+        for value in present:
+            for item in value if isinstance(value, list) else [value]:
+                key = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(item)
+        return merged
+
+    properties = schema.get("properties")
+    if properties and all(isinstance(v, dict) for v in present):
+        # 对象：按字段递归合并
+        keys = list(properties) + [k for v in present for k in v if k not in properties]
+        merged_obj: Dict[str, Any] = {}
+        for key in dict.fromkeys(keys):
+            field_values = [v.get(key) for v in present if key in v]
+            if field_values:
+                merged_obj[key] = _merge_values(field_values, properties.get(key, {}), defs)
+        return merged_obj
+
+    # 标量：取第一个非空值
+    return present[0]
+
+
+def merge_partials(partials: List[Optional[Dict[str, Any]]], json_schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    按 schema 合并各块的提取结果：列表拼接去重，对象逐字段合并，标量取第一个非空值
+
+    Args:
+        partials: 各块提取出的字典（提取失败的块为 None）
+        json_schema: pydantic 模型的 model_json_schema()
+
+    Returns:
+        合并后的字典，全部失败时返回 None
+    """
+    valid = [p for p in partials if isinstance(p, dict)]
+    if not valid:
+        return None
+    return _merge_values(valid, json_schema, json_schema.get("$defs", {}))
@@ -0,0 +1,312 @@
+import re
+from typing import Optional, List, Dict
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+# 不包含任何可见文本的标签
+INVISIBLE_TAGS = {
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "object", "embed", "link", "meta", "head", "title"
+}
+
+# 通常是导航、页眉页脚等样板内容的标签（包含 h1 的 header 是页面标题区域，不在此列）
+BOILERPLATE_TAGS = {"nav", "footer", "aside", "dialog", "header"}
+
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "dialog", "alertdialog"}
+
+# 表单只有在控件少、文字少时（搜索框、登录框、订阅框）才视为样板内容；
+# ASP.NET WebForms 等页面用一个 form 包住整个页面，不能整体删除
+SMALL_FORM_MAX_CONTROLS = 6
+SMALL_FORM_MAX_TEXT = 200
+FORM_CONTENT_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "p", "article", "main", "section", "table", "img")
+
+# class/id 命中负向规则且未命中正向规则的元素视为样板内容（参考 readability）；
+# 导航类关键词只匹配以其结尾的完整 class/id（如 "main-menu"、"site-footer"），"menu-list" 这类内容元素不受影响
+NEGATIVE_PATTERN = re.compile(
+    r"cookie|consent|gdpr|breadcrumb|\bshare\b|social|advert|\bads?\b|\bad-|sponsor|popup|modal|newsletter|subscribe|promo|"
+    r"(?:^|[\s_-])(?:navbar|nav|menu|sidebar|footer)(?=$|\s)",
+    re.IGNORECASE
+)
+POSITIVE_PATTERN = re.compile(
+    r"article|body|content|entry|main|post|text|story|review|comment|product|detail|listing|result",
+    re.IGNORECASE
+)
+
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "body", "dd", "details", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "html",
+    "li", "main", "ol", "p", "pre", "section", "summary", "table", "tbody", "thead",
+    "tfoot", "tr", "td", "th", "ul", "br", "header", "footer", "nav", "aside", "form"
+}
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+WHITESPACE_RE = re.compile(r"[ \t\r\f\v ]+")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _tag(el) -> str:
+    tag = el.tag
+    return tag.lower() if isinstance(tag, str) else ""
+
+
+def _class_and_id(el) -> str:
+    return f"{el.get('class', '')} {el.get('id', '')}"
+
+
+def _holds_title(el) -> bool:
+    return next(el.iter("h1"), None) is not None
+
+
+def _is_small_form(el) -> bool:
+    """只有控件、标签与按钮文字的小表单；包含标题、段落、表格等内容元素的表单不算"""
+    if next(el.iter(*FORM_CONTENT_TAGS), None) is not None:
+        return False
+    controls = sum(1 for _ in el.iter("input", "select", "textarea", "button"))
+    return controls <= SMALL_FORM_MAX_CONTROLS and len(_normalize(el.text_content()).strip()) <= SMALL_FORM_MAX_TEXT
+
+
+def _is_boilerplate(el) -> bool:
+    tag = _tag(el)
+    if tag == "form":
+        return _is_small_form(el)
+    role = (el.get("role") or "").lower()
+    if tag in BOILERPLATE_TAGS or role in BOILERPLATE_ROLES:
+        # 页面标题所在的页眉，以及文章内部的 header 保留
+        if tag == "header" or role == "banner":
+            if _holds_title(el) or any(_tag(a) in ("article", "main") for a in el.iterancestors()):
+                return False
+        return True
+    if el.get("aria-hidden") == "true" or el.get("hidden") is not None:
+        return True
+    style = (el.get("style") or "").replace(" ", "").lower()
+    if "display:none" in style or "visibility:hidden" in style:
+        return True
+    attrs = _class_and_id(el)
+    return bool(attrs.strip()) and bool(NEGATIVE_PATTERN.search(attrs)) and not POSITIVE_PATTERN.search(attrs)
+
+
+def _drop(el):
+    """删除元素但保留其 tail 文本"""
+    if el.getparent() is not None:
+        el.drop_tree()
+
+
+def _prune(root, remove_boilerplate: bool):
+    for el in list(root.iter(etree.Comment, etree.ProcessingInstruction)):
+        _drop(el)
+    for el in list(root.iter(*INVISIBLE_TAGS)):
+        _drop(el)
+    if remove_boilerplate:
+        # 先收集再删除，祖先已被删除的节点不再处理
+        targets = [el for el in root.iter() if isinstance(el.tag, str) and _is_boilerplate(el)]
+        removed = set()
+        for el in targets:
+            if any(ancestor in removed for ancestor in el.iterancestors()):
+                continue
+            removed.add(el)
+            _drop(el)
+
+
+def _normalize(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text)
+
+
+def _to_text(root) -> str:
+    """块级元素换行、行内元素以空格拼接的可见文本"""
+    parts: List[str] = []
+    for event, el in etree.iterwalk(root, events=("start", "end")):
+        tag = _tag(el)
+        if event == "start":
+            if tag in BLOCK_TAGS:
+                parts.append("\n")
+            if el.text:
+                parts.append(el.text)
+        else:
+            if tag in BLOCK_TAGS:
+                parts.append("\n")
+            if el.tail and el is not root:
+                parts.append(el.tail)
+    lines = (_normalize(line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _to_markdown(el, depth: int = 0, list_index: Optional[int] = None) -> str:
+    tag = _tag(el)
+    if depth > 200:
+        return _normalize(el.text_content())
+
+    if tag == "pre":
+        return f"\n\n```\n{el.text_content().strip()}\n```\n\n"
+    if tag == "br":
+        return "\n"
+    if tag == "hr":
+        return "\n\n---\n\n"
+    if tag == "img":
+        alt = (el.get("alt") or "").strip()
+        return f" {alt} " if alt else ""
+
+    inner: List[str] = [_normalize(el.text) if el.text else ""]
+    ordered_index = 0
+    for child in el:
+        if isinstance(child.tag, str):
+            index = None
+            if tag == "ol" and _tag(child) == "li":
+                ordered_index += 1
+                index = ordered_index
+            inner.append(_to_markdown(child, depth + 1, index))
+        if child.tail:
+            inner.append(_normalize(child.tail))
+    content = "".join(inner)
+    stripped = content.strip()
+
+    if tag in HEADING_TAGS:
+        return f"\n\n{'#' * int(tag[1])} {stripped}\n\n" if stripped else ""
+    if tag == "li":
+        prefix = f"{list_index}. " if list_index else "- "
+        return f"\n{prefix}{stripped}" if stripped else ""
+    if tag in ("ul", "ol"):
+        return f"\n{content}\n"
+    if tag == "a":
+        href = el.get("href")
+        if stripped and href and not href.startswith(("javascript:", "#")):
+            return f"[{stripped}]({href})"
+        return content
+    if tag in ("strong", "b"):
+        return f"**{stripped}**" if stripped else ""
+    if tag in ("em", "i"):
+        return f"*{stripped}*" if stripped else ""
+    if tag == "code":
+        return f"`{stripped}`" if stripped else ""
+    if tag == "tr":
+        cells = [_normalize(c.text_content()).strip().replace("|", "\\|") for c in el if _tag(c) in ("td", "th")]
+        return f"\n| {' | '.join(cells)} |" if any(cells) else ""
+    if tag == "table":
+        rows = [line for line in content.split("\n") if line.startswith("|")]
+        if not rows:
+            return f"\n\n{content}\n\n"
+        separator = "| " + " | ".join("---" for _ in range(rows[0].count(" | ") + 1)) + " |"
+        return "\n\n" + "\n".join([rows[0], separator] + rows[1:]) + "\n\n"
+    if tag == "blockquote":
+        return "\n\n" + "\n".join(f"> {line}" for line in stripped.split("\n") if line.strip()) + "\n\n"
+    if tag in BLOCK_TAGS:
+        return f"\n\n{content}\n\n"
+    return content
+
+
+def _finish_markdown(markdown: str) -> str:
+    lines = [line.rstrip() for line in markdown.split("\n")]
+    return BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _link_density(el, text_length: int) -> float:
+    if not text_length:
+        return 1.0
+    link_length = sum(len(a.text_content()) for a in el.iter("a"))
+    return min(1.0, link_length / text_length)
+
+
+def _find_main_content(body) -> List:
+    """
+    readability 风格的正文定位：按段落文本长度、逗号数为父节点打分，
+    再按链接密度折减，返回得分最高的候选节点及其高分兄弟节点
+    """
+    scores: Dict = {}
+    for node in body.iter("p", "pre", "td", "li", "blockquote", "dd", "h2", "h3"):
+        text = _normalize(node.text_content()).strip()
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(",") + text.count("，") + min(len(text) // 100, 3)
+        parent = node.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+
+    if not scores:
+        return []
+
+    tag_bonus = {"article": 10, "main": 10, "section": 3, "div": 5, "td": 3, "blockquote": 3,
+                 "form": -3, "ul": -3, "ol": -3, "body": -5}
+    best, best_score = None, 0.0
+    final_scores = {}
+    for node, score in scores.items():
+        bonus = tag_bonus.get(_tag(node), 0)
+        attrs = _class_and_id(node)
+        if POSITIVE_PATTERN.search(attrs):
+            bonus += 25
+        if NEGATIVE_PATTERN.search(attrs):
+            bonus -= 25
+        text_length = len(node.text_content())
+        final = (score + bonus) * (1 - _link_density(node, text_length))
+        final_scores[node] = final
+        if final > best_score:
+            best, best_score = node, final
+
+    if best is None:
+        return []
+
+    parent = best.getparent()
+    if parent is None:
+        return [best]
+    threshold = max(10, best_score * 0.2)
+    return [sibling for sibling in parent if sibling is best or final_scores.get(sibling, 0) >= threshold]
+
+
+def extract_content(html: str, mode: str = "full", output: str = "text") -> str:
+    """
+    从HTML中提取供LLM使用的文本
+
+    Args:
+        html: 页面HTML
+        mode: "full" 全部可见文本（默认）；"text" 去除导航/页脚/cookie 横幅等样板内容；
+              "main" 在 "text" 的基础上只保留正文区域（正文过短时回退到 "text"）
+        output: "text" 纯文本 或 "markdown"
+
+    Returns:
+        str: 提取的文本
+    """
+    if not html or not html.strip():
+        return ""
+    if not LXML_AVAILABLE:
+        return _extract_with_bs4(html)
+
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return _extract_with_bs4(html)
+
+    _prune(root, remove_boilerplate=mode in ("text", "main"))
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    def render(nodes) -> str:
+        if output == "markdown":
+            return _finish_markdown("".join(_to_markdown(node) for node in nodes))
+        return "\n".join(filter(None, (_to_text(node) for node in nodes)))
+
+    if mode == "main":
+        candidates = _find_main_content(body)
+        if candidates:
+            # 正文过短通常意味着定位错误（例如列表页），回退到完整文本
+            main_length = sum(len(node.text_content()) for node in candidates)
+            if main_length >= 0.25 * len(body.text_content()):
+                return render(candidates)
+    return render([body])
+
+
+def _extract_with_bs4(html: str) -> str:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    for s in soup(["script", "style"]):
+        s.decompose()
+    return soup.get_text(separator="\n", strip=True)
@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Optional, Dict
+
+
+_DEFAULT_TTL = object()
+
+
+class DiskCache:
+    """
+    基于 SQLite 的键值缓存，值需可 JSON 序列化
+
+    - 每个条目带 TTL，过期后读取视为未命中
+    - 总大小超过 max_bytes 或条目数超过 max_entries 时，按最近访问时间淘汰(LRU)
+    - path 为空时使用内存数据库，仅在当前进程内有效
+    - 可在多个线程间共享；多个进程共享同一文件时由 SQLite 负责加锁
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_entries: int = 100000
+    ):
+        """
+        Args:
+            path: SQLite 文件路径（目录不存在时自动创建），为空时仅缓存在内存中
+            ttl: 默认过期时间(秒)，None 表示永不过期
+            max_bytes: 缓存值的总大小上限(字节)
+            max_entries: 条目数上限
+        """
+        self.path = path or ":memory:"
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """读取缓存值，不存在或已过期时返回 default"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.stats["misses"] += 1
+                if row is not None:
+                    with self._conn:
+                        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return default
+            with self._conn:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Any = _DEFAULT_TTL):
+        """
+        写入缓存值
+
+        Args:
+            key: 键
+            value: 可 JSON 序列化的值
+            ttl: 过期时间(秒)，默认使用实例的 ttl，None 表示永不过期
+        """
+        ttl = self.ttl if ttl is _DEFAULT_TTL else ttl
+        data = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), expires_at, now)
+            )
+            self._evict(now)
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def _evict(self, now: float):
+        """删除过期条目，再按 LRU 淘汰直到满足大小与数量上限（调用方需持有锁和事务）"""
+        self._conn.execute("DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            self.stats["evictions"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        """返回条目数、总大小与命中统计"""
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": total, **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -38,6 +38,89 @@ def extract_json(text: str | None = None):
 
     return None
 
+class JsonArrayStreamParser:
+    """
+    增量解析流式响应中某个键对应的JSON数组，数组中的对象一完整就立即返回
+
+    Usage:
+        parser = JsonArrayStreamParser("selected_tools")
+        for chunk in stream:
+            for item in parser.feed(chunk):
+                dispatch(item)
+    """
+
+    def __init__(self, key: str):
+        self.key = f'"{key}"'
+        self.buffer = ""
+        self.pos = 0
+        self.state = "key"        # key -> array -> done
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = -1
+        self.items = []
+
+    def feed(self, chunk: str) -> list:
+        """追加一段文本，返回本次新解析出的完整元素"""
+        self.buffer += chunk
+        found = []
+        while self.state != "done":
+            if self.state == "key":
+                index = self.buffer.find(self.key, self.pos)
+                if index == -1:
+                    # 保留末尾可能是键名前半部分的字符
+                    self.pos = max(self.pos, len(self.buffer) - len(self.key) + 1)
+                    break
+                bracket = self.buffer.find("[", index + len(self.key))
+                if bracket == -1:
+                    self.pos = index
+                    break
+                if self.buffer[index + len(self.key):bracket].strip() != ":":
+                    self.pos = index + 1
+                    continue
+                self.pos = bracket + 1
+                self.state = "array"
+                continue
+            if self.pos >= len(self.buffer):
+                break
+            self._scan(found)
+        return found
+
+    def _scan(self, found: list):
+        """扫描数组内容，维护字符串与括号嵌套状态"""
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            ch = buffer[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                if self.depth == 0:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif ch in "}]":
+                if self.depth == 0 and ch == "]":
+                    self.pos += 1
+                    self.state = "done"
+                    return
+                self.depth -= 1
+                if self.depth == 0 and self.item_start >= 0:
+                    try:
+                        item = json.loads(buffer[self.item_start:self.pos + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        self.items.append(item)
+                        found.append(item)
+                    self.item_start = -1
+            self.pos += 1
+
 def extract_python_code(text: str | None = None):
     """从AI响应中提取Python代码"""
     if not text:
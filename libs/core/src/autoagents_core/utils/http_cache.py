@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import requests
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+
+# 只声明能够透明解压的编码，避免服务器返回无法解码的 br 内容
+ACCEPT_ENCODING = "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate"
+
+
+def hash_content(text: str) -> str:
+    """计算文本内容的哈希，用于判断页面内容是否变化"""
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+@dataclass
+class HttpCacheResult:
+    """一次带缓存的 GET 请求的结果"""
+    url: str
+    text: str
+    status_code: int
+    content_hash: str
+    from_cache: bool = False  # 未发起网络请求，直接使用新鲜缓存
+    revalidated: bool = False  # 服务器返回 304，复用缓存内容
+    changed: bool = True  # 内容哈希与上一次记录不同
+
+
+class HttpCache:
+    """
+    带条件请求的 HTTP 缓存
+
+    - 使用连接池复用的 requests.Session
+    - 遵循 Cache-Control(max-age / no-cache / no-store)，新鲜缓存直接返回不发请求
+    - 过期后携带 If-None-Match / If-Modified-Since 发起条件请求，304 时复用缓存内容
+    - 提供 cache_dir 时只持久化到磁盘；否则缓存在进程内存中，最多 max_memory_entries 个URL（LRU）
+    - 既没有 ETag/Last-Modified 也没有 max-age 的响应无法复用，只记录内容哈希（用于判断内容是否变化），不保存正文
+    - aget() 使用 httpx.AsyncClient 发起同样的条件请求
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        pool_maxsize: int = 10,
+        default_headers: Optional[Dict[str, str]] = None,
+        max_memory_entries: int = 256
+    ):
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.default_headers = dict(default_headers or {})
+        self.default_headers["Accept-Encoding"] = ACCEPT_ENCODING
+
+        self.max_memory_entries = max(1, max_memory_entries)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "fresh_hits": 0, "revalidated": 0, "misses": 0}
+
+    # ========== 存储 ==========
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url: str):
+        key = self._key(url)
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def _load(self, url: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            with self._lock:
+                entry = self._memory.get(url)
+                if entry is not None:
+                    self._memory.move_to_end(url)
+            return entry
+
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("has_body"):
+                with open(body_path, "r", encoding="utf-8") as f:
+                    entry["text"] = f.read()
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def _save(self, url: str, entry: Dict[str, Any]):
+        if not self.cache_dir:
+            with self._lock:
+                self._memory[url] = entry
+                self._memory.move_to_end(url)
+                while len(self._memory) > self.max_memory_entries:
+                    self._memory.popitem(last=False)
+            return
+
+        meta_path, body_path = self._paths(url)
+        text = entry.get("text")
+        meta = {k: v for k, v in entry.items() if k != "text"}
+        meta["has_body"] = text is not None
+        if text is not None:
+            self._write_atomic(body_path, text)
+        elif os.path.exists(body_path):
+            os.remove(body_path)
+        self._write_atomic(meta_path, json.dumps(meta, ensure_ascii=False))
+
+    @staticmethod
+    def _write_atomic(path: str, data: str):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # ========== 缓存策略 ==========
+    @staticmethod
+    def _parse_cache_control(headers) -> Dict[str, Any]:
+        directives: Dict[str, Any] = {}
+        for part in headers.get("Cache-Control", "").lower().split(","):
+            part = part.strip()
+            if not part:
+                continue
+            name, _, value = part.partition("=")
+            directives[name.strip()] = value.strip().strip('"') or True
+        return directives
+
+    def _is_fresh(self, entry: Dict[str, Any]) -> bool:
+        if entry.get("no_cache") or not entry.get("max_age"):
+            return False
+        return time.time() - entry.get("stored_at", 0) < entry["max_age"]
+
+    # ========== 公开方法 ==========
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30) -> HttpCacheResult:
+        """
+        发起带缓存的 GET 请求
+
+        Raises:
+            requests.exceptions.RequestException: 网络错误或非 2xx/304 响应
+        """
+        entry, request_headers, cached = self._prepare(url, headers)
+        if cached is not None:
+            return cached
+        resp = self.session.get(url, headers=request_headers, timeout=timeout)
+        return self._process(url, entry, resp)
+
+    async def aget(self, client, url: str, headers: Optional[Dict[str, str]] = None, timeout: float = 30) -> HttpCacheResult:
+        """
+        使用 httpx.AsyncClient 发起带缓存的 GET 请求，缓存读写在线程中进行
+
+        Raises:
+            httpx.HTTPError: 网络错误或非 2xx/304 响应
+        """
+        entry, request_headers, cached = await asyncio.to_thread(self._prepare, url, headers)
+        if cached is not None:
+            return cached
+        resp = await client.get(url, headers=request_headers, timeout=timeout)
+        return await asyncio.to_thread(self._process, url, entry, resp)
+
+    def _prepare(self, url: str, headers: Optional[Dict[str, str]]):
+        """读取缓存；新鲜缓存直接返回结果，否则返回条件请求的请求头"""
+        self.stats["requests"] += 1
+        entry = self._load(url)
+        if entry and entry.get("text") is not None and self._is_fresh(entry):
+            self.stats["fresh_hits"] += 1
+            return entry, None, HttpCacheResult(url, entry["text"], entry.get("status_code", 200),
+                                                entry["content_hash"], from_cache=True, changed=False)
+
+        request_headers = {**self.default_headers, **(headers or {})}
+        request_headers["Accept-Encoding"] = ACCEPT_ENCODING
+        if entry and entry.get("text") is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+        return entry, request_headers, None
+
+    def _process(self, url: str, entry: Optional[Dict[str, Any]], resp) -> HttpCacheResult:
+        """处理响应（requests 与 httpx 的响应对象均可）：304 复用缓存，其余更新缓存"""
+        previous_hash = entry.get("content_hash") if entry else None
+        directives = self._parse_cache_control(resp.headers)
+
+        if resp.status_code == 304 and entry and entry.get("text") is not None:
+            self.stats["revalidated"] += 1
+            entry["stored_at"] = time.time()
+            entry["max_age"] = self._max_age(resp.headers, directives) or entry.get("max_age")
+            entry["etag"] = resp.headers.get("ETag", entry.get("etag"))
+            entry["last_modified"] = resp.headers.get("Last-Modified", entry.get("last_modified"))
+            self._save(url, entry)
+            return HttpCacheResult(url, entry["text"], entry.get("status_code", 200),
+                                   entry["content_hash"], revalidated=True, changed=False)
+
+        resp.raise_for_status()
+        self.stats["misses"] += 1
+        text = resp.text
+        content_hash = hash_content(text)
+
+        if "no-store" not in directives:
+            new_entry = {
+                "url": url,
+                "status_code": resp.status_code,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "max_age": self._max_age(resp.headers, directives),
+                "no_cache": "no-cache" in directives,
+                "stored_at": time.time(),
+                "content_hash": content_hash,
+                "text": text
+            }
+            if not (new_entry["etag"] or new_entry["last_modified"] or new_entry["max_age"]):
+                # 既不能条件请求也不会新鲜，正文永远不会被复用
+                new_entry["text"] = None
+            self._save(url, new_entry)
+
+        return HttpCacheResult(url, text, resp.status_code, content_hash,
+                               changed=content_hash != previous_hash)
+
+    @staticmethod
+    def _max_age(headers, directives: Dict[str, Any]) -> int:
+        value = directives.get("s-maxage", directives.get("max-age"))
+        try:
+            max_age = int(value) if value not in (None, True) else 0
+        except (TypeError, ValueError):
+            max_age = 0
+        match = re.match(r"\d+", headers.get("Age", "") or "")
+        if match:
+            max_age -= int(match.group(0))
+        return max(0, max_age)
+
+    def close(self):
+        self.session.close()
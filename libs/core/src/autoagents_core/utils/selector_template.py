@@ -0,0 +1,366 @@
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from .chunked_extraction import _resolve
+
+try:
+    import lxml.html
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+
+WHITESPACE_RE = re.compile(r"\s+")
+NUMBER_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+# 含数字或过长的 class/id 通常是构建工具生成的哈希，不稳定
+UNSTABLE_NAME_RE = re.compile(r"\d|^[a-zA-Z0-9_-]{20,}$|^css-|^sc-|^jsx-")
+VALUE_ATTRIBUTES = ("href", "src", "title", "alt", "content", "datetime", "value", "aria-label")
+
+MAX_TEXT_LENGTH = 300
+MAX_LEARN_ITEMS = 30
+
+
+def _normalize(text: Optional[str]) -> str:
+    return WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def _parse_number(text: str) -> Optional[float]:
+    match = NUMBER_RE.search(text or "")
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _stable_classes(el) -> List[str]:
+    return [c for c in (el.get("class") or "").split() if not UNSTABLE_NAME_RE.search(c)][:2]
+
+
+def _step(el) -> str:
+    """单个元素的 XPath 步骤：标签 + 稳定的 class"""
+    predicates = "".join(
+        f'[contains(concat(" ", normalize-space(@class), " "), " {c} ")]' for c in _stable_classes(el)
+    )
+    return f"{el.tag}{predicates}"
+
+
+def _xpath_for(el, relative_to=None, max_depth: int = 5) -> str:
+    """
+    为元素生成较稳健的 XPath：优先锚定到带稳定 id 的祖先，否则使用最多 max_depth 层的标签+class 路径；
+    relative_to 不为空时生成相对该元素的路径
+    """
+    steps: List[str] = []
+    current = el
+    anchored = False
+    while current is not None and current is not relative_to and len(steps) < max_depth:
+        element_id = current.get("id")
+        if relative_to is None and element_id and not UNSTABLE_NAME_RE.search(element_id):
+            steps.insert(0, f'{current.tag}[@id="{element_id}"]')
+            anchored = True
+            break
+        steps.insert(0, _step(current))
+        current = current.getparent()
+
+    path = "/".join(steps)
+    if relative_to is not None:
+        return f"./{path}" if current is relative_to else f".//{path}"
+    return f"//{path}" if anchored or current is not None else f"/{path}"
+
+
+def _lowest_common_ancestor(elements: List) -> Optional[Any]:
+    if not elements:
+        return None
+    chains = [[el] + list(el.iterancestors()) for el in elements]
+    common = set(chains[0])
+    for chain in chains[1:]:
+        common &= set(chain)
+    for el in chains[0]:
+        if el in common:
+            return el
+    return None
+
+
+def _depth(el) -> int:
+    return sum(1 for _ in el.iterancestors())
+
+
+class _PageIndex:
+    """按文本、数字与属性值索引页面元素，用于把提取出的值映射回DOM节点"""
+
+    def __init__(self, root):
+        self.text: Dict[str, List] = {}
+        self.numbers: Dict[float, List] = {}
+        self.attributes: Dict[str, List[Tuple[Any, str]]] = {}
+        for el in root.iter():
+            if not isinstance(el.tag, str):
+                continue
+            text = _normalize(el.text_content())
+            if text and len(text) <= MAX_TEXT_LENGTH:
+                self.text.setdefault(text, []).append(el)
+                if len(text) <= 30:
+                    number = _parse_number(text)
+                    if number is not None:
+                        self.numbers.setdefault(number, []).append(el)
+            for attr in VALUE_ATTRIBUTES:
+                value = el.get(attr)
+                if value:
+                    self.attributes.setdefault(_normalize(value), []).append((el, attr))
+
+    def find(self, value: Any) -> List[Tuple[Any, Optional[str]]]:
+        """返回匹配值的 (元素, 属性名) 列表，属性名为 None 表示匹配的是元素文本；同一文本只保留最深的元素"""
+        if value is None or isinstance(value, (dict, list, bool)):
+            return []
+        if isinstance(value, (int, float)):
+            candidates = [(el, None) for el in self.numbers.get(float(value), [])]
+        else:
+            key = _normalize(str(value))
+            if not key:
+                return []
+            candidates = [(el, None) for el in self.text.get(key, [])]
+            candidates += self.attributes.get(key, [])
+            if not candidates and key.startswith(("http://", "https://")):
+                # 绝对URL可能以相对路径出现在 href 中
+                candidates = [(el, attr) for text, pairs in self.attributes.items()
+                              if text.startswith("/") and key.endswith(text) for el, attr in pairs]
+        if not candidates:
+            return []
+        # 嵌套元素文本相同时取最深的一个
+        text_matches = [c for c in candidates if c[1] is None]
+        if text_matches:
+            deepest = max(_depth(el) for el, _ in text_matches)
+            text_matches = [c for c in text_matches if _depth(c[0]) == deepest]
+        return text_matches + [c for c in candidates if c[1] is not None]
+
+
+def _absolute(el, attr: Optional[str], value: Any) -> bool:
+    """LLM 输出的是绝对URL而页面属性中是相对路径时，应用模板时需要按页面URL补全"""
+    return bool(attr) and str(value).startswith(("http://", "https://")) \
+        and not (el.get(attr) or "").startswith(("http://", "https://"))
+
+
+def _read_value(el, attr: Optional[str], field_type: str, base_url: Optional[str] = None) -> Any:
+    raw = el.get(attr) if attr else el.text_content()
+    raw = _normalize(raw)
+    if not raw:
+        return None
+    if base_url:
+        return urljoin(base_url, raw)
+    if field_type in ("integer", "number"):
+        number = _parse_number(raw)
+        if number is None:
+            return None
+        return int(number) if field_type == "integer" else number
+    return raw
+
+
+def _pick_closest(candidates: List[Tuple[Any, Optional[str]]], anchor) -> Tuple[Any, Optional[str]]:
+    if anchor is None or len(candidates) == 1:
+        return candidates[0]
+    anchor_chain = {el: i for i, el in enumerate([anchor] + list(anchor.iterancestors()))}
+
+    def distance(candidate):
+        for i, ancestor in enumerate([candidate[0]] + list(candidate[0].iterancestors())):
+            if ancestor in anchor_chain:
+                return i + anchor_chain[ancestor]
+        return 10 ** 6
+
+    return min(candidates, key=distance)
+
+
+def _learn_scalar(index: _PageIndex, root, value: Any, field_type: str) -> Optional[Dict[str, Any]]:
+    matches = index.find(value)
+    if not matches:
+        return None
+    el, attr = matches[0]
+    xpath = _xpath_for(el)
+    found = root.xpath(xpath)
+    if el not in found:
+        return None
+    position = found.index(el) + 1
+    return {"kind": "scalar", "xpath": f"({xpath})[{position}]", "attr": attr, "type": field_type,
+            "absolute": _absolute(el, attr, value)}
+
+
+def _learn_object_list(index: _PageIndex, root, items: List[Dict[str, Any]],
+                       item_schema: Dict[str, Any], defs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    properties = item_schema.get("properties", {})
+    field_types = {name: _resolve(prop, defs).get("type", "string") for name, prop in properties.items()}
+
+    # 1. 为每条记录找到其字段对应的元素
+    matched_items = []
+    item_values: Dict[int, Dict[str, Any]] = {}
+    for item in items[:MAX_LEARN_ITEMS]:
+        if not isinstance(item, dict):
+            continue
+        per_field = {name: index.find(item.get(name)) for name in properties if field_types[name] != "boolean"}
+        per_field = {name: cands for name, cands in per_field.items() if cands}
+        if not per_field:
+            continue
+        # 以匹配最少（最有区分度）的字段为锚点，其余字段取离锚点最近的匹配
+        anchor_name = min(per_field, key=lambda name: len(per_field[name]))
+        anchor = per_field[anchor_name][0][0]
+        chosen = {name: _pick_closest(cands, anchor) for name, cands in per_field.items()}
+        matched_items.append(chosen)
+        item_values[id(chosen)] = item
+
+    if len(matched_items) < 2:
+        return None
+
+    # 2. 每条记录的根节点：所有记录公共祖先下、包含该记录的子节点
+    item_roots = [_lowest_common_ancestor([el for el, _ in chosen.values()]) for chosen in matched_items]
+    parent = _lowest_common_ancestor(item_roots)
+    if parent is None:
+        return None
+    containers = []
+    for item_root in item_roots:
+        container = item_root
+        while container is not None and container.getparent() is not parent:
+            container = container.getparent()
+        containers.append(container)
+    if any(c is None for c in containers) or len(set(containers)) != len(containers):
+        return None
+
+    signature = Counter(_step(c) for c in containers).most_common(1)[0][0]
+    item_xpath = f"{_xpath_for(parent)}/{signature}"
+    if not set(containers) <= set(root.xpath(item_xpath)):
+        return None
+
+    # 3. 每个字段相对记录根节点的路径，取出现最多的一种
+    fields: Dict[str, Dict[str, Any]] = {}
+    absolute: Dict[str, bool] = {}
+    for name in properties:
+        paths = Counter()
+        for chosen, container in zip(matched_items, containers):
+            if name in chosen:
+                el, attr = chosen[name]
+                relative = "." if el is container else _xpath_for(el, relative_to=container)
+                paths[(relative, attr)] += 1
+                absolute[name] = absolute.get(name, False) or _absolute(el, attr, item_values[id(chosen)][name])
+        if not paths:
+            continue
+        (relative, attr), count = paths.most_common(1)[0]
+        if count * 2 < len(matched_items):
+            continue
+        fields[name] = {"xpath": relative, "attr": attr, "type": field_types[name], "absolute": absolute[name]}
+
+    if not fields:
+        return None
+    return {"kind": "list", "item_xpath": item_xpath, "fields": fields, "learned_items": len(matched_items)}
+
+
+def _learn_scalar_list(index: _PageIndex, root, values: List[Any], item_type: str) -> Optional[Dict[str, Any]]:
+    matched = []
+    absolute = False
+    for value in values[:MAX_LEARN_ITEMS]:
+        candidates = index.find(value)
+        if candidates:
+            matched.append(candidates[0])
+            absolute = absolute or _absolute(candidates[0][0], candidates[0][1], value)
+    if len(matched) < 2:
+        return None
+    parent = _lowest_common_ancestor([el for el, _ in matched])
+    if parent is None:
+        return None
+    signature = Counter(_xpath_for(el, relative_to=parent) for el, _ in matched).most_common(1)[0][0]
+    attr = Counter(attr for _, attr in matched).most_common(1)[0][0]
+    xpath = f"{_xpath_for(parent)}/{signature[2:]}" if signature.startswith("./") else f"{_xpath_for(parent)}{signature[1:]}"
+    return {"kind": "scalar_list", "xpath": xpath, "attr": attr, "type": item_type, "absolute": absolute}
+
+
+def learn_template(html: str, data: Dict[str, Any], json_schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    根据一次成功的LLM提取结果，学习把 schema 各字段映射到DOM节点的 XPath 模板
+
+    Args:
+        html: 页面HTML
+        data: 提取结果（model_dump 后的字典）
+        json_schema: schema.model_json_schema()
+
+    Returns:
+        模板字典，无法学习任何字段时返回 None
+    """
+    if not LXML_AVAILABLE or not html or not isinstance(data, dict):
+        return None
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+    defs = json_schema.get("$defs", {})
+    index = _PageIndex(root)
+    fields: Dict[str, Dict[str, Any]] = {}
+    for name, prop in json_schema.get("properties", {}).items():
+        value = data.get(name)
+        field_schema = _resolve(prop, defs)
+        field_type = field_schema.get("type", "string")
+        rule = None
+        if field_type == "array" and isinstance(value, list) and value:
+            item_schema = _resolve(field_schema.get("items", {}), defs)
+            if item_schema.get("properties"):
+                rule = _learn_object_list(index, root, value, item_schema, defs)
+            else:
+                rule = _learn_scalar_list(index, root, value, item_schema.get("type", "string"))
+        elif field_type in ("string", "integer", "number"):
+            rule = _learn_scalar(index, root, value, field_type)
+        if rule:
+            fields[name] = rule
+
+    if not fields:
+        return None
+    return {"fields": fields}
+
+
+def apply_template(html: str, template: Dict[str, Any], url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    使用模板从页面中直接提取数据（不调用LLM）
+
+    Args:
+        html: 页面HTML
+        template: learn_template 返回的模板
+        url: 页面URL，用于补全学习时为绝对地址的相对链接
+
+    Returns:
+        提取出的字典；模板中的列表字段没有匹配到任何记录时返回 None
+    """
+    if not LXML_AVAILABLE or not html:
+        return None
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+    def read(el, rule):
+        base_url = url if rule.get("absolute") else None
+        return _read_value(el, rule["attr"], rule["type"], base_url)
+
+    data: Dict[str, Any] = {}
+    for name, rule in template.get("fields", {}).items():
+        try:
+            if rule["kind"] == "scalar":
+                found = root.xpath(rule["xpath"])
+                data[name] = read(found[0], rule) if found else None
+            elif rule["kind"] == "scalar_list":
+                values = [read(el, rule) for el in root.xpath(rule["xpath"])]
+                data[name] = [v for v in values if v is not None]
+                if not data[name]:
+                    return None
+            elif rule["kind"] == "list":
+                items = []
+                for item_el in root.xpath(rule["item_xpath"]):
+                    item = {}
+                    for field_name, field_rule in rule["fields"].items():
+                        found = [item_el] if field_rule["xpath"] == "." else item_el.xpath(field_rule["xpath"])
+                        item[field_name] = read(found[0], field_rule) if found else None
+                    if any(v is not None for v in item.values()):
+                        items.append(item)
+                if not items:
+                    return None
+                data[name] = items
+        except etree.XPathError:
+            return None
+    return data
@@ -0,0 +1,113 @@
+import json
+import time
+import asyncio
+
+from autoagents_core.tools import ToolManager
+from autoagents_core.utils.extractor import JsonArrayStreamParser
+
+
+RESPONSE = """好的，选择如下：
+```json
+{
+    "selected_tools": [
+        {"tool_name": "search", "arguments": {"query": "a } b ] c", "filters": {"lang": ["zh", "en"]}}, "reason": "含有 \\"引号\\" 与 {括号}"},
+        1,
+        "skip",
+        {"tool_name": "add", "arguments": {"a": 1, "b": 2}, "reason": "[x]"}
+    ],
+    "after": [{"tool_name": "ignored"}]
+}
+```"""
+
+EXPECTED = json.loads(RESPONSE.split("```json")[1].split("```")[0])["selected_tools"]
+EXPECTED_ITEMS = [item for item in EXPECTED if isinstance(item, dict)]
+
+
+def _parse(chunks):
+    parser = JsonArrayStreamParser("selected_tools")
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    return items
+
+
+def test_parser_whole_text():
+    assert _parse([RESPONSE]) == EXPECTED_ITEMS
+
+
+def test_parser_every_split_point():
+    for i in range(len(RESPONSE) + 1):
+        assert _parse([RESPONSE[:i], RESPONSE[i:]]) == EXPECTED_ITEMS, f"split at {i}"
+
+
+def test_parser_single_characters():
+    assert _parse(list(RESPONSE)) == EXPECTED_ITEMS
+
+
+def test_parser_yields_items_as_soon_as_complete():
+    parser = JsonArrayStreamParser("selected_tools")
+    assert parser.feed('{"selected_tools": [{"tool_name": "a"}, {"tool_na') == [{"tool_name": "a"}]
+    assert parser.feed('me": "b"}') == [{"tool_name": "b"}]
+    assert parser.feed('], "x": [{"tool_name": "c"}]}') == []
+
+
+class FakeChatClient:
+    """按固定大小切分响应文本，模拟流式输出"""
+
+    def __init__(self, response: str, chunk_size: int = 7):
+        self.response = response
+        self.chunk_size = chunk_size
+
+    def invoke(self, prompt: str):
+        for i in range(0, len(self.response), self.chunk_size):
+            yield {"type": "token", "content": self.response[i:i + self.chunk_size]}
+        yield {"type": "finish"}
+
+
+def test_select_and_execute_dispatches_tools_missed_by_stream():
+    calls = []
+
+    async def record(name: str):
+        calls.append(name)
+        return name
+
+    # 增量解析先读到正文中的草稿数组，完整解析使用代码块中的结果；
+    # 两者对不上时，代码块中的工具仍要执行，且已执行的调用不重复执行
+    response = (
+        '草稿 "selected_tools": [{"tool_name": "record", "arguments": {"name": "x"}}, '
+        '{"tool_name": "record", "arguments": {"name": "y"}}]\n'
+        '```json\n{"selected_tools": [{"tool_name": "record", "arguments": {"name": "x"}}, '
+        '{"tool_name": "record", "arguments": {"name": "z"}}]}\n```'
+    )
+    manager = ToolManager(FakeChatClient(response), [record])
+    selected, results = asyncio.run(manager.select_and_execute("q"))
+    assert [tool["arguments"]["name"] for tool in selected] == ["x", "z"]
+    assert sorted(calls) == ["x", "y", "z"]
+    assert [r["result"] for r in results] == ["x", "y", "z"]
+
+
+def test_select_and_execute_waits_for_cancelled_tools():
+    state = {"cancelled": False}
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.01)
+            state["cancelled"] = True
+            raise
+
+    async def fast():
+        return "ok"
+
+    response = '{"selected_tools": [{"tool_name": "slow", "arguments": {}}, {"tool_name": "fast", "arguments": {}}]}'
+    manager = ToolManager(FakeChatClient(response), [slow, fast])
+
+    async def run():
+        _, results = await manager.select_and_execute("q", deadline=time.monotonic() + 0.3)
+        # 返回前已等待被取消的工具结束
+        assert state["cancelled"]
+        return results
+
+    results = asyncio.run(run())
+    assert [r["tool"] for r in results] == ["fast"]
@@ -0,0 +1,63 @@
+import asyncio
+
+import mcp
+
+from autoagents_core.tools import TTLPolicy, ToolResultCache
+
+
+def _result(text: str, is_error: bool = False) -> mcp.types.CallToolResult:
+    return mcp.types.CallToolResult(content=[mcp.types.TextContent(type="text", text=text)], isError=is_error)
+
+
+def test_mcp_result_roundtrip_through_disk(tmp_path):
+    path = str(tmp_path / "tools.db")
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return _result("42")
+
+    async def run(cache):
+        return await cache.get_or_call({"q": "x"}, call)
+
+    value, source = asyncio.run(run(ToolResultCache("lookup", TTLPolicy(disk_path=path))))
+    assert source == "call"
+    # 新的缓存实例（相当于另一个进程）从磁盘层读取并还原为 CallToolResult
+    value, source = asyncio.run(run(ToolResultCache("lookup", TTLPolicy(disk_path=path))))
+    assert source == "disk"
+    assert isinstance(value, mcp.types.CallToolResult)
+    assert value.content[0].text == "42"
+    assert len(calls) == 1
+
+
+def test_error_results_are_not_cached(tmp_path):
+    cache = ToolResultCache("lookup", TTLPolicy(disk_path=str(tmp_path / "tools.db")))
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return _result("boom", is_error=True)
+
+    async def run():
+        for _ in range(2):
+            value, source = await cache.get_or_call({"q": "x"}, call)
+            assert value.isError and source == "call"
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+
+def test_cached_values_are_copies():
+    cache = ToolResultCache("lookup", TTLPolicy())
+
+    async def call():
+        return {"items": [1, 2]}
+
+    async def run():
+        value, _ = await cache.get_or_call({}, call)
+        value["items"].append(3)
+        return await cache.get_or_call({}, call)
+
+    value, source = asyncio.run(run())
+    assert source == "memory"
+    assert value == {"items": [1, 2]}
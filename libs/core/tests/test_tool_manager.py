@@ -0,0 +1,114 @@
+import time
+import asyncio
+import threading
+
+from autoagents_core.tools import ToolManager, tool
+
+
+def _calls(*names, **arguments):
+    return [{"tool_name": name, "arguments": dict(arguments)} for name in names]
+
+
+def test_results_keep_selection_order():
+    async def slow(x: int):
+        await asyncio.sleep(0.05)
+        return x
+
+    async def fast(x: int):
+        return x * 10
+
+    manager = ToolManager(None, [slow, fast])
+    results = asyncio.run(manager.execute_tools([
+        {"tool_name": "slow", "arguments": {"x": 1}},
+        {"tool_name": "fast", "arguments": {"x": 2}},
+        {"tool_name": "missing", "arguments": {}},
+        {"tool_name": "fast", "arguments": {"x": "bad"}},
+    ]))
+    assert [r["tool"] for r in results] == ["slow", "fast", "missing", "fast"]
+    assert [r["status"] for r in results] == ["success", "success", "error", "error"]
+    assert [r.get("result") for r in results[:2]] == [1, 20]
+    assert "参数校验失败" in results[3]["error"]
+
+
+def test_concurrency_limit():
+    state = {"running": 0, "peak": 0}
+
+    async def work():
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.02)
+        state["running"] -= 1
+
+    manager = ToolManager(None, [work], max_concurrency=2)
+    results = asyncio.run(manager.execute_tools(_calls(*["work"] * 6)))
+    assert all(r["status"] == "success" for r in results)
+    assert state["peak"] == 2
+
+
+def test_reuse_across_event_loops():
+    async def ping():
+        await asyncio.sleep(0.01)
+        return "pong"
+
+    def sync_ping():
+        return "pong"
+
+    manager = ToolManager(None, [ping, sync_ping], max_concurrency=1)
+    for _ in range(2):
+        results = asyncio.run(manager.execute_tools(_calls("ping", "sync_ping", "ping")))
+        assert [r["status"] for r in results] == ["success"] * 3
+    asyncio.run(manager.aclose())
+
+
+def test_async_timeout():
+    @tool(timeout=0.05)
+    async def hang():
+        await asyncio.sleep(5)
+
+    async def quick():
+        return 1
+
+    manager = ToolManager(None, [hang, quick])
+    started = time.monotonic()
+    results = asyncio.run(manager.execute_tools(_calls("hang", "quick")))
+    assert time.monotonic() - started < 2
+    assert results[0]["status"] == "error" and "超时" in results[0]["error"]
+    assert results[1]["status"] == "success"
+
+
+def test_sync_timeout_holds_slot_until_thread_finishes():
+    release = threading.Event()
+    state = {"running": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def blocking():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        release.wait(2)
+        with lock:
+            state["running"] -= 1
+
+    @tool(timeout=0.05)
+    def stuck():
+        blocking()
+
+    def follow_up():
+        blocking()
+
+    manager = ToolManager(None, [stuck, follow_up], max_concurrency=1, max_workers=4)
+
+    async def run():
+        first = await manager.execute_tools(_calls("stuck"))
+        # 超时的线程仍在运行，名额未释放，后续工具需等待它结束
+        second = asyncio.ensure_future(manager.execute_tools(_calls("follow_up")))
+        await asyncio.sleep(0.1)
+        assert not second.done()
+        release.set()
+        return first, await second
+
+    first, second = asyncio.run(run())
+    assert first[0]["status"] == "error" and "超时" in first[0]["error"]
+    assert second[0]["status"] == "success"
+    assert state["peak"] == 1
+    asyncio.run(manager.aclose())
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List, Literal, Optional
+
+import pytest
+
+from autoagents_core.tools import ToolManager, ToolRegistry, tool
+from autoagents_core.tools.ToolRegistry import build_input_schema
+
+
+# 本模块使用 from __future__ import annotations，下面所有注解在运行时都是字符串
+def add(a: int, b: int) -> int:
+    return a + b
+
+
+def search(query: str, limit: Optional[int] = None, tags: List[str] = [], mode: Literal["fast", "full"] = "fast"):
+    return query, limit, tags, mode
+
+
+def _entry(func):
+    return ToolRegistry(ToolManager(None, []).normalize_tools([func])).get(func.__name__)
+
+
+def test_postponed_annotations_schema():
+    schema = build_input_schema(add)
+    assert schema["properties"]["a"]["type"] == "integer"
+    assert schema["properties"]["b"]["type"] == "integer"
+    assert schema["required"] == ["a", "b"]
+
+    schema = build_input_schema(search)
+    assert schema["properties"]["limit"]["type"] == ["integer", "null"]
+    assert schema["properties"]["tags"] == {"type": "array", "items": {"type": "string"}, "description": "参数 tags"}
+    assert schema["properties"]["mode"]["enum"] == ["fast", "full"]
+    assert schema["required"] == ["query"]
+
+
+def test_postponed_annotations_validation():
+    entry = _entry(add)
+    assert entry.validate({"a": 1, "b": 2}) == {"a": 1, "b": 2}
+    # LLM 常把数字写成字符串
+    assert entry.validate({"a": "3", "b": 4.0}) == {"a": 3, "b": 4}
+    with pytest.raises(ValueError, match="参数 a 应为 integer"):
+        entry.validate({"a": "x", "b": 2})
+    with pytest.raises(ValueError, match="缺少必需参数: b"):
+        entry.validate({"a": 1})
+    with pytest.raises(ValueError, match="未知参数: c"):
+        entry.validate({"a": 1, "b": 2, "c": 3})
+
+
+def test_validation_optional_and_literal():
+    entry = _entry(search)
+    assert entry.validate({"query": "q", "limit": None})["limit"] is None
+    assert entry.validate({"query": "q", "limit": "5"})["limit"] == 5
+    with pytest.raises(ValueError, match="mode"):
+        entry.validate({"query": "q", "mode": "slow"})
+    with pytest.raises(ValueError, match="tags"):
+        entry.validate({"query": "q", "tags": "a,b"})
+
+
+def test_unresolvable_annotation_falls_back():
+    def lookup(key: "UndefinedType", count: int = 1):  # noqa: F821
+        return key
+
+    schema = build_input_schema(lookup)
+    assert schema["properties"]["key"]["type"] == "string"
+    assert schema["properties"]["count"]["type"] == "string"
+    assert _entry(lookup).validate({"key": "k"}) == {"key": "k"}
+
+
+def test_execute_tools_with_postponed_annotations():
+    manager = ToolManager(None, [add, tool(name="add_wrapped")(add)])
+    results = asyncio.run(manager.execute_tools([
+        {"tool_name": "add", "arguments": {"a": 1, "b": 2}},
+        {"tool_name": "add_wrapped", "arguments": {"a": "2", "b": 3}},
+    ]))
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert [r["result"] for r in results] == [3, 5]